@@ -2,10 +2,22 @@
 
 from __future__ import annotations
 
-from merchants.amount import from_minor_units, to_decimal_string, to_minor_units
+from merchants.amount import (
+    CurrencyTable,
+    Money,
+    currency_exponent,
+    from_minor_units,
+    to_decimal_string,
+    to_minor_units,
+)
 from merchants.auth import ApiKeyAuth, AuthStrategy, TokenAuth
 from merchants.autoload import load_providers_from_config
 from merchants.client import Client, PaymentsResource
+from merchants.compact import (
+    CompactCheckoutSession,
+    CompactPaymentStatus,
+    CompactWebhookEvent,
+)
 from merchants.models import (
     CheckoutSession,
     PaymentModel,
@@ -17,13 +29,17 @@ from merchants.models import (
 from merchants.providers import (
     Provider,
     ProviderInfo,
+    ProviderRegistry,
+    StateMap,
     UserError,
     describe_providers,
     get_provider,
+    get_tenant_registry,
     list_providers,
     normalise_state,
     register_provider,
 )
+from merchants.states import TransitionLog, can_transition
 from merchants.transport import (
     HttpResponse,
     RequestsTransport,
@@ -31,7 +47,17 @@ from merchants.transport import (
     TransportError,
 )
 from merchants.version import __version__
-from merchants.webhooks import WebhookVerificationError, parse_event, verify_signature
+from merchants.webhooks import (
+    WebhookDeduplicator,
+    WebhookDispatcher,
+    WebhookNotifier,
+    WebhookPipeline,
+    WebhookQueueFull,
+    WebhookVerificationError,
+    WebhookVerifier,
+    parse_event,
+    verify_signature,
+)
 
 __all__ = [
     # Client
@@ -43,17 +69,25 @@ __all__ = [
     "TokenAuth",
     # Models
     "CheckoutSession",
+    "CompactCheckoutSession",
+    "CompactPaymentStatus",
+    "CompactWebhookEvent",
     "PaymentModel",
     "PaymentState",
     "PaymentStatus",
+    "TransitionLog",
     "WebhookEvent",
+    "can_transition",
     "get_sa_metadata",
     # Providers
     "Provider",
     "ProviderInfo",
+    "ProviderRegistry",
+    "StateMap",
     "UserError",
     "describe_providers",
     "get_provider",
+    "get_tenant_registry",
     "list_providers",
     "normalise_state",
     "register_provider",
@@ -63,11 +97,20 @@ __all__ = [
     "Transport",
     "TransportError",
     # Amount
+    "CurrencyTable",
+    "Money",
+    "currency_exponent",
     "from_minor_units",
     "to_decimal_string",
     "to_minor_units",
     # Webhooks
+    "WebhookDeduplicator",
+    "WebhookDispatcher",
+    "WebhookNotifier",
+    "WebhookPipeline",
+    "WebhookQueueFull",
     "WebhookVerificationError",
+    "WebhookVerifier",
     "parse_event",
     "verify_signature",
     # Version
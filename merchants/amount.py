@@ -2,21 +2,461 @@
 
 from __future__ import annotations
 
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
 from decimal import ROUND_HALF_UP, Decimal
+from functools import cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Literal, overload
 
+if TYPE_CHECKING:
+    import numpy
 
-def to_decimal_string(amount: Decimal | int | float | str) -> str:
+
+_ONE = Decimal(1)
+
+
+@cache
+def _constants(decimals: int) -> tuple[Decimal, Decimal, int]:
+    """``(10 ** decimals, quantize exponent, int 10 ** decimals)`` for ``decimals``."""
+    factor = Decimal(10) ** decimals
+    exponent = Decimal("0." + "0" * decimals) if decimals > 0 else Decimal("1")
+    return factor, exponent, 10**decimals
+
+
+def _unsigned_parts(text: str) -> tuple[str, str] | None:
+    """Split an unsigned ASCII literal like ``"19.99"`` into ``("19", "99")``.
+
+    Returns ``None`` for anything else (signs, whitespace, exponents, NaN,
+    Unicode digits), which the callers hand to :class:`~decimal.Decimal`.
+    """
+    whole, _, frac = text.partition(".")
+    if whole.isdigit() and text.isascii() and (not frac or frac.isdigit()):
+        return whole, frac
+    return None
+
+
+def _minor(amount: AmountLike, decimals: int) -> int:
+    if type(amount) is int:
+        return amount * _constants(decimals)[2]
+    if isinstance(amount, Money):
+        return amount.minor_units(decimals)
+    text = amount if isinstance(amount, str) else str(amount)
+    parts = _unsigned_parts(text)
+    if parts is not None and len(parts[1]) <= decimals:
+        # Exact: no digits are dropped, so there is nothing to round.
+        whole, frac = parts
+        return int(whole + frac + "0" * (decimals - len(frac)))
+    factor = _constants(decimals)[0]
+    return int((Decimal(text) * factor).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def _decimal_string(amount: AmountLike, decimals: int) -> str:
+    if isinstance(amount, Money):
+        return amount.to_decimal_string(decimals)
+    text = amount if isinstance(amount, str) else str(amount)
+    parts = _unsigned_parts(text)
+    if (
+        parts is not None
+        and len(parts[1]) == decimals
+        and (parts[0][0] != "0" or parts[0] == "0")
+    ):
+        # Already canonical: exactly ``decimals`` places, no leading zeros.
+        return text if decimals else parts[0]
+    exponent = _constants(decimals)[1]
+    return str(Decimal(text).quantize(exponent, rounding=ROUND_HALF_UP))
+
+
+# ---------------------------------------------------------------------------
+# Currency exponents
+# ---------------------------------------------------------------------------
+
+# ISO 4217 minor-unit exponents, grouped by exponent.  Funds and precious
+# metal codes without minor units (XAU, XDR, ...) are omitted.
+_ISO_4217_GROUPS: dict[int, str] = {
+    0: "BIF CLP DJF GNF ISK JPY KMF KRW PYG RWF UGX UYI VND VUV XAF XOF XPF",
+    2: (
+        "AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BMD BND BOB "
+        "BOV BRL BSD BTN BWP BYN BZD CAD CDF CHE CHF CHW CNY COP COU CRC CUC "
+        "CUP CVE CZK DKK DOP DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD "
+        "GTQ GYD HKD HNL HTG HUF IDR ILS INR IRR JMD KES KGS KHR KPW KYD KZT "
+        "LAK LBP LKR LRD LSL MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN "
+        "MXV MYR MZN NAD NGN NIO NOK NPR NZD PAB PEN PGK PHP PKR PLN QAR RON "
+        "RSD RUB SAR SBD SCR SDG SEK SGD SHP SLE SLL SOS SRD SSP STN SVC SYP "
+        "SZL THB TJS TMT TOP TRY TTD TWD TZS UAH USD USN UYU UZS VED VES WST "
+        "XCD XCG YER ZAR ZMW ZWG ZWL"
+    ),
+    3: "BHD IQD JOD KWD LYD OMR TND",
+    4: "CLF UYW",
+}
+
+#: ISO 4217 currency code -> number of minor-unit decimal places.
+ISO_4217_EXPONENTS: Mapping[str, int] = MappingProxyType(
+    {
+        code: exponent
+        for exponent, codes in _ISO_4217_GROUPS.items()
+        for code in codes.split()
+    }
+)
+
+
+class CurrencyTable:
+    """Case-insensitive lookup of currency minor-unit exponents.
+
+    Upper- and lower-case spellings are stored up front, so the usual
+    lookups are a single dictionary hit.
+
+    Args:
+        exponents: Code -> exponent mapping (default :data:`ISO_4217_EXPONENTS`).
+        default: Exponent returned for codes not in the table.
+    """
+
+    __slots__ = ("_exponents", "_codes", "default")
+
+    def __init__(
+        self, exponents: Mapping[str, int] | None = None, *, default: int = 2
+    ) -> None:
+        source = ISO_4217_EXPONENTS if exponents is None else exponents
+        self._codes = {code.upper(): exponent for code, exponent in source.items()}
+        self._exponents = {
+            **{code.lower(): exponent for code, exponent in self._codes.items()},
+            **self._codes,
+        }
+        self.default = default
+
+    def exponent(self, currency: str) -> int:
+        """Return the exponent for ``currency`` (:attr:`default` when unknown)."""
+        exponent = self._exponents.get(currency)
+        if exponent is None:
+            exponent = self._exponents.get(currency.upper(), self.default)
+        return exponent
+
+    def with_overrides(self, overrides: Mapping[str, int]) -> CurrencyTable:
+        """Return a new table with ``overrides`` applied on top of this one."""
+        merged = dict(self._codes)
+        merged.update({code.upper(): exponent for code, exponent in overrides.items()})
+        return CurrencyTable(merged, default=self.default)
+
+    def __getitem__(self, currency: str) -> int:
+        exponent = self._exponents.get(currency)
+        if exponent is None:
+            exponent = self._exponents.get(currency.upper())
+            if exponent is None:
+                raise KeyError(currency)
+        return exponent
+
+    def __contains__(self, currency: object) -> bool:
+        return isinstance(currency, str) and (
+            currency in self._exponents or currency.upper() in self._exponents
+        )
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+#: The shared ISO 4217 table.
+CURRENCIES = CurrencyTable()
+
+
+def currency_exponent(currency: str) -> int:
+    """Return the ISO 4217 minor-unit exponent of ``currency`` (``2`` when unknown).
+
+    >>> currency_exponent("usd"), currency_exponent("JPY"), currency_exponent("KWD")
+    (2, 0, 3)
+    """
+    return CURRENCIES.exponent(currency)
+
+
+# ---------------------------------------------------------------------------
+# Money
+# ---------------------------------------------------------------------------
+
+
+def _rescale(minor: int, from_decimals: int, to_decimals: int) -> int:
+    """Exact (or ``ROUND_HALF_UP`` when dropping digits) change of exponent."""
+    if to_decimals >= from_decimals:
+        return minor * _constants(to_decimals - from_decimals)[2]
+    step = _constants(from_decimals - to_decimals)[2]
+    quotient, remainder = divmod(abs(minor), step)
+    if remainder * 2 >= step:
+        quotient += 1
+    return -quotient if minor < 0 else quotient
+
+
+class Money:
+    """An immutable amount of money held as integer minor units.
+
+    Arithmetic, comparison, allocation and formatting are done on the
+    integer, so nothing touches :class:`~decimal.Decimal` or its context.
+    ``Money`` is accepted wherever an amount is (the helpers in this module,
+    :meth:`merchants.client.PaymentsResource.create_checkout`, providers and
+    :class:`~merchants.models.PaymentModel`).
+
+    Args:
+        minor: Amount in minor units (cents for USD, yen for JPY).
+        currency: ISO 4217 code; stored upper-case.
+        exponent: Decimal places of ``minor``; defaults to the currency's
+            ISO 4217 exponent.
+
+    Raises:
+        TypeError: If ``minor`` is not an integer.
+
+    >>> Money(1999, "usd")
+    Money(1999, 'USD')
+    >>> str(Money.of("19.99", "USD") * 3)
+    '59.97'
+    """
+
+    __slots__ = ("minor", "currency", "exponent")
+
+    minor: int
+    currency: str
+    exponent: int
+
+    def __init__(
+        self, minor: int, currency: str, *, exponent: int | None = None
+    ) -> None:
+        if type(minor) is not int:
+            if isinstance(minor, bool) or not isinstance(minor, int):
+                raise TypeError(
+                    f"Money minor units must be an int, not {type(minor).__name__}"
+                )
+            minor = int(minor)
+        code = currency.upper()
+        init = object.__setattr__
+        init(self, "minor", minor)
+        init(self, "currency", code)
+        init(
+            self,
+            "exponent",
+            CURRENCIES.exponent(code) if exponent is None else exponent,
+        )
+
+    @classmethod
+    def of(
+        cls,
+        amount: Decimal | int | float | str,
+        currency: str,
+        *,
+        exponent: int | None = None,
+    ) -> Money:
+        """Build from a major-unit amount, rounding half-up to the currency's exponent.
+
+        >>> Money.of("1.005", "USD").minor
+        101
+        """
+        if exponent is None:
+            exponent = CURRENCIES.exponent(currency)
+        return cls(_minor(amount, exponent), currency, exponent=exponent)
+
+    @classmethod
+    def zero(cls, currency: str) -> Money:
+        """Return zero in ``currency``."""
+        return cls(0, currency)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Money is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self) -> tuple[Any, tuple[int, str, int]]:
+        return (_money, (self.minor, self.currency, self.exponent))
+
+    # ------------------------------------------------------------------
+    # Conversion and formatting
+    # ------------------------------------------------------------------
+
+    @property
+    def amount(self) -> Decimal:
+        """The amount in major units as a :class:`~decimal.Decimal`."""
+        return Decimal(self.minor).scaleb(-self.exponent)
+
+    def minor_units(self, decimals: int) -> int:
+        """Return the amount in units of ``10 ** -decimals``, rounding half-up."""
+        if decimals == self.exponent:
+            return self.minor
+        return _rescale(self.minor, self.exponent, decimals)
+
+    def to_decimal_string(self, decimals: int | None = None) -> str:
+        """Format as a plain decimal string (``"19.99"``).
+
+        Args:
+            decimals: Decimal places; defaults to :attr:`exponent`.
+        """
+        if decimals is None:
+            decimals = self.exponent
+        minor = self.minor_units(decimals)
+        sign = "-" if minor < 0 else ""
+        if not decimals:
+            return f"{sign}{abs(minor)}"
+        whole, frac = divmod(abs(minor), _constants(decimals)[2])
+        return f"{sign}{whole}.{frac:0{decimals}d}"
+
+    def __str__(self) -> str:
+        return self.to_decimal_string()
+
+    def __repr__(self) -> str:
+        if self.exponent != CURRENCIES.exponent(self.currency):
+            return f"Money({self.minor}, {self.currency!r}, exponent={self.exponent})"
+        return f"Money({self.minor}, {self.currency!r})"
+
+    # ------------------------------------------------------------------
+    # Arithmetic
+    # ------------------------------------------------------------------
+
+    def _same(self, other: Money) -> None:
+        if other.currency != self.currency or other.exponent != self.exponent:
+            raise ValueError(
+                f"Cannot combine {self.currency} and {other.currency} amounts"
+            )
+
+    def _new(self, minor: int) -> Money:
+        money = object.__new__(Money)
+        init = object.__setattr__
+        init(money, "minor", minor)
+        init(money, "currency", self.currency)
+        init(money, "exponent", self.exponent)
+        return money
+
+    def __add__(self, other: Money) -> Money:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self._new(self.minor + other.minor)
+
+    def __sub__(self, other: Money) -> Money:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self._new(self.minor - other.minor)
+
+    def __mul__(self, factor: int) -> Money:
+        if type(factor) is not int:
+            return NotImplemented
+        return self._new(self.minor * factor)
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> Money:
+        return self._new(-self.minor)
+
+    def __pos__(self) -> Money:
+        return self
+
+    def __abs__(self) -> Money:
+        return self if self.minor >= 0 else self._new(-self.minor)
+
+    def __bool__(self) -> bool:
+        return self.minor != 0
+
+    def allocate(self, ratios: Sequence[int]) -> list[Money]:
+        """Split by integer ``ratios`` without losing a minor unit.
+
+        Leftover units go one each to the parts with the largest fractional
+        remainder (earlier parts win ties), so the parts always sum to the
+        original amount and a zero ratio always gets zero.
+
+        >>> [m.minor for m in Money(100, "USD").allocate([1, 1, 1])]
+        [34, 33, 33]
+        >>> [m.minor for m in Money(5, "USD").allocate([0, 1, 1])]
+        [0, 3, 2]
+
+        Raises:
+            ValueError: If ``ratios`` is empty, has a negative entry or sums to zero.
+        """
+        total = sum(ratios)
+        if not ratios or total <= 0 or min(ratios) < 0:
+            raise ValueError("Ratios must be non-negative and sum to a positive number")
+        parts = [divmod(self.minor * ratio, total) for ratio in ratios]
+        shares = [share for share, _ in parts]
+        # The remainders add up to ``leftover * total``, so every part that
+        # receives a unit has a non-zero remainder.
+        leftover = self.minor - sum(shares)
+        by_remainder = sorted(range(len(parts)), key=lambda i: -parts[i][1])
+        for index in by_remainder[:leftover]:
+            shares[index] += 1
+        return [self._new(share) for share in shares]
+
+    def split(self, parts: int) -> list[Money]:
+        """Split into ``parts`` near-equal amounts; see :meth:`allocate`."""
+        return self.allocate([1] * parts)
+
+    # ------------------------------------------------------------------
+    # Comparison
+    # ------------------------------------------------------------------
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        return (
+            self.minor == other.minor
+            and self.currency == other.currency
+            and self.exponent == other.exponent
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.minor, self.currency, self.exponent))
+
+    def __lt__(self, other: Money) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self.minor < other.minor
+
+    def __le__(self, other: Money) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self.minor <= other.minor
+
+    def __gt__(self, other: Money) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self.minor > other.minor
+
+    def __ge__(self, other: Money) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        self._same(other)
+        return self.minor >= other.minor
+
+
+def _money(minor: int, currency: str, exponent: int) -> Money:
+    return Money(minor, currency, exponent=exponent)
+
+
+AmountLike = Decimal | int | float | str | Money
+
+
+def _checkout_amount(amount: AmountLike, currency: str) -> Money | Decimal:
+    """Normalise a caller-supplied checkout amount for a provider.
+
+    ``Money`` passes through (after a currency check); anything else becomes
+    a :class:`~decimal.Decimal`.
+    """
+    if isinstance(amount, Money):
+        if amount.currency != currency.upper():
+            raise ValueError(f"amount is in {amount.currency}, not {currency.upper()}")
+        return amount
+    return Decimal(str(amount))
+
+
+def to_decimal_string(amount: AmountLike, decimals: int = 2) -> str:
     """Return a canonical decimal string (e.g. '19.99').
 
     Suitable for providers like PayPal that accept decimal strings.
+
+    >>> to_decimal_string("19.999")
+    '20.00'
+    >>> to_decimal_string("1000", decimals=currency_exponent("JPY"))
+    '1000'
     """
-    d = Decimal(str(amount))
-    # Normalise: strip unnecessary trailing zeros but keep at least 2 dp
-    formatted = d.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    return str(formatted)
+    return _decimal_string(amount, decimals)
 
 
-def to_minor_units(amount: Decimal | int | float | str, decimals: int = 2) -> int:
+def to_minor_units(amount: AmountLike, decimals: int = 2) -> int:
     """Convert a decimal amount to the smallest currency unit (e.g. cents).
 
     Suitable for providers like Stripe that require integer minor-units.
@@ -28,9 +468,7 @@ def to_minor_units(amount: Decimal | int | float | str, decimals: int = 2) -> in
     >>> to_minor_units("100", decimals=0)
     100
     """
-    d = Decimal(str(amount))
-    factor = Decimal(10) ** decimals
-    return int((d * factor).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+    return _minor(amount, decimals)
 
 
 def from_minor_units(minor: int, decimals: int = 2) -> Decimal:
@@ -39,8 +477,96 @@ def from_minor_units(minor: int, decimals: int = 2) -> Decimal:
     >>> from_minor_units(1999)
     Decimal('19.99')
     """
-    factor = Decimal(10) ** decimals
-    return (Decimal(minor) / factor).quantize(
-        Decimal("0." + "0" * decimals) if decimals > 0 else Decimal("1"),
-        rounding=ROUND_HALF_UP,
-    )
+    factor, exponent, _ = _constants(decimals)
+    return (Decimal(minor) / factor).quantize(exponent, rounding=ROUND_HALF_UP)
+
+
+# ---------------------------------------------------------------------------
+# Batch conversions
+# ---------------------------------------------------------------------------
+
+
+def _numpy():  # type: ignore[no-untyped-def]
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError(
+            'numpy is required for out="numpy". Install it with: pip install numpy'
+        ) from exc
+    return np
+
+
+@overload
+def to_minor_units_many(
+    amounts: Iterable[AmountLike], decimals: int = ..., *, out: Literal["list"] = ...
+) -> list[int]: ...
+@overload
+def to_minor_units_many(
+    amounts: Iterable[AmountLike], decimals: int = ..., *, out: Literal["array"]
+) -> array: ...
+@overload
+def to_minor_units_many(
+    amounts: Iterable[AmountLike], decimals: int = ..., *, out: Literal["numpy"]
+) -> numpy.ndarray: ...
+def to_minor_units_many(
+    amounts: Iterable[AmountLike],
+    decimals: int = 2,
+    *,
+    out: Literal["list", "array", "numpy"] = "list",
+) -> list[int] | array | numpy.ndarray:
+    """Convert many amounts with :func:`to_minor_units`.
+
+    Unsigned decimal strings with no more than ``decimals`` places (the
+    usual content of settlement files) are converted with exact integer
+    arithmetic; everything else goes through :class:`~decimal.Decimal` with
+    ``ROUND_HALF_UP``.  Every result is identical to calling
+    :func:`to_minor_units` one value at a time.
+
+    Args:
+        amounts: Any iterable of amounts.
+        decimals: Decimal places of the currency.
+        out: ``"list"`` for a list of ints, ``"array"`` for an
+            ``array('q')`` or ``"numpy"`` for an ``int64`` NumPy array
+            (requires ``numpy``).  The last two raise :class:`OverflowError`
+            for values outside the signed 64-bit range.
+
+    >>> to_minor_units_many(["19.99", "1.005", 3])
+    [1999, 101, 300]
+    """
+    values = [_minor(amount, decimals) for amount in amounts]
+    if out == "array":
+        return array("q", values)
+    if out == "numpy":
+        np = _numpy()
+        result = array("q", values)
+        return np.frombuffer(result, dtype=np.int64).copy()
+    return values
+
+
+def from_minor_units_many(minors: Iterable[int], decimals: int = 2) -> list[Decimal]:
+    """Convert many minor-unit integers with :func:`from_minor_units`.
+
+    Accepts any iterable of ints, including an ``array('q')`` or a NumPy
+    integer array.
+
+    >>> from_minor_units_many([1999, 5])
+    [Decimal('19.99'), Decimal('0.05')]
+    """
+    shift = -decimals
+    # Decimal(int).scaleb(-d) yields the same digits and exponent as
+    # (Decimal(int) / 10**d).quantize(10**-d) without the division.
+    return [Decimal(int(minor)).scaleb(shift) for minor in minors]
+
+
+def to_decimal_strings(amounts: Iterable[AmountLike], decimals: int = 2) -> list[str]:
+    """Format many amounts like :func:`to_decimal_string`.
+
+    Args:
+        amounts: Any iterable of amounts.
+        decimals: Decimal places in the output (``2`` matches
+            :func:`to_decimal_string`).
+
+    >>> to_decimal_strings(["19.999", 9.5, 100])
+    ['20.00', '9.50', '100.00']
+    """
+    return [_decimal_string(amount, decimals) for amount in amounts]
@@ -37,10 +37,10 @@ from __future__ import annotations
 
 import importlib
 import logging
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 from typing import Any
 
-from merchants.providers import Provider, register_provider
+from merchants.providers import Provider, TenantResolver, register_provider
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +81,17 @@ def _resolve(entry: str) -> type[Provider] | None:
     return getattr(module, class_name)
 
 
+def _build(provider_cls: type[Provider], config: Mapping[str, Any]) -> Provider:
+    required = provider_cls.config_required or {}
+    kwargs = {kwarg: config[cfg_key] for kwarg, cfg_key in required.items()}
+    kwargs |= {
+        kwarg: config[cfg_key]
+        for kwarg, cfg_key in provider_cls.config_optional.items()
+        if config.get(cfg_key)
+    }
+    return provider_cls(**kwargs)
+
+
 def load_providers_from_config(
     config: Mapping[str, Any],
     *,
@@ -131,15 +142,57 @@ def load_providers_from_config(
             )
             continue  # not configured for this deployment
 
-        kwargs = {kwarg: config[cfg_key] for kwarg, cfg_key in required.items()}
-        kwargs |= {
-            kwarg: config[cfg_key]
-            for kwarg, cfg_key in provider_cls.config_optional.items()
-            if config.get(cfg_key)
-        }
-        provider = provider_cls(**kwargs)
+        provider = _build(provider_cls, config)
         if register:
             register_provider(provider)
         instantiated.append(provider)
 
     return instantiated
+
+
+def tenant_resolver_from_config(
+    get_config: Callable[[str], Mapping[str, Any] | None],
+) -> TenantResolver:
+    """
+    Build a :data:`~merchants.providers.TenantResolver` from per-tenant config.
+
+    The returned resolver looks up ``get_config(tenant)`` and instantiates the
+    requested provider from it exactly like :func:`load_providers_from_config`
+    does, so a tenant's config mapping uses the same keys (``STRIPE_API_KEY``,
+    ``FLOW_API_KEY``, …) as a single-tenant ``app.config``.  Provider keys may
+    be built-in short keys or dotted ``"module:ClassName"`` paths.
+
+    Usage::
+
+        from merchants.autoload import tenant_resolver_from_config
+        from merchants.providers import get_tenant_registry
+
+        get_tenant_registry().set_resolver(
+            tenant_resolver_from_config(lambda tenant: db.load_settings(tenant))
+        )
+        client = Client("stripe", tenant="acme")
+
+    Args:
+        get_config: Returns the config mapping for a tenant, or ``None`` if
+            the tenant is unknown.
+
+    Returns:
+        A resolver returning ``None`` when the tenant is unknown, the provider
+        is not importable / autoloadable, or required config keys are missing.
+    """
+
+    def resolve(tenant: str, key: str) -> Provider | None:
+        config = get_config(tenant)
+        if config is None:
+            return None
+        provider_cls = _resolve(key)
+        if provider_cls is None or provider_cls.config_required is None:
+            return None
+        if any(not config.get(k) for k in provider_cls.config_required.values()):
+            logger.debug(
+                "Tenant %r has no complete config for provider %r", tenant, key
+            )
+            return None
+        return _build(provider_cls, config)
+
+    return resolve
@@ -2,13 +2,58 @@
 
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 from decimal import Decimal
-from typing import Any
+from typing import Any, Literal, overload
 
+from merchants.amount import Money, _checkout_amount
 from merchants.auth import AuthStrategy
-from merchants.models import CheckoutSession, PaymentStatus
-from merchants.providers import Provider, get_provider
+from merchants.compact import CompactPaymentStatus
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    WebhookEvent,
+    build_payment_status,
+)
+from merchants.providers import Provider, ProviderRegistry, get_provider
+from merchants.result import Failure, Result, Success
 from merchants.transport import HttpResponse, RequestsTransport, Transport
+from merchants.webhooks import WebhookNotifier
+
+
+class _PollBackoff:
+    """Adaptive poll delay driven by a provider's ``poll_*`` attributes.
+
+    The delay grows geometrically while the payment state is unchanged and
+    snaps back to the initial interval whenever the state moves.
+    """
+
+    def __init__(self, provider: Provider) -> None:
+        self._initial = provider.poll_interval
+        self._max = provider.poll_max_interval
+        self._factor = provider.poll_backoff
+        self._delay = self._initial
+        self._state: PaymentState | None = None
+
+    def next_delay(self, state: PaymentState) -> float:
+        if state is not self._state:
+            self._state = state
+            self._delay = self._initial
+        delay = self._delay
+        self._delay = min(self._delay * self._factor, self._max)
+        return delay
+
+
+def _status_from_event(event: WebhookEvent, payment_id: str) -> PaymentStatus:
+    return build_payment_status(
+        payment_id=payment_id,
+        state=event.state,
+        provider=event.provider,
+        raw=event.raw,
+    )
 
 
 class PaymentsResource:
@@ -17,12 +62,15 @@ class PaymentsResource:
     Provides hosted-checkout creation and payment status retrieval.
     """
 
-    def __init__(self, provider: Provider) -> None:
+    def __init__(
+        self, provider: Provider, *, notifier: WebhookNotifier | None = None
+    ) -> None:
         self._provider = provider
+        self._notifier = notifier
 
     def create_checkout(
         self,
-        amount: Decimal | int | float | str,
+        amount: Money | Decimal | int | float | str,
         currency: str,
         success_url: str,
         cancel_url: str,
@@ -32,7 +80,10 @@ class PaymentsResource:
         """Create a hosted-checkout session.
 
         Args:
-            amount: Payment amount; converted to :class:`~decimal.Decimal`.
+            amount: Payment amount.  A :class:`~merchants.amount.Money` is
+                passed to the provider as-is (its currency must match
+                ``currency``); anything else is converted to
+                :class:`~decimal.Decimal`.
             currency: ISO-4217 currency code (e.g. ``"USD"``).
             success_url: URL to redirect to after successful payment.
             cancel_url: URL to redirect to when the user cancels.
@@ -45,9 +96,10 @@ class PaymentsResource:
 
         Raises:
             :class:`~merchants.providers.UserError`: If the provider rejects the request.
+            ValueError: If a ``Money`` amount is in another currency.
         """
         return self._provider.create_checkout(
-            Decimal(str(amount)),
+            _checkout_amount(amount, currency),
             currency,
             success_url,
             cancel_url,
@@ -55,17 +107,139 @@ class PaymentsResource:
             **kwargs,
         )
 
-    def get(self, payment_id: str) -> PaymentStatus:
+    @overload
+    def get(
+        self, payment_id: str, *, compact: Literal[False] = False
+    ) -> PaymentStatus: ...
+
+    @overload
+    def get(
+        self, payment_id: str, *, compact: Literal[True]
+    ) -> CompactPaymentStatus: ...
+
+    def get(
+        self, payment_id: str, *, compact: bool = False
+    ) -> PaymentStatus | CompactPaymentStatus:
         """Retrieve and normalise the status of a payment.
 
         Args:
             payment_id: Provider-specific payment / session identifier.
+            compact: Return a slotted
+                :class:`~merchants.compact.CompactPaymentStatus` instead.
 
         Returns:
             :class:`~merchants.models.PaymentStatus`.
         """
+        if compact:
+            return self._provider.get_payment_compact(payment_id)
         return self._provider.get_payment(payment_id)
 
+    def _matches(self, event: WebhookEvent) -> bool:
+        return event.provider in (self._provider.key, "unknown")
+
+    def wait_until_final(
+        self, payment_id: str, *, timeout: float = 60.0
+    ) -> Result[PaymentStatus, PaymentStatus | None]:
+        """Poll a payment until it reaches a final state or ``timeout`` expires.
+
+        Polls back off geometrically (tuned by the provider's
+        :attr:`~merchants.providers.Provider.poll_interval`,
+        :attr:`~merchants.providers.Provider.poll_max_interval` and
+        :attr:`~merchants.providers.Provider.poll_backoff`) and reset whenever
+        the state changes.  When the client was built with a
+        :class:`~merchants.webhooks.WebhookNotifier`, a published webhook for
+        this payment wakes the waiter immediately: a final event is returned
+        as-is, any other event triggers an immediate re-poll.
+
+        Args:
+            payment_id: Provider-specific payment / session identifier.
+            timeout: Maximum number of seconds to wait.
+
+        Returns:
+            :class:`~merchants.result.Success` carrying the final
+            :class:`~merchants.models.PaymentStatus`, or
+            :class:`~merchants.result.Failure` carrying the last status seen
+            (``None`` if no poll completed) when the timeout expires.
+        """
+        deadline = time.monotonic() + timeout
+        wakeup = threading.Event()
+        pushed: list[WebhookEvent] = []
+
+        def on_event(event: WebhookEvent) -> None:
+            if self._matches(event):
+                pushed.append(event)
+                wakeup.set()
+
+        unsubscribe = (
+            self._notifier.subscribe(payment_id, on_event) if self._notifier else None
+        )
+        backoff = _PollBackoff(self._provider)
+        last: PaymentStatus | None = None
+        try:
+            while True:
+                wakeup.clear()
+                while pushed:
+                    status = _status_from_event(pushed.pop(), payment_id)
+                    if status.is_final:
+                        return Success(status)
+                last = self.get(payment_id)
+                if last.is_final:
+                    return Success(last)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return Failure(last)
+                wakeup.wait(min(backoff.next_delay(last.state), remaining))
+        finally:
+            if unsubscribe is not None:
+                unsubscribe()
+
+    async def wait_until_final_async(
+        self, payment_id: str, *, timeout: float = 60.0
+    ) -> Result[PaymentStatus, PaymentStatus | None]:
+        """Async counterpart of :meth:`wait_until_final`.
+
+        Provider calls run in the default executor via
+        :func:`asyncio.to_thread`, so the event loop is never blocked.
+        Webhooks may be published from any thread.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        wakeup = asyncio.Event()
+        pushed: list[WebhookEvent] = []
+
+        def on_event(event: WebhookEvent) -> None:
+            if self._matches(event):
+                pushed.append(event)
+                loop.call_soon_threadsafe(wakeup.set)
+
+        unsubscribe = (
+            self._notifier.subscribe(payment_id, on_event) if self._notifier else None
+        )
+        backoff = _PollBackoff(self._provider)
+        last: PaymentStatus | None = None
+        try:
+            while True:
+                wakeup.clear()
+                while pushed:
+                    status = _status_from_event(pushed.pop(), payment_id)
+                    if status.is_final:
+                        return Success(status)
+                last = await asyncio.to_thread(self.get, payment_id)
+                if last.is_final:
+                    return Success(last)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return Failure(last)
+                try:
+                    await asyncio.wait_for(
+                        wakeup.wait(), min(backoff.next_delay(last.state), remaining)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if unsubscribe is not None:
+                unsubscribe()
+
 
 class Client:
     """Main entry point for the merchants SDK.
@@ -78,6 +252,14 @@ class Client:
         transport: Optional custom :class:`~merchants.transport.Transport`.
             Defaults to :class:`~merchants.transport.RequestsTransport`.
         base_url: Optional base URL used by :meth:`request`.
+        notifier: Optional :class:`~merchants.webhooks.WebhookNotifier` that
+            lets published webhooks short-circuit
+            :meth:`PaymentsResource.wait_until_final`.
+        tenant: Resolve a string ``provider`` key for this tenant through
+            ``registry`` rather than the global registry.
+        registry: :class:`~merchants.providers.ProviderRegistry` used with
+            ``tenant``; defaults to
+            :func:`~merchants.providers.get_tenant_registry`.
 
     Example::
 
@@ -100,12 +282,15 @@ class Client:
         auth: AuthStrategy | None = None,
         transport: Transport | None = None,
         base_url: str = "",
+        notifier: WebhookNotifier | None = None,
+        tenant: str | None = None,
+        registry: ProviderRegistry | None = None,
     ) -> None:
-        self._provider = get_provider(provider)
+        self._provider = get_provider(provider, tenant=tenant, registry=registry)
         self._auth = auth
         self._transport = transport or RequestsTransport()
         self._base_url = base_url.rstrip("/")
-        self.payments = PaymentsResource(self._provider)
+        self.payments = PaymentsResource(self._provider, notifier=notifier)
 
     def request(
         self,
@@ -0,0 +1,344 @@
+"""Column-oriented batches of payment statuses.
+
+:class:`PaymentStatusBatch` stores many :class:`~merchants.models.PaymentStatus`
+results as parallel columns instead of one model per row: states as one-byte
+codes, amounts as fixed-scale integers in :mod:`array` buffers, and currency
+and provider names interned into small lookup tables.  Reconciliation and
+reporting code can filter and aggregate a batch without building a model per
+row.
+
+Usage::
+
+    from merchants.columnar import PaymentStatusBatch
+    from merchants.models import PaymentState
+
+    batch = PaymentStatusBatch()
+    for payment_id in payment_ids:
+        batch.append(client.payments.get(payment_id, compact=True))
+
+    batch.sum_by_currency()                   # {"USD": Decimal("1234.5600"), ...}
+    pending = batch.where(final=False)        # still needs polling
+    per_provider = batch.by_provider()        # {"stripe": <batch>, ...}
+
+Install ``numpy`` to export the columns with :meth:`PaymentStatusBatch.to_numpy`.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator
+from decimal import Decimal
+from itertools import compress
+from typing import TYPE_CHECKING
+
+from merchants.amount import to_minor_units
+from merchants.compact import CompactPaymentStatus
+from merchants.models import _FINAL_STATES, PaymentState, PaymentStatus
+from merchants.states import _CODE_OF, STATE_CODES
+
+if TYPE_CHECKING:
+    import numpy
+
+_MISSING = 0xFFFF
+
+
+def _state_table(states: Iterable[PaymentState]) -> bytes:
+    """Translation table mapping a state code byte to ``1`` when selected."""
+    selected = {_CODE_OF[PaymentState(s)] for s in states}
+    return bytes(1 if code in selected else 0 for code in range(256))
+
+
+_FINAL_TABLE = _state_table(_FINAL_STATES)
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+def _and(a: bytes, b: bytes) -> bytes:
+    n = len(a)
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(
+        n, "little"
+    )
+
+
+class _Interner:
+    """Assigns small integer codes to repeated strings."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class PaymentStatusBatch:
+    """A growable, column-oriented collection of payment statuses.
+
+    Only the scalar fields are kept (``payment_id``, ``state``, ``provider``,
+    ``amount``, ``currency``); ``raw``, ``metadata`` and ``full_object`` are
+    dropped.  Amounts are stored as integers in units of ``10 ** -scale``,
+    rounded half-up, so sums are exact.
+
+    Args:
+        statuses: Optional initial rows.
+        scale: Decimal places kept for amounts (default ``4``, enough for
+            every ISO-4217 currency).
+    """
+
+    __slots__ = (
+        "_scale",
+        "_ids",
+        "_states",
+        "_amounts",
+        "_has_amount",
+        "_currencies",
+        "_providers",
+        "_currency_table",
+        "_provider_table",
+    )
+
+    def __init__(
+        self,
+        statuses: Iterable[PaymentStatus | CompactPaymentStatus] = (),
+        *,
+        scale: int = 4,
+    ) -> None:
+        self._scale = scale
+        self._ids: list[str] = []
+        self._states = array("B")
+        self._amounts = array("q")
+        self._has_amount = array("B")
+        self._currencies = array("H")
+        self._providers = array("H")
+        self._currency_table = _Interner()
+        self._provider_table = _Interner()
+        self.extend(statuses)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def append(self, status: PaymentStatus | CompactPaymentStatus) -> None:
+        """Add one status as a new row."""
+        amount = status.amount
+        currency = status.currency
+        self._ids.append(status.payment_id)
+        self._states.append(_CODE_OF[status.state])
+        if amount is None:
+            self._amounts.append(0)
+            self._has_amount.append(0)
+        else:
+            self._amounts.append(to_minor_units(amount, decimals=self._scale))
+            self._has_amount.append(1)
+        # Providers disagree on casing ("usd" vs "USD"); store ISO-4217 form.
+        self._currencies.append(
+            _MISSING
+            if currency is None
+            else self._currency_table.code(currency.upper())
+        )
+        self._providers.append(self._provider_table.code(status.provider))
+
+    def extend(self, statuses: Iterable[PaymentStatus | CompactPaymentStatus]) -> None:
+        """Add every status from ``statuses``, which may be a lazy stream."""
+        for status in statuses:
+            self.append(status)
+
+    def _take(self, mask: bytes) -> PaymentStatusBatch:
+        subset = PaymentStatusBatch.__new__(PaymentStatusBatch)
+        subset._scale = self._scale
+        subset._ids = list(compress(self._ids, mask))
+        subset._states = array("B", compress(self._states, mask))
+        subset._amounts = array("q", compress(self._amounts, mask))
+        subset._has_amount = array("B", compress(self._has_amount, mask))
+        subset._currencies = array("H", compress(self._currencies, mask))
+        subset._providers = array("H", compress(self._providers, mask))
+        # Lookup tables are shared; codes stay valid in the subset.
+        subset._currency_table = self._currency_table
+        subset._provider_table = self._provider_table
+        return subset
+
+    # ------------------------------------------------------------------
+    # Columns and rows
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def scale(self) -> int:
+        """Decimal places kept for amounts."""
+        return self._scale
+
+    @property
+    def payment_ids(self) -> list[str]:
+        """The ``payment_id`` column."""
+        return list(self._ids)
+
+    @property
+    def state_codes(self) -> array:
+        """The state column as codes into :data:`STATE_CODES`."""
+        return array("B", self._states)
+
+    @property
+    def amounts(self) -> array:
+        """The amount column in units of ``10 ** -scale`` (``0`` when missing)."""
+        return array("q", self._amounts)
+
+    def _decode(self, table: _Interner, code: int) -> str | None:
+        return None if code == _MISSING else table.values[code]
+
+    def row(self, index: int) -> CompactPaymentStatus:
+        """Materialise one row as a :class:`~merchants.compact.CompactPaymentStatus`."""
+        return CompactPaymentStatus(
+            payment_id=self._ids[index],
+            state=STATE_CODES[self._states[index]],
+            provider=self._provider_table.values[self._providers[index]],
+            amount=(
+                Decimal(self._amounts[index]).scaleb(-self._scale)
+                if self._has_amount[index]
+                else None
+            ),
+            currency=self._decode(self._currency_table, self._currencies[index]),
+        )
+
+    def __iter__(self) -> Iterator[CompactPaymentStatus]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    # ------------------------------------------------------------------
+    # Filters
+    # ------------------------------------------------------------------
+
+    def final_mask(self) -> bytes:
+        """One byte per row: ``1`` where the state is final."""
+        return self._states.tobytes().translate(_FINAL_TABLE)
+
+    def state_mask(self, *states: PaymentState) -> bytes:
+        """One byte per row: ``1`` where the state is one of ``states``."""
+        return self._states.tobytes().translate(_state_table(states))
+
+    def _code_mask(self, column: array, code: int | None) -> bytes:
+        return bytes(1 if c == code else 0 for c in column)
+
+    def all_final(self) -> bool:
+        """Return True when every row is in a final state."""
+        return 0 not in self.final_mask()
+
+    def where(
+        self,
+        *,
+        state: PaymentState | str | Iterable[PaymentState | str] | None = None,
+        provider: str | None = None,
+        currency: str | None = None,
+        final: bool | None = None,
+    ) -> PaymentStatusBatch:
+        """Return the rows matching every given criterion as a new batch.
+
+        Args:
+            state: A state, or several states, to keep (enum members or
+                their string values).
+            provider: Provider key to keep.
+            currency: Currency code to keep, in any casing.
+            final: Keep only final (``True``) or only non-final (``False``) rows.
+        """
+        mask = b"\x01" * len(self)
+        if state is not None:
+            # PaymentState is a str enum; a bare string is one state, not
+            # an iterable of characters.
+            states = (state,) if isinstance(state, str) else tuple(state)
+            mask = _and(mask, self.state_mask(*states))
+        if final is not None:
+            final_mask = self.final_mask()
+            if not final:
+                final_mask = final_mask.translate(_INVERT)
+            mask = _and(mask, final_mask)
+        if provider is not None:
+            code = self._provider_table.codes.get(provider)
+            mask = _and(mask, self._code_mask(self._providers, code))
+        if currency is not None:
+            code = self._currency_table.codes.get(currency.upper())
+            mask = _and(mask, self._code_mask(self._currencies, code))
+        return self._take(mask)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    def count_by_state(self) -> dict[PaymentState, int]:
+        """Number of rows in each state that occurs in the batch."""
+        counts = [0] * len(STATE_CODES)
+        for code in self._states:
+            counts[code] += 1
+        return {STATE_CODES[c]: n for c, n in enumerate(counts) if n}
+
+    def sum_by_currency(
+        self, state: PaymentState | None = PaymentState.SUCCEEDED
+    ) -> dict[str, Decimal]:
+        """Total amount per currency.
+
+        Args:
+            state: Only sum rows in this state; ``None`` sums every row.
+                Rows without a currency are skipped.
+        """
+        rows: Iterable[tuple[int, int]] = zip(self._currencies, self._amounts)
+        if state is not None:
+            rows = compress(rows, self.state_mask(state))
+        totals: dict[int, int] = {}
+        for code, amount in rows:
+            if code != _MISSING:
+                totals[code] = totals.get(code, 0) + amount
+        values = self._currency_table.values
+        return {
+            values[code]: Decimal(total).scaleb(-self._scale)
+            for code, total in totals.items()
+        }
+
+    def by_provider(self) -> dict[str, PaymentStatusBatch]:
+        """Split the batch into one batch per provider key."""
+        values = self._provider_table.values
+        return {
+            values[code]: self._take(self._code_mask(self._providers, code))
+            for code in dict.fromkeys(self._providers)
+        }
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def to_numpy(self) -> dict[str, numpy.ndarray]:
+        """Export the columns as NumPy arrays (requires ``numpy``).
+
+        Returns:
+            ``payment_id`` (object), ``state`` (``uint8`` codes into
+            :data:`STATE_CODES`), ``amount`` (``int64`` in units of
+            ``10 ** -scale``), ``has_amount`` (``bool``), ``currency`` and
+            ``provider`` (object).
+        """
+        try:
+            import numpy as np
+        except ImportError as exc:
+            raise ImportError(
+                "numpy is required for PaymentStatusBatch.to_numpy(). "
+                "Install it with: pip install numpy"
+            ) from exc
+        currencies = [*self._currency_table.values, None]
+        providers = self._provider_table.values
+        return {
+            "payment_id": np.array(self._ids, dtype=object),
+            "state": np.frombuffer(self._states, dtype=np.uint8).copy(),
+            "amount": np.frombuffer(self._amounts, dtype=np.int64).copy(),
+            "has_amount": np.frombuffer(self._has_amount, dtype=np.bool_).copy(),
+            "currency": np.array(
+                [currencies[c if c != _MISSING else -1] for c in self._currencies],
+                dtype=object,
+            ),
+            "provider": np.array([providers[c] for c in self._providers], dtype=object),
+        }
+
+    def __repr__(self) -> str:
+        return f"PaymentStatusBatch(rows={len(self)}, scale={self._scale})"
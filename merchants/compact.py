@@ -0,0 +1,145 @@
+"""Compact, slotted counterparts of the result models.
+
+:class:`~merchants.models.PaymentStatus`, :class:`~merchants.models.WebhookEvent`
+and :class:`~merchants.models.CheckoutSession` are pydantic models; each
+instance carries a ``__dict__`` plus pydantic's bookkeeping.  Jobs that hold
+many of them at once (reconciliation runs, status caches, webhook backlogs)
+can use the frozen, ``__slots__``-based dataclasses here instead.
+
+Conversion in both directions is zero-copy: field values, including the
+``raw`` / ``metadata`` dicts, are passed by reference and nothing is
+re-validated.
+
+Usage::
+
+    from merchants.compact import CompactPaymentStatus
+
+    status = provider.get_payment_compact("pay_123")
+    if status.is_final:
+        ...
+    model = status.to_model()  # back to a PaymentStatus
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from decimal import Decimal
+from typing import Any, overload
+
+from merchants.models import (
+    _FINAL_STATES,
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    WebhookEvent,
+)
+
+
+def _empty() -> dict[str, Any]:
+    return {}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CompactPaymentStatus:
+    """Slotted, immutable :class:`~merchants.models.PaymentStatus`."""
+
+    payment_id: str
+    state: PaymentState
+    provider: str
+    amount: Decimal | None = None
+    currency: str | None = None
+    metadata: dict[str, Any] = dataclasses.field(default_factory=_empty)
+    raw: dict[str, Any] = dataclasses.field(default_factory=_empty)
+    full_object: dict[str, Any] = dataclasses.field(default_factory=_empty)
+
+    @property
+    def is_final(self) -> bool:
+        """Return True when no further state transitions are expected."""
+        return self.state in _FINAL_STATES
+
+    @property
+    def is_success(self) -> bool:
+        """Return True only when the payment definitively succeeded."""
+        return self.state is PaymentState.SUCCEEDED
+
+    @classmethod
+    def from_model(cls, model: PaymentStatus) -> CompactPaymentStatus:
+        """Build from a :class:`~merchants.models.PaymentStatus` without copying."""
+        return cls(**model.__dict__)
+
+    def to_model(self) -> PaymentStatus:
+        """Return an equivalent :class:`~merchants.models.PaymentStatus` without copying."""
+        return PaymentStatus.model_construct(**_fields(self))
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CompactWebhookEvent:
+    """Slotted, immutable :class:`~merchants.models.WebhookEvent`."""
+
+    event_type: str
+    event_id: str | None = None
+    payment_id: str | None = None
+    state: PaymentState = PaymentState.UNKNOWN
+    provider: str = "unknown"
+    raw: dict[str, Any] = dataclasses.field(default_factory=_empty)
+
+    @classmethod
+    def from_model(cls, model: WebhookEvent) -> CompactWebhookEvent:
+        """Build from a :class:`~merchants.models.WebhookEvent` without copying."""
+        return cls(**model.__dict__)
+
+    def to_model(self) -> WebhookEvent:
+        """Return an equivalent :class:`~merchants.models.WebhookEvent` without copying."""
+        return WebhookEvent.model_construct(**_fields(self))
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CompactCheckoutSession:
+    """Slotted, immutable :class:`~merchants.models.CheckoutSession`."""
+
+    session_id: str
+    redirect_url: str
+    provider: str
+    amount: Decimal
+    currency: str
+    metadata: dict[str, Any] = dataclasses.field(default_factory=_empty)
+    raw: dict[str, Any] = dataclasses.field(default_factory=_empty)
+    initial_state: PaymentState = PaymentState.PENDING
+    payload: dict[str, Any] = dataclasses.field(default_factory=_empty)
+    full_object: dict[str, Any] = dataclasses.field(default_factory=_empty)
+
+    @classmethod
+    def from_model(cls, model: CheckoutSession) -> CompactCheckoutSession:
+        """Build from a :class:`~merchants.models.CheckoutSession` without copying."""
+        return cls(**model.__dict__)
+
+    def to_model(self) -> CheckoutSession:
+        """Return an equivalent :class:`~merchants.models.CheckoutSession` without copying."""
+        return CheckoutSession.model_construct(**_fields(self))
+
+
+def _fields(obj: Any) -> dict[str, Any]:
+    # dataclasses.asdict() would deep-copy the dicts; read the slots directly.
+    return {name: getattr(obj, name) for name in obj.__slots__}
+
+
+@overload
+def compact(model: PaymentStatus) -> CompactPaymentStatus: ...
+@overload
+def compact(model: WebhookEvent) -> CompactWebhookEvent: ...
+@overload
+def compact(model: CheckoutSession) -> CompactCheckoutSession: ...
+def compact(model: Any) -> Any:
+    """Return the compact counterpart of a result model.
+
+    Raises:
+        TypeError: If ``model`` is not a ``PaymentStatus``, ``WebhookEvent``
+            or ``CheckoutSession``.
+    """
+    if isinstance(model, PaymentStatus):
+        return CompactPaymentStatus.from_model(model)
+    if isinstance(model, WebhookEvent):
+        return CompactWebhookEvent.from_model(model)
+    if isinstance(model, CheckoutSession):
+        return CompactCheckoutSession.from_model(model)
+    raise TypeError(f"Cannot compact {type(model).__name__!r}")
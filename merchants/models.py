@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import os
 from decimal import Decimal
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from pydantic.fields import FieldInfo
 
+from merchants.amount import Money
+
 
 class PaymentState(str, Enum):
     """Normalised payment lifecycle states."""
@@ -22,6 +25,30 @@ class PaymentState(str, Enum):
     UNKNOWN = "unknown"
 
 
+_FINAL_STATES = frozenset(
+    {
+        PaymentState.SUCCEEDED,
+        PaymentState.FAILED,
+        PaymentState.CANCELLED,
+        PaymentState.REFUNDED,
+    }
+)
+
+
+class RetentionPolicy(str, Enum):
+    """How much of a provider's response is kept on returned models.
+
+    - ``NONE`` - keep nothing: ``raw``, ``full_object`` and ``payload`` are empty.
+    - ``RAW`` - keep ``raw`` only.
+    - ``FULL`` - keep everything (the default).  Where ``raw`` and
+      ``full_object`` hold the same response they share one dict.
+    """
+
+    NONE = "none"
+    RAW = "raw"
+    FULL = "full"
+
+
 class CheckoutSession(BaseModel):
     """A hosted-checkout session returned by a provider."""
 
@@ -52,12 +79,7 @@ class PaymentStatus(BaseModel):
     @property
     def is_final(self) -> bool:
         """Return True when no further state transitions are expected."""
-        return self.state in (
-            PaymentState.SUCCEEDED,
-            PaymentState.FAILED,
-            PaymentState.CANCELLED,
-            PaymentState.REFUNDED,
-        )
+        return self.state in _FINAL_STATES
 
     @property
     def is_success(self) -> bool:
@@ -76,6 +98,134 @@ class WebhookEvent(BaseModel):
     raw: dict[str, Any] = Field(default_factory=dict)
 
 
+# ---------------------------------------------------------------------------
+# Trusted builders
+# ---------------------------------------------------------------------------
+
+_strict_models = os.environ.get("MERCHANTS_STRICT_MODELS", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def set_strict_models(enabled: bool) -> None:
+    """Toggle full pydantic validation in the ``build_*`` helpers.
+
+    Off by default; also enabled by setting the ``MERCHANTS_STRICT_MODELS``
+    environment variable to ``1``/``true``/``yes``.  Turn it on in tests or
+    while debugging a provider integration to catch type mistakes early.
+    """
+    global _strict_models
+    _strict_models = enabled
+
+
+def strict_models_enabled() -> bool:
+    """Return whether the builders currently validate their input."""
+    return _strict_models
+
+
+def build_payment_status(
+    *,
+    payment_id: str,
+    state: PaymentState,
+    provider: str,
+    amount: Decimal | None = None,
+    currency: str | None = None,
+    metadata: dict[str, Any] | None = None,
+    raw: dict[str, Any] | None = None,
+    full_object: dict[str, Any] | None = None,
+) -> PaymentStatus:
+    """Build a :class:`PaymentStatus` from values provider code already produced.
+
+    Skips pydantic validation (via ``model_construct``), so ``raw`` and
+    ``full_object`` are stored by reference rather than rebuilt.  Callers
+    must pass correctly typed values; with strict models enabled (see
+    :func:`set_strict_models`) the model is validated as usual.
+    """
+    fields = {
+        "payment_id": payment_id,
+        "state": state,
+        "provider": provider,
+        "amount": amount,
+        "currency": currency,
+        "metadata": {} if metadata is None else metadata,
+        "raw": {} if raw is None else raw,
+        "full_object": {} if full_object is None else full_object,
+    }
+    if _strict_models:
+        return PaymentStatus(**fields)
+    return PaymentStatus.model_construct(**fields)
+
+
+def build_checkout_session(
+    *,
+    session_id: str,
+    redirect_url: str,
+    provider: str,
+    amount: Decimal | Money,
+    currency: str,
+    metadata: dict[str, Any] | None = None,
+    raw: dict[str, Any] | None = None,
+    initial_state: PaymentState = PaymentState.PENDING,
+    payload: dict[str, Any] | None = None,
+    full_object: dict[str, Any] | None = None,
+) -> CheckoutSession:
+    """Build a :class:`CheckoutSession` from values provider code already produced.
+
+    The trusted counterpart of ``CheckoutSession(...)``; see
+    :func:`build_payment_status`.  ``amount`` is still coerced to
+    :class:`~decimal.Decimal` because providers may be called directly
+    (a :class:`~merchants.amount.Money` contributes its major-unit amount).
+    """
+    if isinstance(amount, Money):
+        amount = amount.amount
+    elif not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    fields = {
+        "session_id": session_id,
+        "redirect_url": redirect_url,
+        "provider": provider,
+        "amount": amount,
+        "currency": currency,
+        "metadata": {} if metadata is None else metadata,
+        "raw": {} if raw is None else raw,
+        "initial_state": initial_state,
+        "payload": {} if payload is None else payload,
+        "full_object": {} if full_object is None else full_object,
+    }
+    if _strict_models:
+        return CheckoutSession(**fields)
+    return CheckoutSession.model_construct(**fields)
+
+
+def build_webhook_event(
+    *,
+    event_type: str,
+    event_id: str | None = None,
+    payment_id: str | None = None,
+    state: PaymentState = PaymentState.UNKNOWN,
+    provider: str = "unknown",
+    raw: dict[str, Any] | None = None,
+) -> WebhookEvent:
+    """Build a :class:`WebhookEvent` from values provider code already produced.
+
+    The trusted counterpart of ``WebhookEvent(...)``; see
+    :func:`build_payment_status`.
+    """
+    fields = {
+        "event_id": event_id,
+        "event_type": event_type,
+        "payment_id": payment_id,
+        "state": state,
+        "provider": provider,
+        "raw": {} if raw is None else raw,
+    }
+    if _strict_models:
+        return WebhookEvent(**fields)
+    return WebhookEvent.model_construct(**fields)
+
+
 class PaymentModel(BaseModel):
     """Pydantic model representing a stored payment record.
 
@@ -155,6 +305,24 @@ class PaymentModel(BaseModel):
         json_schema_extra={"sa": {"varchar_len": 2048}},
     )
 
+    @model_validator(mode="before")
+    @classmethod
+    def _unpack_money(cls, data: Any) -> Any:
+        """Accept a :class:`~merchants.amount.Money` as ``amount``.
+
+        Its major-unit amount is stored and its currency fills in (or must
+        match) ``currency``.
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("amount"), Money):
+            return data
+        money: Money = data["amount"]
+        currency = data.get("currency")
+        if currency is not None and str(currency).upper() != money.currency:
+            raise ValueError(
+                f"amount is in {money.currency} but currency is {currency!r}"
+            )
+        return {**data, "amount": money.amount, "currency": currency or money.currency}
+
 
 # Keys that are part of the standard JSON Schema vocabulary and must NOT be
 # mistakenly treated as SQLAlchemy column metadata.
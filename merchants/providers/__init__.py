@@ -2,13 +2,31 @@
 
 from __future__ import annotations
 
+import heapq
+import itertools
+import logging
+import threading
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Mapping
 from decimal import Decimal
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from pydantic import BaseModel, model_validator
 
-from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
+from merchants.amount import CURRENCIES, CurrencyTable, Money
+from merchants.compact import CompactPaymentStatus, CompactWebhookEvent
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+)
+
+if TYPE_CHECKING:
+    from merchants.webhooks.schemas import WebhookSchema
+
+logger = logging.getLogger(__name__)
 
 
 class UserError(Exception):
@@ -49,6 +67,138 @@ class ProviderInfo(BaseModel):
         return self
 
 
+# ---------------------------------------------------------------------------
+# State normalisation (shared across providers)
+# ---------------------------------------------------------------------------
+
+#: Default status table, covering Stripe-, PayPal- and generic-style strings.
+_STATE_MAP: dict[str, PaymentState] = {
+    # Stripe-style
+    "requires_payment_method": PaymentState.PENDING,
+    "requires_confirmation": PaymentState.PENDING,
+    "requires_action": PaymentState.PENDING,
+    "processing": PaymentState.PROCESSING,
+    "succeeded": PaymentState.SUCCEEDED,
+    "canceled": PaymentState.CANCELLED,
+    "cancelled": PaymentState.CANCELLED,
+    "failed": PaymentState.FAILED,
+    # PayPal-style
+    "created": PaymentState.PENDING,
+    "approved": PaymentState.PROCESSING,
+    "completed": PaymentState.SUCCEEDED,
+    "voided": PaymentState.CANCELLED,
+    "refunded": PaymentState.REFUNDED,
+    # Generic
+    "pending": PaymentState.PENDING,
+    "paid": PaymentState.SUCCEEDED,
+    "success": PaymentState.SUCCEEDED,
+    "successful": PaymentState.SUCCEEDED,
+    "error": PaymentState.FAILED,
+}
+
+
+class StateMap:
+    """A provider's status table, compiled for lookups without per-call ``.lower()``.
+
+    Each key is stored as declared and in its lower, upper, title and
+    capitalised forms, so the statuses providers actually send (``"succeeded"``,
+    ``"COMPLETED"``, ``"Paid"``) are a single dict lookup.  Other casings fall
+    back to a lower-cased lookup.
+
+    Strings that map to nothing return ``PaymentState.UNKNOWN`` and are
+    counted in :meth:`unknown_states`.  At most ``max_unknown`` distinct
+    strings are tracked (each truncated to 64 characters) and each is logged
+    once, at its first sighting; further unseen strings only bump
+    :attr:`unknown_overflow`.
+
+    Args:
+        mapping: Raw provider status -> :class:`~merchants.models.PaymentState`
+            (or its value).  Keys are case-insensitive.
+        max_unknown: Distinct unknown strings to keep counts for.
+
+    >>> StateMap({"done": "succeeded"})("DONE")
+    <PaymentState.SUCCEEDED: 'succeeded'>
+    """
+
+    __slots__ = ("_table", "_folded", "_unknown", "max_unknown", "unknown_overflow")
+
+    def __init__(
+        self, mapping: Mapping[str, PaymentState | str], *, max_unknown: int = 256
+    ) -> None:
+        folded = {raw.lower(): PaymentState(state) for raw, state in mapping.items()}
+        table: dict[str, PaymentState] = {}
+        for raw, state in mapping.items():
+            for variant in (raw, raw.upper(), raw.title(), raw.capitalize()):
+                table[variant] = folded[raw.lower()]
+        table.update(folded)
+        self._table = table
+        self._folded = folded
+        self._unknown: dict[str, int] = {}
+        self.max_unknown = max_unknown
+        self.unknown_overflow = 0
+
+    def __call__(self, raw_state: str) -> PaymentState:
+        state = self._table.get(raw_state)
+        if state is None:
+            state = self._folded.get(raw_state.lower())
+            if state is None:
+                self._record_unknown(raw_state)
+                return PaymentState.UNKNOWN
+        return state
+
+    def __contains__(self, raw_state: object) -> bool:
+        return isinstance(raw_state, str) and raw_state.lower() in self._folded
+
+    def __len__(self) -> int:
+        return len(self._folded)
+
+    def _record_unknown(self, raw_state: str) -> None:
+        key = raw_state[:64]
+        unknown = self._unknown
+        count = unknown.get(key)
+        if count is not None:
+            unknown[key] = count + 1
+        elif len(unknown) < self.max_unknown:
+            unknown[key] = 1
+            logger.warning("Unmapped provider status %r; treating as UNKNOWN", key)
+        else:
+            self.unknown_overflow += 1
+
+    def unknown_states(self) -> dict[str, int]:
+        """Return a snapshot of unmapped status strings and how often each was seen."""
+        return dict(self._unknown)
+
+    def reset_unknown(self) -> None:
+        """Forget the unknown-status counts."""
+        self._unknown.clear()
+        self.unknown_overflow = 0
+
+
+_DEFAULT_STATES = StateMap(_STATE_MAP)
+#: Compiled :attr:`Provider.states` by provider class key, for :func:`normalise_state`.
+_PROVIDER_STATES: dict[str, StateMap] = {}
+#: Declared :attr:`Provider.webhook_schema` by provider class key, for
+#: :func:`~merchants.webhooks.schemas.schema_for`.
+_PROVIDER_SCHEMAS: dict[str, WebhookSchema] = {}
+#: Provider classes that declare their own state table or webhook schema, by
+#: class key.  Lets worker processes re-import them (see
+#: :func:`merchants.webhooks.parse_events`).
+_PROVIDER_CLASSES: dict[str, type[Provider]] = {}
+
+
+def normalise_state(raw_state: str, provider: str | None = None) -> PaymentState:
+    """Map a provider-specific status string to a :class:`~merchants.models.PaymentState`.
+
+    Args:
+        raw_state: Status string as sent by the provider (any casing).
+        provider: Key of a provider class that declares its own
+            :attr:`Provider.state_mapping`; the default table is used otherwise.
+    """
+    if provider is None:
+        return _DEFAULT_STATES(raw_state)
+    return _PROVIDER_STATES.get(provider, _DEFAULT_STATES)(raw_state)
+
+
 class Provider(ABC):
     """Abstract base class for payment provider integrations."""
 
@@ -88,6 +238,45 @@ class Provider(ABC):
     config_required: dict[str, str] | None = None
     #: Same mapping as ``config_required``, but for optional constructor kwargs.
     config_optional: dict[str, str] = {}
+    #: Initial delay (seconds) between status polls in
+    #: :meth:`~merchants.client.PaymentsResource.wait_until_final`.
+    poll_interval: float = 1.0
+    #: Upper bound (seconds) for the poll delay once backoff kicks in.
+    poll_max_interval: float = 30.0
+    #: Factor applied to the poll delay after every poll that sees no state change.
+    poll_backoff: float = 1.5
+    #: Declarative description of this provider's webhook body, used by
+    #: :func:`merchants.webhooks.parse_event` when given this provider's key.
+    #: ``None`` falls back to the best-effort default schema.
+    webhook_schema: WebhookSchema | None = None
+    #: How much of each provider response is kept on returned
+    #: :class:`~merchants.models.CheckoutSession` / :class:`~merchants.models.PaymentStatus`
+    #: objects.  Lower it to cut the memory of in-flight sessions and cached statuses.
+    retention: RetentionPolicy = RetentionPolicy.FULL
+    #: Currency exponents where this provider departs from ISO 4217,
+    #: e.g. ``{"HUF": 0}`` for a gateway that takes whole forints.
+    currency_overrides: dict[str, int] = {}
+    #: ISO 4217 table with :attr:`currency_overrides` applied; built once per class.
+    currencies: CurrencyTable = CURRENCIES
+    #: Raw provider status -> :class:`~merchants.models.PaymentState`.  Keys are
+    #: case-insensitive.  Defaults to a table covering Stripe-, PayPal- and
+    #: generic-style statuses.
+    state_mapping: Mapping[str, PaymentState] = _STATE_MAP
+    #: :attr:`state_mapping` compiled into a :class:`StateMap`; built once per class.
+    #: Call it to normalise a status: ``self.states("COMPLETED")``.
+    states: StateMap = _DEFAULT_STATES
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "currency_overrides" in cls.__dict__:
+            cls.currencies = CURRENCIES.with_overrides(cls.currency_overrides)
+        if "state_mapping" in cls.__dict__:
+            cls.states = StateMap(cls.state_mapping)
+            _PROVIDER_STATES[cls.key] = cls.states
+            _PROVIDER_CLASSES[cls.key] = cls
+        if cls.__dict__.get("webhook_schema") is not None:
+            _PROVIDER_SCHEMAS[cls.key] = cls.webhook_schema
+            _PROVIDER_CLASSES[cls.key] = cls
 
     def __init__(
         self,
@@ -95,10 +284,38 @@ class Provider(ABC):
         key: str | None = None,
         name: str | None = None,
         description: str | None = None,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
         for attr, value in (("key", key), ("name", name), ("description", description)):
             if value is not None:
                 setattr(self, attr, value)
+        if retention is not None:
+            self.retention = RetentionPolicy(retention)
+
+    def _retain(
+        self,
+        raw: dict[str, Any],
+        full_object: dict[str, Any] | Callable[[], dict[str, Any]] | None = None,
+        payload: dict[str, Any] | None = None,
+    ) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+        """Apply :attr:`retention` to a response, returning ``(raw, full_object, payload)``.
+
+        ``full_object`` may be a zero-argument callable so that expensive
+        conversions (e.g. :func:`dataclasses.asdict`) only run under
+        :attr:`RetentionPolicy.FULL <merchants.models.RetentionPolicy.FULL>`.
+        """
+        policy = self.retention
+        if policy is RetentionPolicy.NONE:
+            return {}, {}, {}
+        if policy is RetentionPolicy.RAW:
+            return raw, {}, {}
+        if callable(full_object):
+            full_object = full_object()
+        return raw, full_object or {}, payload or {}
+
+    def currency_exponent(self, currency: str) -> int:
+        """Return the number of decimal places this provider uses for ``currency``."""
+        return self.currencies.exponent(currency)
 
     def get_info(self) -> ProviderInfo:
         """Return a :class:`ProviderInfo` populated from this provider's class attributes."""
@@ -114,7 +331,7 @@ class Provider(ABC):
     @abstractmethod
     def create_checkout(
         self,
-        amount: Decimal,
+        amount: Decimal | Money,
         currency: str,
         success_url: str,
         cancel_url: str,
@@ -124,6 +341,9 @@ class Provider(ABC):
         """Create a hosted-checkout session.
 
         Args:
+            amount: A :class:`~decimal.Decimal`, or a
+                :class:`~merchants.amount.Money` in ``currency``.  Convert it
+                with the :mod:`merchants.amount` helpers, which accept both.
             kwargs: Provider-specific keyword arguments (e.g. ``notify_url``).
 
         Returns:
@@ -150,6 +370,20 @@ class Provider(ABC):
             :class:`~merchants.models.WebhookEvent`.
         """
 
+    def get_payment_compact(self, payment_id: str) -> CompactPaymentStatus:
+        """Like :meth:`get_payment`, returning a slotted
+        :class:`~merchants.compact.CompactPaymentStatus`.
+        """
+        return CompactPaymentStatus.from_model(self.get_payment(payment_id))
+
+    def parse_webhook_compact(
+        self, payload: bytes, headers: dict[str, str]
+    ) -> CompactWebhookEvent:
+        """Like :meth:`parse_webhook`, returning a slotted
+        :class:`~merchants.compact.CompactWebhookEvent`.
+        """
+        return CompactWebhookEvent.from_model(self.parse_webhook(payload, headers))
+
 
 # ---------------------------------------------------------------------------
 # Provider registry
@@ -163,14 +397,24 @@ def register_provider(provider: Provider) -> None:
     _REGISTRY[provider.key] = provider
 
 
-def get_provider(key_or_instance: str | Provider) -> Provider:
+def get_provider(
+    key_or_instance: str | Provider,
+    *,
+    tenant: str | None = None,
+    registry: ProviderRegistry | None = None,
+) -> Provider:
     """Return a provider by string key or pass through a Provider instance.
 
+    When ``tenant`` is given, the key is resolved in ``registry`` (default:
+    :func:`get_tenant_registry`) instead of the global registry.
+
     Raises:
         KeyError: If ``key_or_instance`` is a string not found in the registry.
     """
     if isinstance(key_or_instance, Provider):
         return key_or_instance
+    if tenant is not None:
+        return (registry or _TENANT_REGISTRY).get(tenant, key_or_instance)
     try:
         return _REGISTRY[key_or_instance]
     except KeyError:
@@ -195,34 +439,152 @@ def describe_providers() -> list[ProviderInfo]:
 
 
 # ---------------------------------------------------------------------------
-# Normalisation helpers (shared across providers)
+# Per-tenant registry
 # ---------------------------------------------------------------------------
 
-_STATE_MAP: dict[str, PaymentState] = {
-    # Stripe-style
-    "requires_payment_method": PaymentState.PENDING,
-    "requires_confirmation": PaymentState.PENDING,
-    "requires_action": PaymentState.PENDING,
-    "processing": PaymentState.PROCESSING,
-    "succeeded": PaymentState.SUCCEEDED,
-    "canceled": PaymentState.CANCELLED,
-    "cancelled": PaymentState.CANCELLED,
-    "failed": PaymentState.FAILED,
-    # PayPal-style
-    "created": PaymentState.PENDING,
-    "approved": PaymentState.PROCESSING,
-    "completed": PaymentState.SUCCEEDED,
-    "voided": PaymentState.CANCELLED,
-    "refunded": PaymentState.REFUNDED,
-    # Generic
-    "pending": PaymentState.PENDING,
-    "paid": PaymentState.SUCCEEDED,
-    "success": PaymentState.SUCCEEDED,
-    "successful": PaymentState.SUCCEEDED,
-    "error": PaymentState.FAILED,
-}
+#: ``resolver(tenant, provider_key)`` -> a new provider, or ``None`` if the
+#: tenant has no configuration for that provider.
+TenantResolver = Callable[[str, str], Provider | None]
+
+
+class ProviderRegistry:
+    """Provider registry scoped by ``(tenant, provider_key)``.
+
+    Multi-tenant deployments hold one provider instance per merchant account
+    (e.g. one :class:`~merchants.providers.stripe.StripeProvider` per Stripe
+    key), which the global :func:`register_provider` registry cannot express.
+
+    Reads are lock-free: the mapping is replaced wholesale (copy-on-write)
+    under a lock by writers, so :meth:`get` is a single dict lookup on an
+    immutable snapshot.  Providers built lazily by ``resolver`` are evicted
+    least-recently-used once more than ``max_size`` of them are cached;
+    providers added with :meth:`register` are pinned and never evicted.
+    ``resolver`` runs outside the lock, so it may be called more than once
+    for the same key under contention; only the first result is kept.
 
+    Args:
+        resolver: Optional :data:`TenantResolver` used to build providers on
+            first use.  See :func:`merchants.autoload.tenant_resolver_from_config`.
+        max_size: Maximum number of lazily built providers kept alive.
 
-def normalise_state(raw_state: str) -> PaymentState:
-    """Map a provider-specific status string to a :class:`~merchants.models.PaymentState`."""
-    return _STATE_MAP.get(raw_state.lower(), PaymentState.UNKNOWN)
+    Example::
+
+        registry = get_tenant_registry()
+        registry.set_resolver(tenant_resolver_from_config(load_tenant_config))
+
+        client = Client("stripe", tenant="acme")
+    """
+
+    def __init__(
+        self, resolver: TenantResolver | None = None, *, max_size: int = 1024
+    ) -> None:
+        self._resolver = resolver
+        self._max_size = max_size
+        self._entries: dict[tuple[str, str], Provider] = {}
+        self._pinned: frozenset[tuple[str, str]] = frozenset()
+        self._last_used: dict[tuple[str, str], int] = {}
+        self._ticks = itertools.count()
+        self._lock = threading.Lock()
+
+    def set_resolver(self, resolver: TenantResolver | None) -> None:
+        """Install (or clear) the lazy-construction resolver."""
+        self._resolver = resolver
+
+    def register(self, tenant: str, provider: Provider) -> None:
+        """Pin ``provider`` for ``tenant`` under its :attr:`~Provider.key`."""
+        scoped = (tenant, provider.key)
+        with self._lock:
+            entries = dict(self._entries)
+            entries[scoped] = provider
+            self._pinned = self._pinned | {scoped}
+            self._entries = entries
+
+    def unregister(self, tenant: str, key: str) -> bool:
+        """Drop a tenant's provider.  Returns ``True`` if one was present."""
+        scoped = (tenant, key)
+        with self._lock:
+            if scoped not in self._entries:
+                return False
+            entries = dict(self._entries)
+            del entries[scoped]
+            self._pinned = self._pinned - {scoped}
+            self._last_used.pop(scoped, None)
+            self._entries = entries
+            return True
+
+    def get(self, tenant: str, key: str) -> Provider:
+        """Return the provider for ``(tenant, key)``, building it on first use.
+
+        Raises:
+            KeyError: If nothing is registered and the resolver (if any)
+                returns ``None``.
+        """
+        scoped = (tenant, key)
+        provider = self._entries.get(scoped)
+        if provider is None:
+            return self._build(scoped)
+        last_used = self._last_used
+        last_used[scoped] = next(self._ticks)
+        if scoped not in self._entries:
+            # Evicted or unregistered concurrently; do not leak its tick.
+            last_used.pop(scoped, None)
+        return provider
+
+    def _build(self, scoped: tuple[str, str]) -> Provider:
+        # Resolve outside the lock so one slow tenant does not hold up every
+        # other tenant's first request; publish with a double-checked insert.
+        resolver = self._resolver
+        provider = resolver(*scoped) if resolver is not None else None
+        if provider is None:
+            raise KeyError(
+                f"Provider {scoped[1]!r} not available for tenant {scoped[0]!r}."
+            )
+        with self._lock:
+            existing = self._entries.get(scoped)
+            if existing is not None:
+                # Another thread published first; keep a single instance.
+                provider = existing
+            else:
+                entries = dict(self._entries)
+                entries[scoped] = provider
+                self._evict(entries, keep=scoped)
+                self._entries = entries
+            self._last_used[scoped] = next(self._ticks)
+            return provider
+
+    def _evict(
+        self, entries: dict[tuple[str, str], Provider], keep: tuple[str, str]
+    ) -> None:
+        # Caller holds the lock.  Evict a tenth of the cache in one go so the
+        # O(n) scan is amortised over many constructions.  ``keep`` (the entry
+        # being added) is never a candidate.
+        lazy = [k for k in entries if k not in self._pinned]
+        excess = len(lazy) - self._max_size
+        if excess <= 0:
+            return
+        excess += self._max_size // 10
+        last_used = self._last_used
+        candidates = [k for k in lazy if k != keep]
+        for scoped in heapq.nsmallest(
+            excess, candidates, key=lambda k: last_used.get(k, -1)
+        ):
+            del entries[scoped]
+            last_used.pop(scoped, None)
+
+    def tenants(self) -> list[str]:
+        """Return the tenants that currently hold at least one provider."""
+        return sorted({tenant for tenant, _ in self._entries})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, scoped: tuple[str, str]) -> bool:
+        return scoped in self._entries
+
+
+_TENANT_REGISTRY = ProviderRegistry()
+
+
+def get_tenant_registry() -> ProviderRegistry:
+    """Return the process-wide :class:`ProviderRegistry` used by ``tenant=`` lookups."""
+    return _TENANT_REGISTRY
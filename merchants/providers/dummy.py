@@ -8,7 +8,15 @@ import uuid
 from decimal import Decimal
 from typing import Any
 
-from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+    build_webhook_event,
+)
 from merchants.providers import Provider
 
 
@@ -36,6 +44,8 @@ class DummyProvider(Provider):
     version = "2026.3.0"
     description = "Local development provider that returns random data without calling any real API."
     url = ""
+    poll_interval = 0.1
+    poll_max_interval = 1.0
 
     _TERMINAL_STATES = [
         PaymentState.SUCCEEDED,
@@ -62,7 +72,7 @@ class DummyProvider(Provider):
         **kwargs: Any,
     ) -> CheckoutSession:
         session_id = _rand_id("dummy_sess_")
-        return CheckoutSession(
+        return build_checkout_session(
             session_id=session_id,
             redirect_url=f"{self._base_url}/pay/{session_id}?amount={amount}&currency={currency}",
             provider=self.key,
@@ -74,7 +84,7 @@ class DummyProvider(Provider):
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
         state = self._always_state or random.choice(self._TERMINAL_STATES)
-        return PaymentStatus(
+        return build_payment_status(
             payment_id=payment_id,
             state=state,
             provider=self.key,
@@ -88,10 +98,10 @@ class DummyProvider(Provider):
             data: dict[str, Any] = json.loads(payload)
         except ValueError:
             data = {}
-        return WebhookEvent(
-            event_id=data.get("event_id", _rand_id("dummy_evt_")),
-            event_type=data.get("event_type", "payment.simulated"),
-            payment_id=data.get("payment_id", _rand_id("dummy_pay_")),
+        return build_webhook_event(
+            event_id=str(data.get("event_id") or _rand_id("dummy_evt_")),
+            event_type=str(data.get("event_type") or "payment.simulated"),
+            payment_id=str(data.get("payment_id") or _rand_id("dummy_pay_")),
             state=PaymentState.SUCCEEDED,
             provider=self.key,
             raw=data,
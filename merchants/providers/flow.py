@@ -2,16 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from decimal import Decimal
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
-from merchants.amount import to_minor_units
-from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
+from merchants.amount import to_decimal_string, to_minor_units
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+    build_webhook_event,
+)
 from merchants.providers import Provider, UserError
 
 try:
@@ -45,6 +60,16 @@ class FlowProvider(Provider):
         api_url: Override the base URL (default: ``"https://www.flow.cl/api"``).
         subject: Default payment subject / description.
         confirmation_url: URL Flow calls after payment is processed.
+        defer_webhook_status: When ``True``, :meth:`parse_webhook` returns a
+            ``PENDING`` event straight from the token without calling Flow;
+            resolve it later with :meth:`resolve_webhook`,
+            :meth:`resolve_webhook_async` or :meth:`resolve_webhooks`.
+        status_cache_ttl: Seconds to keep final ``getStatus`` results for
+            webhook resolution (``0`` disables the cache).  Non-final states
+            are always fetched fresh.
+        status_cache_size: Maximum number of cached ``getStatus`` results.
+        retention: Override the :attr:`~merchants.providers.Provider.retention`
+            policy for this instance.
     """
 
     key = "flow"
@@ -59,6 +84,9 @@ class FlowProvider(Provider):
         "api_secret": "FLOW_SECRET_KEY",
     }  # nosec B105 -- config key name, not a credential value
     config_optional = {"api_url": "FLOW_API_URL"}
+    # Flow confirms bank transfers in seconds-to-minutes; poll gently.
+    poll_interval = 3.0
+    poll_max_interval = 60.0
 
     def __init__(
         self,
@@ -68,8 +96,13 @@ class FlowProvider(Provider):
         api_url: str = "https://www.flow.cl/api",
         subject: str = "Order",
         confirmation_url: str = "",
+        defer_webhook_status: bool = False,
+        status_cache_ttl: float = 0.0,
+        status_cache_size: int = 1024,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
         logger.debug("flow.py: FlowProvider.__init__ called")
+        super().__init__(retention=retention)
         self._client = ApiClient(
             api_url=api_url,
             api_key=api_key,
@@ -77,6 +110,13 @@ class FlowProvider(Provider):
         )
         self._subject = subject
         self._confirmation_url = confirmation_url
+        self._defer_webhook_status = defer_webhook_status
+        self._status_cache_ttl = status_cache_ttl
+        self._status_cache_size = status_cache_size
+        self._status_cache: OrderedDict[str, tuple[float, PaymentStatus]] = (
+            OrderedDict()
+        )
+        self._status_cache_lock = threading.Lock()
 
     def create_checkout(
         self,
@@ -92,10 +132,15 @@ class FlowProvider(Provider):
             amount,
             currency,
         )
-        # Flow expects integer amounts in CLP
-        amount_int = to_minor_units(amount, decimals=0)
+        # Flow takes amounts in major units: whole pesos for CLP.
+        decimals = self.currency_exponent(currency)
+        amount_value: int | str = (
+            to_minor_units(amount, decimals=0)
+            if decimals == 0
+            else to_decimal_string(amount, decimals=decimals)
+        )
         payment_data: dict[str, Any] = {
-            "amount": amount_int,
+            "amount": amount_value,
             "commerceOrder": (metadata or {}).get("order_id", ""),
             "currency": currency.upper(),
             "subject": self._subject,
@@ -119,16 +164,21 @@ class FlowProvider(Provider):
             if response.url and response.token
             else ""
         )
-        return CheckoutSession(
+        raw, full_object, payload = self._retain(
+            {"token": response.token, "flowOrder": response.flowOrder},
+            lambda: asdict(response),
+            payment_data,
+        )
+        return build_checkout_session(
             session_id=str(response.token or ""),
             redirect_url=redirect_url,
             provider=self.key,
             amount=amount,
             currency=currency,
             metadata=metadata or {},
-            raw={"token": response.token, "flowOrder": response.flowOrder},
-            payload=payment_data,
-            full_object=asdict(response),
+            raw=raw,
+            payload=payload,
+            full_object=full_object,
         )
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
@@ -141,19 +191,54 @@ class FlowProvider(Provider):
             raise UserError(str(exc)) from exc
 
         state = _FLOW_STATE_MAP.get(status.status or 0, PaymentState.UNKNOWN)
-        return PaymentStatus(
+        raw, full_object, _ = self._retain(
+            {
+                "status": status.status,
+                "commerceOrder": status.commerceOrder,
+                "payer": status.payer,
+            },
+            lambda: asdict(status),
+        )
+        payment_status = build_payment_status(
             payment_id=payment_id,
             state=state,
             provider=self.key,
             amount=Decimal(str(status.amount)) if status.amount is not None else None,
             currency=status.currency,
-            raw={
-                "status": status.status,
-                "commerceOrder": status.commerceOrder,
-                "payer": status.payer,
-            },
-            full_object=asdict(status),
+            raw=raw,
+            full_object=full_object,
         )
+        self._cache_status(payment_status)
+        return payment_status
+
+    # ------------------------------------------------------------------
+    # getStatus cache
+    # ------------------------------------------------------------------
+
+    def _cache_status(self, status: PaymentStatus) -> None:
+        # Only final states are safe to reuse: a webhook usually announces a
+        # change, so a cached PENDING snapshot would resolve it to stale data.
+        if self._status_cache_ttl <= 0 or not status.is_final:
+            return
+        expires = time.monotonic() + self._status_cache_ttl
+        with self._status_cache_lock:
+            cache = self._status_cache
+            cache[status.payment_id] = (expires, status)
+            cache.move_to_end(status.payment_id)
+            while len(cache) > self._status_cache_size:
+                cache.popitem(last=False)
+
+    def _cached_status(self, token: str) -> PaymentStatus:
+        if self._status_cache_ttl > 0:
+            with self._status_cache_lock:
+                hit = self._status_cache.get(token)
+            if hit is not None and hit[0] > time.monotonic():
+                return hit[1]
+        return self.get_payment(payment_id=token)
+
+    # ------------------------------------------------------------------
+    # Webhooks
+    # ------------------------------------------------------------------
 
     def parse_webhook(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent:
         logger.debug("flow.py: FlowProvider.parse_webhook called")
@@ -161,7 +246,7 @@ class FlowProvider(Provider):
         token = ""
         try:
             data: dict[str, Any] = json.loads(payload)
-            token = data.get("token", "")
+            token = str(data.get("token") or "")
         except ValueError:
             # form-encoded: token=xxx
             from urllib.parse import parse_qs
@@ -170,25 +255,64 @@ class FlowProvider(Provider):
             token = (qs.get("token") or [""])[0]
             data = {"token": token}
 
-        final_state = PaymentState.PENDING
-        event_type = "Payment.notification"
-        try:
-            payment_info = self.get_payment(payment_id=token)
-            logger.debug(
-                f"flow.py: new {payment_info=} {payment_info.state=} {payment_info.raw=}"
-            )
-            if final_state != payment_info.state:
-                final_state = payment_info.state
-                event_type = "Payment.succeeded"
-                logger.debug(f"flow.py: new {final_state=} and {event_type=}")
-        except Exception as e:
-            logger.warning(e)
-
-        return WebhookEvent(
+        event = build_webhook_event(
             event_id=token or None,
-            event_type=event_type,
+            event_type="Payment.notification",
             payment_id=token or None,
-            state=final_state,
+            state=PaymentState.PENDING,
             provider=self.key,
             raw=data,
         )
+        if self._defer_webhook_status:
+            return event
+        return self.resolve_webhook(event)
+
+    def resolve_webhook(self, event: WebhookEvent) -> WebhookEvent:
+        """Resolve a pending Flow notification into its current payment state.
+
+        This is the second phase of a deferred :meth:`parse_webhook`: it calls
+        Flow's ``getStatus`` (or reuses a cached result) for the event token.
+        Lookup failures are logged and the event is returned unchanged.
+        """
+        if not event.payment_id:
+            return event
+        return self._apply_status(event, self._safe_status(event.payment_id))
+
+    async def resolve_webhook_async(self, event: WebhookEvent) -> WebhookEvent:
+        """Async :meth:`resolve_webhook`; the Flow call runs in a worker thread."""
+        return await asyncio.to_thread(self.resolve_webhook, event)
+
+    def resolve_webhooks(
+        self, events: Iterable[WebhookEvent], *, max_workers: int = 8
+    ) -> list[WebhookEvent]:
+        """Resolve many deferred notifications concurrently, in input order.
+
+        Repeated tokens in the batch cost a single ``getStatus`` call.
+        """
+        events = list(events)
+        tokens = list(dict.fromkeys(e.payment_id for e in events if e.payment_id))
+        if not tokens:
+            return events
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            statuses = dict(zip(tokens, pool.map(self._safe_status, tokens)))
+        return [self._apply_status(e, statuses.get(e.payment_id or "")) for e in events]
+
+    def _safe_status(self, token: str) -> PaymentStatus | None:
+        try:
+            return self._cached_status(token)
+        except Exception as e:
+            logger.warning(e)
+            return None
+
+    @staticmethod
+    def _apply_status(
+        event: WebhookEvent, payment_info: PaymentStatus | None
+    ) -> WebhookEvent:
+        if payment_info is None or payment_info.state == event.state:
+            return event
+        logger.debug(
+            f"flow.py: new {payment_info=} {payment_info.state=} {payment_info.raw=}"
+        )
+        return event.model_copy(
+            update={"state": payment_info.state, "event_type": "Payment.succeeded"}
+        )
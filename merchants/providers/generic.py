@@ -6,9 +6,18 @@ from decimal import Decimal
 from typing import Any
 
 from merchants.amount import to_decimal_string
-from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
-from merchants.providers import Provider, UserError, normalise_state
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+)
+from merchants.providers import Provider, UserError
 from merchants.transport import RequestsTransport, Transport
+from merchants.webhooks.schemas import WebhookSchema
 
 
 class GenericProvider(Provider):
@@ -22,6 +31,8 @@ class GenericProvider(Provider):
         payment_url_template: URL template with ``{payment_id}`` placeholder
             for fetching payment status.
         transport: Optional custom :class:`~merchants.transport.Transport`.
+        retention: Override the :attr:`~merchants.providers.Provider.retention`
+            policy for this instance.
     """
 
     key = "generic"
@@ -32,6 +43,12 @@ class GenericProvider(Provider):
         "Generic REST endpoint provider for custom or in-house payment gateways."
     )
     url = ""
+    webhook_schema = WebhookSchema(
+        event_id="event_id",
+        event_type="event_type",
+        payment_id="payment_id",
+        status="status",
+    )
 
     def __init__(
         self,
@@ -40,7 +57,9 @@ class GenericProvider(Provider):
         *,
         transport: Transport | None = None,
         extra_headers: dict[str, str] | None = None,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
+        super().__init__(retention=retention)
         self._checkout_url = checkout_url
         self._payment_url_template = payment_url_template
         self._transport = transport or RequestsTransport()
@@ -56,7 +75,9 @@ class GenericProvider(Provider):
         **kwargs: Any,
     ) -> CheckoutSession:
         payload: dict[str, Any] = {
-            "amount": to_decimal_string(amount),
+            "amount": to_decimal_string(
+                amount, decimals=self.currency_exponent(currency)
+            ),
             "currency": currency.upper(),
             "success_url": success_url,
             "cancel_url": cancel_url,
@@ -74,14 +95,15 @@ class GenericProvider(Provider):
             )
 
         body: dict[str, Any] = resp.body if isinstance(resp.body, dict) else {}
-        return CheckoutSession(
+        raw, _, _ = self._retain(body)
+        return build_checkout_session(
             session_id=str(body.get("id", "")),
             redirect_url=str(body.get("redirect_url", "")),
             provider=self.key,
             amount=amount,
             currency=currency,
             metadata=metadata or {},
-            raw=body,
+            raw=raw,
         )
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
@@ -89,26 +111,13 @@ class GenericProvider(Provider):
         resp = self._transport.send("GET", url, headers=self._extra_headers)
         body: dict[str, Any] = resp.body if isinstance(resp.body, dict) else {}
         raw_state = str(body.get("status", "unknown"))
-        return PaymentStatus(
+        raw, _, _ = self._retain(body)
+        return build_payment_status(
             payment_id=payment_id,
-            state=normalise_state(raw_state),
+            state=self.states(raw_state),
             provider=self.key,
-            raw=body,
+            raw=raw,
         )
 
     def parse_webhook(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent:
-        import json
-
-        try:
-            data: dict[str, Any] = json.loads(payload)
-        except ValueError:
-            data = {}
-        raw_state = str(data.get("status", "unknown"))
-        return WebhookEvent(
-            event_id=data.get("event_id"),
-            event_type=str(data.get("event_type", "unknown")),
-            payment_id=data.get("payment_id"),
-            state=normalise_state(raw_state),
-            provider=self.key,
-            raw=data,
-        )
+        return self.webhook_schema.parse(payload, provider=self.key)
@@ -1,4 +1,4 @@
-"""Khipu provider - wraps the ``khipu-tools`` package."""
+"""Khipu provider - Khipu v3 REST API over a pluggable transport."""
 
 from __future__ import annotations
 
@@ -11,16 +11,26 @@ logger = logging.getLogger(__name__)
 
 from merchants.amount import to_decimal_string
 from merchants.auth import ApiKeyAuth
-from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+    build_webhook_event,
+)
 from merchants.providers import Provider, UserError
-from merchants.webhooks import WebhookVerificationError, verify_khipu_signature
+from merchants.transport import RequestsTransport, Transport
+from merchants.webhooks import (
+    ReplayGuard,
+    WebhookVerificationError,
+    verify_khipu_signature,
+)
 
-try:
-    import khipu_tools
-except ImportError as exc:  # pragma: no cover
-    raise ImportError(
-        "khipu-tools is required for KhipuProvider. Install it with: pip install khipu-tools"
-    ) from exc
+#: Base URL of the Khipu v3 payment API.
+KHIPU_API_BASE = "https://payment-api.khipu.com"
 
 # Khipu payment statuses
 _KHIPU_STATE_MAP: dict[str, PaymentState] = {
@@ -36,25 +46,40 @@ _KHIPU_STATE_MAP: dict[str, PaymentState] = {
 class KhipuProvider(Provider):
     """Khipu payment provider.
 
-    Uses the ``khipu-tools`` package to create and query payments on
-    `Khipu <https://khipu.com>`_.
+    Creates and queries payments on `Khipu <https://khipu.com>`_ via the v3
+    REST API.  Every instance talks through its own
+    :class:`~merchants.transport.Transport` with its own ``x-api-key``
+    header, so several receivers can be served concurrently from one
+    process.  No Khipu SDK is required.
 
     Args:
         api_key: Khipu receiver API key.
         subject: Default payment subject / description sent to Khipu.
         notify_url: Webhook URL Khipu will call when the payment is confirmed.
+        webhook_secret: Receiver secret used to verify ``x-khipu-signature``.
+        replay_guard: Optional :class:`~merchants.webhooks.ReplayGuard` that
+            rejects stale or replayed webhooks after signature verification.
+        base_url: Override for testing; defaults to :data:`KHIPU_API_BASE`.
+        transport: Optional custom transport (pooled :class:`RequestsTransport`
+            by default).
+        retention: Override the :attr:`~merchants.providers.Provider.retention`
+            policy for this instance.
     """
 
     key = "khipu"
     name = "Khipu"
     author = "mariofix"
     version = "2016.3.0"
-    description = "Khipu payment gateway for Chile, powered by khipu-tools."
+    description = "Khipu payment gateway for Chile."
     url = "https://khipu.com"
     accepts_notify_url = "notify_url"
     config_required = {
         "api_key": "KHIPU_API_KEY"
     }  # nosec B105 -- config key name, not a credential value
+    # Khipu payments go through a bank transfer; "verifying" can last minutes.
+    poll_interval = 3.0
+    poll_max_interval = 60.0
+    state_mapping = _KHIPU_STATE_MAP
 
     def __init__(
         self,
@@ -66,19 +91,40 @@ class KhipuProvider(Provider):
         subject: str = "Order",
         notify_url: str = "",
         webhook_secret: str = "",
+        replay_guard: ReplayGuard | None = None,
+        base_url: str = KHIPU_API_BASE,
+        transport: Transport | None = None,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
         logger.debug("khipu.py: KhipuProvider.__init__ called")
-        super().__init__(key=key, name=name, description=description)
+        super().__init__(
+            key=key, name=name, description=description, retention=retention
+        )
         self._api_key = api_key
-        # khipu_tools uses a Stripe-style global api_key. This is safe for
-        # single-provider deployments; if multiple KhipuProvider instances with
-        # different keys are ever needed, use per-request KhipuClient instances.
-        khipu_tools.api_key = api_key
-        self._base_url = khipu_tools.DEFAULT_API_BASE
+        self._base_url = base_url.rstrip("/")
+        self._transport = transport or RequestsTransport()
         self._auth = ApiKeyAuth(api_key, header="x-api-key")
         self._subject = subject
         self._notify_url = notify_url
         self._webhook_secret = webhook_secret
+        self._replay_guard = replay_guard
+
+    def _request(
+        self, method: str, path: str, json: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        resp = self._transport.send(
+            method,
+            f"{self._base_url}{path}",
+            headers=self._auth.apply({"Content-Type": "application/json"}),
+            json=json,
+        )
+        body: dict[str, Any] = resp.body if isinstance(resp.body, dict) else {}
+        if not resp.ok:
+            raise UserError(
+                str(body.get("message") or f"Khipu error {resp.status_code}"),
+                code=str(resp.status_code),
+            )
+        return body
 
     def create_checkout(
         self,
@@ -95,7 +141,9 @@ class KhipuProvider(Provider):
             currency,
         )
         params: dict[str, Any] = {
-            "amount": to_decimal_string(amount),
+            "amount": to_decimal_string(
+                amount, decimals=self.currency_exponent(currency)
+            ),
             "currency": currency.upper(),
             "subject": self._subject,
             "return_url": success_url,
@@ -118,47 +166,43 @@ class KhipuProvider(Provider):
             params["body"] = body
 
         logger.debug("khipu.py: KhipuProvider.create_checkout params=%r", params)
-        try:
-            result = khipu_tools.Payments.create(**params)
-        except Exception as exc:
-            raise UserError(str(exc)) from exc
+        result = self._request("POST", "/v3/payments", json=params)
 
         logger.debug("khipu.py: KhipuProvider.create_checkout result=%r", result)
         payment_url = result.get("payment_url", "")
         payment_id = result.get("payment_id", "")
-        return CheckoutSession(
+        raw, full_object, payload = self._retain(result, result, params)
+        return build_checkout_session(
             session_id=str(payment_id),
             redirect_url=str(payment_url),
             provider=self.key,
             amount=amount,
             currency=currency,
             metadata=metadata or {},
-            raw=dict(result),
-            payload=params,
-            full_object=result,
+            raw=raw,
+            payload=payload,
+            full_object=full_object,
         )
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
         logger.debug(
             "khipu.py: KhipuProvider.get_payment called with payment_id=%s", payment_id
         )
-        try:
-            result = khipu_tools.Payments.get(payment_id=payment_id)
-        except Exception as exc:
-            raise UserError(str(exc)) from exc
+        result = self._request("GET", f"/v3/payments/{payment_id}")
 
         raw_state = str(result.get("status", "pending"))
-        state = _KHIPU_STATE_MAP.get(raw_state.lower(), PaymentState.UNKNOWN)
+        state = self.states(raw_state)
         amount_val = result.get("amount")
         currency = result.get("currency")
-        return PaymentStatus(
+        raw, full_object, _ = self._retain(result, result)
+        return build_payment_status(
             payment_id=payment_id,
             state=state,
             provider=self.key,
             amount=Decimal(str(amount_val)) if amount_val is not None else None,
             currency=currency,
-            raw=dict(result),
-            full_object=result,
+            raw=raw,
+            full_object=full_object,
         )
 
     def parse_webhook(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent:
@@ -190,7 +234,12 @@ class KhipuProvider(Provider):
             "x-khipu-signature", ""
         )
         if self._webhook_secret and sig_header:
-            verify_khipu_signature(payload, self._webhook_secret, sig_header)
+            verify_khipu_signature(
+                payload,
+                self._webhook_secret,
+                sig_header,
+                replay_guard=self._replay_guard,
+            )
         elif self._webhook_secret and not sig_header:
             raise WebhookVerificationError(
                 "Webhook secret is configured but x-khipu-signature header is missing."
@@ -205,6 +254,8 @@ class KhipuProvider(Provider):
             data = {k: v[0] for k, v in qs.items()}
 
         payment_id = data.get("payment_id")
+        if payment_id is not None:
+            payment_id = str(payment_id)
 
         # v3.0: determine state from conciliation_date presence
         # If conciliation_date is present and non-empty, the payment is reconciled (succeeded).
@@ -214,13 +265,13 @@ class KhipuProvider(Provider):
             event_type = "payment.succeeded"
         elif "payment_status" in data:
             raw_state = str(data["payment_status"])
-            state = _KHIPU_STATE_MAP.get(raw_state.lower(), PaymentState.UNKNOWN)
+            state = self.states(raw_state)
             event_type = "payment.notification"
         else:
             state = PaymentState.UNKNOWN
             event_type = "payment.notification"
 
-        return WebhookEvent(
+        return build_webhook_event(
             event_id=payment_id,
             event_type=event_type,
             payment_id=payment_id,
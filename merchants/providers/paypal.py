@@ -2,14 +2,38 @@
 
 from __future__ import annotations
 
-import json
 from decimal import Decimal
 from typing import Any
 
 from merchants.amount import to_decimal_string
-from merchants.models import CheckoutSession, PaymentStatus, WebhookEvent
-from merchants.providers import Provider, UserError, normalise_state
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+)
+from merchants.providers import _STATE_MAP, Provider, UserError
 from merchants.transport import RequestsTransport, Transport
+from merchants.webhooks.schemas import WebhookSchema
+
+# Order and capture statuses, on top of the shared table so generic statuses
+# such as "paid" or "refunded" (e.g. on invoice events) keep mapping.
+_PAYPAL_STATE_MAP: dict[str, PaymentState] = {
+    **_STATE_MAP,
+    "created": PaymentState.PENDING,
+    "saved": PaymentState.PENDING,
+    "payer_action_required": PaymentState.PENDING,
+    "pending": PaymentState.PENDING,
+    "approved": PaymentState.PROCESSING,
+    "completed": PaymentState.SUCCEEDED,
+    "voided": PaymentState.CANCELLED,
+    "declined": PaymentState.FAILED,
+    "failed": PaymentState.FAILED,
+    "refunded": PaymentState.REFUNDED,
+}
 
 
 class PayPalProvider(Provider):
@@ -28,6 +52,8 @@ class PayPalProvider(Provider):
         access_token: OAuth access token.
         base_url: Override for testing; defaults to ``"https://api-m.paypal.com"``.
         transport: Optional custom transport.
+        retention: Override the :attr:`~merchants.providers.Provider.retention`
+            policy for this instance.
     """
 
     key = "paypal"
@@ -41,6 +67,15 @@ class PayPalProvider(Provider):
     config_required = {
         "access_token": "PAYPAL_ACCESS_TOKEN"
     }  # nosec B105 -- config key name, not a credential value
+    # PayPal does not accept decimals for these currencies.
+    currency_overrides = {"HUF": 0, "TWD": 0}
+    state_mapping = _PAYPAL_STATE_MAP
+    webhook_schema = WebhookSchema(
+        event_id="id",
+        event_type="event_type",
+        payment_id="resource.id",
+        status="resource.status",
+    )
 
     def __init__(
         self,
@@ -48,7 +83,9 @@ class PayPalProvider(Provider):
         base_url: str = "https://api-m.paypal.com",
         *,
         transport: Transport | None = None,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
+        super().__init__(retention=retention)
         self._access_token = access_token
         self._base_url = base_url.rstrip("/")
         self._transport = transport or RequestsTransport()
@@ -74,7 +111,9 @@ class PayPalProvider(Provider):
                 {
                     "amount": {
                         "currency_code": currency.upper(),
-                        "value": to_decimal_string(amount),
+                        "value": to_decimal_string(
+                            amount, decimals=self.currency_exponent(currency)
+                        ),
                     }
                 }
             ],
@@ -105,14 +144,15 @@ class PayPalProvider(Provider):
                 redirect_url = link.get("href", "")
                 break
 
-        return CheckoutSession(
+        raw, _, _ = self._retain(body)
+        return build_checkout_session(
             session_id=str(body.get("id", "")),
             redirect_url=redirect_url,
             provider=self.key,
             amount=amount,
             currency=currency,
             metadata=metadata or {},
-            raw=body,
+            raw=raw,
         )
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
@@ -128,29 +168,15 @@ class PayPalProvider(Provider):
         currency = amount_info.get("currency_code")
         amount_val = amount_info.get("value")
         amount_decimal = Decimal(str(amount_val)) if amount_val is not None else None
-        return PaymentStatus(
+        raw, _, _ = self._retain(body)
+        return build_payment_status(
             payment_id=payment_id,
-            state=normalise_state(raw_state),
+            state=self.states(raw_state),
             provider=self.key,
             amount=amount_decimal,
             currency=currency,
-            raw=body,
+            raw=raw,
         )
 
     def parse_webhook(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent:
-        try:
-            data: dict[str, Any] = json.loads(payload)
-        except ValueError:
-            data = {}
-        event_type = str(data.get("event_type", "unknown"))
-        resource = data.get("resource", {})
-        raw_state = str(resource.get("status", "unknown"))
-        payment_id = resource.get("id")
-        return WebhookEvent(
-            event_id=data.get("id"),
-            event_type=event_type,
-            payment_id=payment_id,
-            state=normalise_state(raw_state),
-            provider=self.key,
-            raw=data,
-        )
+        return self.webhook_schema.parse(payload, provider=self.key)
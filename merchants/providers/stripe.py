@@ -2,28 +2,35 @@
 
 from __future__ import annotations
 
-import json
 from decimal import Decimal
 from typing import Any
 
 from merchants.amount import from_minor_units, to_minor_units
-from merchants.models import CheckoutSession, PaymentStatus, WebhookEvent
-from merchants.providers import Provider, UserError, normalise_state
+from merchants.models import (
+    CheckoutSession,
+    PaymentState,
+    PaymentStatus,
+    RetentionPolicy,
+    WebhookEvent,
+    build_checkout_session,
+    build_payment_status,
+)
+from merchants.providers import _STATE_MAP, Provider, UserError
 from merchants.transport import RequestsTransport, Transport
-
-# Stripe uses 2 decimal places for most currencies (0 for JPY, etc.)
-_ZERO_DECIMAL_CURRENCIES = {
-    "jpy",
-    "bif",
-    "clp",
-    "gnf",
-    "mga",
-    "pyg",
-    "rwf",
-    "ugx",
-    "vnd",
-    "xaf",
-    "xof",
+from merchants.webhooks.schemas import WebhookSchema
+
+# PaymentIntent and Charge statuses, on top of the shared table so generic statuses
+# such as "paid" or "refunded" (e.g. on invoice events) keep mapping.
+_STRIPE_STATE_MAP: dict[str, PaymentState] = {
+    **_STATE_MAP,
+    "requires_payment_method": PaymentState.PENDING,
+    "requires_confirmation": PaymentState.PENDING,
+    "requires_action": PaymentState.PENDING,
+    "pending": PaymentState.PENDING,
+    "processing": PaymentState.PROCESSING,
+    "succeeded": PaymentState.SUCCEEDED,
+    "canceled": PaymentState.CANCELLED,
+    "failed": PaymentState.FAILED,
 }
 
 
@@ -43,6 +50,8 @@ class StripeProvider(Provider):
         api_key: Stripe secret key (``sk_test_…``).
         base_url: Override for testing; defaults to ``"https://api.stripe.com"``.
         transport: Optional custom transport.
+        retention: Override the :attr:`~merchants.providers.Provider.retention`
+            policy for this instance.
     """
 
     key = "stripe"
@@ -54,6 +63,15 @@ class StripeProvider(Provider):
     config_required = {
         "api_key": "STRIPE_API_KEY"
     }  # nosec B105 -- config key name, not a credential value
+    # Stripe charges MGA in whole units and keeps ISK in two-decimal form.
+    currency_overrides = {"MGA": 0, "ISK": 2}
+    state_mapping = _STRIPE_STATE_MAP
+    webhook_schema = WebhookSchema(
+        event_id="id",
+        event_type="type",
+        payment_id=("data.object.id", "data.object.payment_intent"),
+        status="data.object.status",
+    )
 
     def __init__(
         self,
@@ -61,7 +79,9 @@ class StripeProvider(Provider):
         base_url: str = "https://api.stripe.com",
         *,
         transport: Transport | None = None,
+        retention: RetentionPolicy | str | None = None,
     ) -> None:
+        super().__init__(retention=retention)
         self._api_key = api_key
         self._base_url = base_url.rstrip("/")
         self._transport = transport or RequestsTransport()
@@ -69,9 +89,6 @@ class StripeProvider(Provider):
     def _headers(self) -> dict[str, str]:
         return {"Authorization": f"Bearer {self._api_key}"}
 
-    def _currency_decimals(self, currency: str) -> int:
-        return 0 if currency.lower() in _ZERO_DECIMAL_CURRENCIES else 2
-
     def create_checkout(
         self,
         amount: Decimal,
@@ -81,7 +98,7 @@ class StripeProvider(Provider):
         metadata: dict[str, Any] | None = None,
         **kwargs: Any,
     ) -> CheckoutSession:
-        decimals = self._currency_decimals(currency)
+        decimals = self.currency_exponent(currency)
         unit_amount = to_minor_units(amount, decimals=decimals)
         payload: dict[str, Any] = {
             "payment_method_types": ["card"],
@@ -118,14 +135,15 @@ class StripeProvider(Provider):
             )
 
         body: dict[str, Any] = resp.body if isinstance(resp.body, dict) else {}
-        return CheckoutSession(
+        raw, _, _ = self._retain(body)
+        return build_checkout_session(
             session_id=str(body.get("id", "")),
             redirect_url=str(body.get("url", "")),
             provider=self.key,
             amount=amount,
             currency=currency,
             metadata=metadata or {},
-            raw=body,
+            raw=raw,
         )
 
     def get_payment(self, payment_id: str) -> PaymentStatus:
@@ -138,35 +156,21 @@ class StripeProvider(Provider):
         raw_state = str(body.get("status", "unknown"))
         currency = str(body.get("currency", ""))
         amount_minor = body.get("amount")
-        decimals = self._currency_decimals(currency)
+        decimals = self.currency_exponent(currency)
         amount_decimal = (
             from_minor_units(int(amount_minor), decimals=decimals)
             if amount_minor is not None
             else None
         )
-        return PaymentStatus(
+        raw, _, _ = self._retain(body)
+        return build_payment_status(
             payment_id=payment_id,
-            state=normalise_state(raw_state),
+            state=self.states(raw_state),
             provider=self.key,
             amount=amount_decimal,
             currency=currency or None,
-            raw=body,
+            raw=raw,
         )
 
     def parse_webhook(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent:
-        try:
-            data: dict[str, Any] = json.loads(payload)
-        except ValueError:
-            data = {}
-        event_type = str(data.get("type", "unknown"))
-        obj = data.get("data", {}).get("object", {})
-        raw_state = str(obj.get("status", "unknown"))
-        payment_id = obj.get("id") or obj.get("payment_intent")
-        return WebhookEvent(
-            event_id=data.get("id"),
-            event_type=event_type,
-            payment_id=payment_id,
-            state=normalise_state(raw_state),
-            provider=self.key,
-            raw=data,
-        )
+        return self.webhook_schema.parse(payload, provider=self.key)
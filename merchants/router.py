@@ -0,0 +1,277 @@
+"""Multi-provider routing with latency-aware failover.
+
+:class:`RoutingClient` spreads hosted-checkout creation across several
+registered providers.  Each :class:`Route` declares the currencies and amount
+range it accepts plus a static weight; at call time the eligible routes are
+ranked by live EWMA latency and error-rate statistics and tried in order,
+failing over on :class:`~merchants.transport.TransportError` or a provider
+5xx (:class:`~merchants.providers.UserError` with a ``5xx`` code).
+
+Usage::
+
+    from merchants.router import Route, RoutingClient
+
+    router = RoutingClient(
+        [
+            Route("flow", currencies={"CLP"}),
+            Route("khipu", currencies={"CLP"}, max_amount=Decimal("5000000")),
+            Route("stripe", weight=2.0),
+            Route("paypal"),
+        ]
+    )
+    session = router.create_checkout("19.99", "USD", success_url, cancel_url)
+    status = router.get(session.session_id, provider=session.provider)
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections.abc import Callable, Iterable
+from decimal import Decimal
+from typing import Any
+
+from merchants.amount import Money, _checkout_amount
+from merchants.models import CheckoutSession, PaymentStatus
+from merchants.providers import Provider, UserError, get_provider
+from merchants.transport import TransportError
+
+
+@dataclasses.dataclass(frozen=True)
+class Route:
+    """A provider eligible for routing, with its constraints.
+
+    Attributes:
+        provider: Provider instance or registered provider key.
+        weight: Relative preference; higher weights win ties on latency.
+        currencies: ISO-4217 codes this route accepts (any when ``None``).
+        min_amount: Smallest accepted amount (inclusive).
+        max_amount: Largest accepted amount (inclusive).
+    """
+
+    provider: Provider | str
+    weight: float = 1.0
+    currencies: frozenset[str] | None = None
+    min_amount: Decimal | None = None
+    max_amount: Decimal | None = None
+
+    def __post_init__(self) -> None:
+        if self.weight <= 0:
+            raise ValueError("Route weight must be positive.")
+        if self.currencies is not None:
+            object.__setattr__(
+                self, "currencies", frozenset(c.upper() for c in self.currencies)
+            )
+
+    def accepts(self, amount: Decimal, currency: str) -> bool:
+        """Return ``True`` if this route can take ``amount`` in ``currency``."""
+        if self.currencies is not None and currency.upper() not in self.currencies:
+            return False
+        if self.min_amount is not None and amount < self.min_amount:
+            return False
+        if self.max_amount is not None and amount > self.max_amount:
+            return False
+        return True
+
+
+@dataclasses.dataclass
+class RouteStats:
+    """Live health statistics for one routed provider.
+
+    Attributes:
+        latency: EWMA of call latency in seconds (``None`` until first call).
+        error_rate: EWMA of the failure indicator (0.0 healthy - 1.0 failing).
+        calls: Total number of calls attempted.
+        failures: Total number of calls that failed over.
+        last_failure: Clock reading of the most recent failure, if any.
+    """
+
+    latency: float | None = None
+    error_rate: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    last_failure: float | None = None
+
+
+def _is_failover_error(exc: Exception) -> bool:
+    if isinstance(exc, TransportError):
+        return True
+    return isinstance(exc, UserError) and bool(exc.code) and exc.code.startswith("5")
+
+
+class RoutingClient:
+    """Route checkouts across providers by health and latency.
+
+    Eligible routes (those whose :meth:`Route.accepts` matches the call) are
+    ordered by ``latency * (1 + error_penalty * error_rate) / weight``.
+    Routes that have never been called score zero so they get probed first,
+    and routes whose error rate exceeds ``unhealthy_threshold`` are demoted
+    to the end of the list for ``cooldown`` seconds after their last failure.
+
+    Args:
+        routes: Candidate routes in order of preference (used as tie-breaker).
+        alpha: EWMA smoothing factor in ``(0, 1]``; higher reacts faster.
+        error_penalty: How strongly the error rate inflates a route's score.
+        unhealthy_threshold: Error rate above which a route is demoted.
+        cooldown: Seconds a demoted route stays at the back of the queue.
+        clock: Monotonic clock, overridable for tests.
+
+    Raises:
+        ValueError: If ``routes`` is empty.
+    """
+
+    def __init__(
+        self,
+        routes: Iterable[Route | Provider | str],
+        *,
+        alpha: float = 0.2,
+        error_penalty: float = 10.0,
+        unhealthy_threshold: float = 0.5,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._routes: list[tuple[Route, Provider]] = []
+        for route in routes:
+            if not isinstance(route, Route):
+                route = Route(route)
+            self._routes.append((route, get_provider(route.provider)))
+        if not self._routes:
+            raise ValueError("RoutingClient needs at least one route.")
+        self._providers = {p.key: p for _, p in self._routes}
+        self._stats = {p.key: RouteStats() for _, p in self._routes}
+        self._alpha = alpha
+        self._error_penalty = error_penalty
+        self._unhealthy_threshold = unhealthy_threshold
+        self._cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, RouteStats]:
+        """Return a snapshot of the per-provider statistics."""
+        with self._lock:
+            return {k: dataclasses.replace(s) for k, s in self._stats.items()}
+
+    def _record(self, key: str, elapsed: float, failed: bool) -> None:
+        alpha = self._alpha
+        with self._lock:
+            s = self._stats[key]
+            s.calls += 1
+            s.latency = (
+                elapsed
+                if s.latency is None
+                else s.latency + alpha * (elapsed - s.latency)
+            )
+            s.error_rate += alpha * ((1.0 if failed else 0.0) - s.error_rate)
+            if failed:
+                s.failures += 1
+                s.last_failure = self._clock()
+
+    def _rank(self, amount: Decimal, currency: str) -> list[Provider]:
+        now = self._clock()
+        ranked: list[tuple[bool, float, int, Provider]] = []
+        with self._lock:
+            for index, (route, provider) in enumerate(self._routes):
+                if not route.accepts(amount, currency):
+                    continue
+                s = self._stats[provider.key]
+                demoted = (
+                    s.error_rate > self._unhealthy_threshold
+                    and s.last_failure is not None
+                    and now - s.last_failure < self._cooldown
+                )
+                score = (s.latency or 0.0) * (1.0 + self._error_penalty * s.error_rate)
+                ranked.append((demoted, score / route.weight, index, provider))
+        ranked.sort(key=lambda item: item[:3])
+        return [provider for *_, provider in ranked]
+
+    def candidates(
+        self, amount: Money | Decimal | int | float | str, currency: str
+    ) -> list[Provider]:
+        """Return the eligible providers for a call, best first."""
+        amount = _checkout_amount(amount, currency)
+        return self._rank(
+            amount.amount if isinstance(amount, Money) else amount, currency
+        )
+
+    # ------------------------------------------------------------------
+    # Payments API
+    # ------------------------------------------------------------------
+
+    def create_checkout(
+        self,
+        amount: Money | Decimal | int | float | str,
+        currency: str,
+        success_url: str,
+        cancel_url: str,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> CheckoutSession:
+        """Create a hosted-checkout session on the best available provider.
+
+        Arguments mirror :meth:`merchants.client.PaymentsResource.create_checkout`.
+        ``session.provider`` tells which provider served the call.
+
+        Raises:
+            :class:`~merchants.providers.UserError`: If no route accepts the
+                amount/currency (``code="no_route"``) or a provider rejects
+                the request with a non-5xx error.
+            :class:`~merchants.transport.TransportError`: If every eligible
+                provider failed at the network level.
+        """
+        amount = _checkout_amount(amount, currency)
+        providers = self._rank(
+            amount.amount if isinstance(amount, Money) else amount, currency
+        )
+        if not providers:
+            raise UserError(
+                f"No route accepts {amount} {currency.upper()}.", code="no_route"
+            )
+        last_exc: Exception | None = None
+        for provider in providers:
+            started = time.perf_counter()
+            try:
+                session = provider.create_checkout(
+                    amount, currency, success_url, cancel_url, metadata, **kwargs
+                )
+            except Exception as exc:
+                if not _is_failover_error(exc):
+                    raise
+                self._record(provider.key, time.perf_counter() - started, True)
+                last_exc = exc
+                continue
+            self._record(provider.key, time.perf_counter() - started, False)
+            return session
+        assert last_exc is not None
+        raise last_exc
+
+    def get(self, payment_id: str, provider: str) -> PaymentStatus:
+        """Retrieve a payment from the routed provider that created it.
+
+        Args:
+            payment_id: Provider-specific payment / session identifier.
+            provider: The provider key, typically ``session.provider``.
+
+        Raises:
+            KeyError: If ``provider`` is not one of this router's routes.
+        """
+        try:
+            target = self._providers[provider]
+        except KeyError:
+            raise KeyError(
+                f"Provider {provider!r} is not routed. "
+                f"Available: {list(self._providers)}"
+            ) from None
+        started = time.perf_counter()
+        try:
+            status = target.get_payment(payment_id)
+        except Exception as exc:
+            if _is_failover_error(exc):
+                self._record(provider, time.perf_counter() - started, True)
+            raise
+        self._record(provider, time.perf_counter() - started, False)
+        return status
@@ -2,7 +2,10 @@
 
 This package provides :func:`pydantic_mixin_from_model` and
 :class:`PydanticToSAMixinConfig` for generating SQLAlchemy 2.0 typed mixin
-classes from Pydantic v2 ``BaseModel`` schemas.
+classes from Pydantic v2 ``BaseModel`` schemas,
+:class:`SQLAlchemyDedupStore` for persisting webhook de-duplication keys, and
+:func:`upsert_payments` / :func:`apply_status_updates` for writing payment
+batches in a few statements.
 
 Requires SQLAlchemy >= 2.0 (install via ``pip install merchants-sdk[sqlalchemy]``).
 
@@ -13,6 +16,8 @@ Typical usage::
 
 from __future__ import annotations
 
+from merchants.sqlalchemy.bulk import apply_status_updates, upsert_payments
+from merchants.sqlalchemy.dedup import SQLAlchemyDedupStore
 from merchants.sqlalchemy.mixins import (
     PydanticToSAMixinConfig,
     pydantic_mixin_from_model,
@@ -20,5 +25,8 @@ from merchants.sqlalchemy.mixins import (
 
 __all__ = [
     "PydanticToSAMixinConfig",
+    "SQLAlchemyDedupStore",
+    "apply_status_updates",
     "pydantic_mixin_from_model",
+    "upsert_payments",
 ]
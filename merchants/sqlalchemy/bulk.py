@@ -0,0 +1,353 @@
+"""Bulk writes for ORM models built from :class:`~merchants.models.PaymentModel`.
+
+Persisting webhook traffic one ORM object at a time costs a round trip (and
+usually a ``SELECT``) per event.  The helpers here write a whole batch in a
+handful of statements:
+
+- :func:`upsert_payments` inserts or updates full payment records with
+  ``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and SQLite.
+- :func:`apply_status_updates` moves existing payments to the states
+  reported by :class:`~merchants.models.PaymentStatus` /
+  :class:`~merchants.models.WebhookEvent` objects with one ``UPDATE`` per
+  batch, applying only legal transitions (see :mod:`merchants.states`).
+
+Both return the rows they changed, using ``RETURNING`` where the database
+supports it.  Neither commits; run them inside your own transaction.
+
+Usage::
+
+    from merchants.sqlalchemy import apply_status_updates
+
+    with engine.begin() as conn:
+        changed = apply_status_updates(conn, Payment, events)
+    for row in changed:
+        notify(row.merchants_id, row.state)
+
+.. note::
+    This module requires **SQLAlchemy >= 2.0** to be installed.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from itertools import islice
+from typing import Any, TypeVar
+
+try:
+    import sqlalchemy as sa
+    import sqlalchemy.orm as sa_orm
+    from sqlalchemy.dialects import postgresql, sqlite
+except ImportError as exc:
+    raise ImportError(
+        "SQLAlchemy >= 2.0 is required for merchants.sqlalchemy. "
+        "Install it with: pip install merchants-sdk[sqlalchemy]"
+    ) from exc
+
+from merchants.compact import CompactPaymentStatus, CompactWebhookEvent
+from merchants.models import PaymentModel, PaymentState, PaymentStatus, WebhookEvent
+from merchants.states import RANK, can_transition
+
+_Executor = sa.Connection | sa_orm.Session
+_StatusUpdate = (
+    PaymentStatus | WebhookEvent | CompactPaymentStatus | CompactWebhookEvent
+)
+
+_T = TypeVar("_T")
+
+_ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _batches(items: Iterable[_T], size: int) -> Iterator[list[_T]]:
+    if size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _table(model: Any) -> sa.Table:
+    """Return the table behind a mapped class (or a :class:`~sqlalchemy.Table`)."""
+    return model if isinstance(model, sa.Table) else sa.inspect(model).local_table
+
+
+def _dialect(executor: _Executor) -> sa.Dialect:
+    if isinstance(executor, sa_orm.Session):
+        return executor.get_bind().dialect
+    return executor.dialect
+
+
+def _rows_for(
+    executor: _Executor, table: sa.Table, key: sa.Column, keys: Sequence[Any]
+) -> list[sa.Row]:
+    return list(executor.execute(sa.select(table).where(key.in_(keys))))
+
+
+# ---------------------------------------------------------------------------
+# Full-record upserts
+# ---------------------------------------------------------------------------
+
+
+def _record(
+    payment: PaymentModel | Mapping[str, Any], columns: set[str]
+) -> dict[str, Any]:
+    data = payment.model_dump() if isinstance(payment, PaymentModel) else payment
+    return {name: value for name, value in data.items() if name in columns}
+
+
+def upsert_payments(
+    executor: _Executor,
+    model: Any,
+    payments: Iterable[PaymentModel | Mapping[str, Any]],
+    *,
+    key: str = "merchants_id",
+    update: Iterable[str] | None = None,
+    batch_size: int = 500,
+) -> list[sa.Row]:
+    """Insert or update payment records in batches.
+
+    On PostgreSQL and SQLite each batch is a single multi-row
+    ``INSERT ... ON CONFLICT (key) DO UPDATE ... RETURNING``.  Other
+    databases get a ``SELECT`` of the existing keys, one ``INSERT`` for the
+    new rows and one executemany ``UPDATE`` for the rest.
+
+    Args:
+        executor: A :class:`~sqlalchemy.Connection` or
+            :class:`~sqlalchemy.orm.Session`.  The caller commits.
+        model: Mapped class built from
+            ``pydantic_mixin_from_model(PaymentModel)`` (or its
+            :class:`~sqlalchemy.Table`).
+        payments: :class:`~merchants.models.PaymentModel` instances or
+            mappings of column values.  Every mapping in a batch must have
+            the same keys.  When a batch repeats a ``key``, the last record
+            wins.
+        key: Unique column identifying a payment: ``"merchants_id"`` or
+            ``"transaction_id"``.  Every record must have a value for it.
+        update: Columns to overwrite on existing rows (default: every
+            supplied column except ``key``).  Pass ``()`` to leave existing
+            rows untouched.
+        batch_size: Records per statement.
+
+    Returns:
+        The inserted and updated rows, with every column of the table.
+
+    Raises:
+        ValueError: If ``batch_size`` is less than 1, or a record has no
+            ``key`` value (it could not be matched to an existing row).
+            Batches before the offending one have already been written;
+            roll back the transaction.
+    """
+    table = _table(model)
+    key_col = table.c[key]
+    dialect = _dialect(executor)
+    insert = _ON_CONFLICT_INSERTS.get(dialect.name)
+    columns = set(table.c.keys())
+    if update is not None:
+        update = tuple(update)
+    written: list[sa.Row] = []
+
+    for batch in _batches(payments, batch_size):
+        # A multi-row ON CONFLICT may not touch one row twice; last one wins.
+        deduped: dict[Any, dict[str, Any]] = {}
+        for row in (_record(p, columns) for p in batch):
+            if row.get(key) is None:
+                raise ValueError(f"Cannot upsert a payment without a {key!r} value")
+            deduped[row[key]] = row
+        values = list(deduped.values())
+        targets = [
+            name for name in (values[0] if update is None else update) if name != key
+        ]
+        keys = [row[key] for row in values]
+
+        if insert is not None:
+            stmt = insert(table).values(values)
+            if targets:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key_col],
+                    set_={name: stmt.excluded[name] for name in targets},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[key_col])
+            if dialect.insert_returning:
+                written.extend(executor.execute(stmt.returning(*table.c)))
+                continue
+            executor.execute(stmt)
+        else:
+            existing = set(
+                executor.execute(
+                    sa.select(key_col).where(key_col.in_(keys)).with_for_update()
+                ).scalars()
+            )
+            new_rows = [row for row in values if row[key] not in existing]
+            old_rows = [row for row in values if row[key] in existing]
+            if new_rows:
+                executor.execute(sa.insert(table), new_rows)
+            if old_rows and targets:
+                # Bind names must differ from column names in an UPDATE.
+                executor.execute(
+                    sa.update(table)
+                    .where(key_col == sa.bindparam("_key"))
+                    .values({name: sa.bindparam(f"_{name}") for name in targets}),
+                    [
+                        {"_key": row[key], **{f"_{n}": row[n] for n in targets}}
+                        for row in old_rows
+                    ],
+                )
+        written.extend(_rows_for(executor, table, key_col, keys))
+    return written
+
+
+# ---------------------------------------------------------------------------
+# State updates from provider results
+# ---------------------------------------------------------------------------
+
+
+def _observed_states(updates: Iterable[_StatusUpdate]) -> dict[str, list[PaymentState]]:
+    """Group a batch by payment id, each list ordered by last sighting.
+
+    Updates without a payment id or with an ``UNKNOWN`` state carry nothing
+    to apply and are dropped.
+    """
+    observed: dict[str, dict[PaymentState, None]] = {}
+    for item in updates:
+        payment_id, state = item.payment_id, item.state
+        if payment_id is None or state is PaymentState.UNKNOWN:
+            continue
+        seen = observed.setdefault(payment_id, {})
+        seen.pop(state, None)
+        seen[state] = None
+    return {payment_id: list(seen) for payment_id, seen in observed.items()}
+
+
+def _furthest(states: Sequence[PaymentState]) -> PaymentState:
+    """The furthest state in the lifecycle; the last seen wins ties."""
+    return max(reversed(states), key=RANK.__getitem__)
+
+
+@functools.cache
+def _plan(states: tuple[PaymentState, ...]) -> tuple[tuple[str, str], ...]:
+    """Map each stored state to where ``states`` can legally take it.
+
+    Events in a batch may arrive in any order, so the target from a current
+    state is the furthest state reachable by chaining legal transitions
+    through the observed states: ``PENDING`` with ``[REFUNDED, SUCCEEDED]``
+    ends at ``REFUNDED``.  Current states with nowhere to go are omitted.
+    """
+    plan = []
+    for current in PaymentState:
+        reachable: list[PaymentState] = []
+        frontier = [current]
+        while frontier:
+            step = frontier.pop()
+            for state in states:
+                if state not in reachable and can_transition(step, state):
+                    reachable.append(state)
+                    frontier.append(state)
+        if reachable:
+            ordered = [state for state in states if state in reachable]
+            plan.append((current.value, _furthest(ordered).value))
+    return tuple(plan)
+
+
+def apply_status_updates(
+    executor: _Executor,
+    model: Any,
+    updates: Iterable[_StatusUpdate],
+    *,
+    key: str = "transaction_id",
+    batch_size: int = 500,
+    check_transitions: bool = True,
+) -> list[sa.Row]:
+    """Move existing payments to the states reported by providers, in bulk.
+
+    Each batch is written with a single
+    ``UPDATE ... SET state = CASE ... END WHERE ...``.  A payment moves to
+    the furthest state its events in the batch can legally reach from its
+    stored state, so a ``PENDING`` row sent ``SUCCEEDED`` and ``REFUNDED``
+    together ends at ``REFUNDED`` whatever their order.  Unknown
+    payment ids are ignored; these objects do not carry enough data to
+    insert a payment row (use :func:`upsert_payments` for that).
+
+    Args:
+        executor: A :class:`~sqlalchemy.Connection` or
+            :class:`~sqlalchemy.orm.Session`.  The caller commits.
+        model: Mapped class built from
+            ``pydantic_mixin_from_model(PaymentModel)`` (or its
+            :class:`~sqlalchemy.Table`).
+        updates: :class:`~merchants.models.PaymentStatus`,
+            :class:`~merchants.models.WebhookEvent` or their compact
+            counterparts; matched on ``payment_id``.
+        key: Column holding the provider's payment id.
+        batch_size: Updates per statement.
+        check_transitions: Only apply transitions allowed by
+            :func:`merchants.states.can_transition`, so duplicates and
+            out-of-order events are skipped by the database.  When
+            ``False`` each payment is set to the furthest state in its
+            events (the last seen wins ties) if it differs.
+
+    Returns:
+        The rows whose state changed, with every column of the table.  On
+        databases without ``UPDATE ... RETURNING`` the changed rows are
+        found with a locking ``SELECT`` before the update.
+
+    Raises:
+        ValueError: If ``batch_size`` is less than 1.
+    """
+    table = _table(model)
+    key_col = table.c[key]
+    state_col = table.c.state
+    changed: list[sa.Row] = []
+    returning = _dialect(executor).update_returning
+
+    for batch in _batches(updates, batch_size):
+        observed = _observed_states(batch)
+        if not observed:
+            continue
+        if check_transitions:
+            # Payments whose events imply the same plan share one CASE branch.
+            by_plan: dict[tuple[tuple[str, str], ...], list[str]] = {}
+            for payment_id, states in observed.items():
+                plan = _plan(tuple(states))
+                if plan:
+                    by_plan.setdefault(plan, []).append(payment_id)
+            if not by_plan:
+                continue
+            branches = [
+                (key_col.in_(ids), dict(plan), state_col.in_([c for c, _ in plan]))
+                for plan, ids in by_plan.items()
+            ]
+            condition = sa.or_(*(sa.and_(match, legal) for match, _, legal in branches))
+            new_state = sa.case(
+                *(
+                    (match, sa.case(targets, value=state_col, else_=state_col))
+                    for match, targets, _ in branches
+                ),
+                else_=state_col,
+            )
+        else:
+            by_state: dict[PaymentState, list[str]] = {}
+            for payment_id, states in observed.items():
+                by_state.setdefault(_furthest(states), []).append(payment_id)
+            condition = sa.or_(
+                *(
+                    sa.and_(key_col.in_(ids), state_col != state.value)
+                    for state, ids in by_state.items()
+                )
+            )
+            new_state = sa.case(
+                *((key_col.in_(ids), state.value) for state, ids in by_state.items()),
+                else_=state_col,
+            )
+        stmt = sa.update(table).where(condition).values(state=new_state)
+        if returning:
+            changed.extend(executor.execute(stmt.returning(*table.c)))
+            continue
+        ids = list(
+            executor.execute(
+                sa.select(key_col).where(condition).with_for_update()
+            ).scalars()
+        )
+        if ids:
+            executor.execute(stmt)
+            changed.extend(_rows_for(executor, table, key_col, ids))
+    return changed
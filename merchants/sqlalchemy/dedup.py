@@ -0,0 +1,113 @@
+"""SQLAlchemy-backed webhook de-duplication store.
+
+Usage::
+
+    from merchants.sqlalchemy import SQLAlchemyDedupStore
+    from merchants.webhooks import WebhookDeduplicator
+
+    store = SQLAlchemyDedupStore(engine, ttl=7 * 86_400)
+    store.create_table()
+    dedup = WebhookDeduplicator(store)
+
+.. note::
+    This module requires **SQLAlchemy >= 2.0** to be installed.
+"""
+
+from __future__ import annotations
+
+import datetime
+
+try:
+    import sqlalchemy as sa
+except ImportError as exc:
+    raise ImportError(
+        "SQLAlchemy >= 2.0 is required for merchants.sqlalchemy. "
+        "Install it with: pip install merchants-sdk[sqlalchemy]"
+    ) from exc
+
+from merchants.webhooks.dedup import DedupStore
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class SQLAlchemyDedupStore(DedupStore):
+    """:class:`~merchants.webhooks.DedupStore` persisted in any SQLAlchemy database.
+
+    The table has a primary key on ``key``, so concurrent workers racing on
+    the same webhook are arbitrated by the database: exactly one ``add``
+    succeeds.
+
+    Args:
+        engine: SQLAlchemy :class:`~sqlalchemy.engine.Engine`.
+        ttl: Seconds after which a key is forgotten (``None`` = never).
+        table_name: Table name.
+        metadata: Optional :class:`~sqlalchemy.MetaData` to attach the table
+            to (e.g. your declarative ``Base.metadata`` for migrations).
+    """
+
+    def __init__(
+        self,
+        engine: sa.Engine,
+        *,
+        ttl: float | None = None,
+        table_name: str = "merchants_webhook_dedup",
+        metadata: sa.MetaData | None = None,
+    ) -> None:
+        self._engine = engine
+        self._ttl = ttl
+        self.table = sa.Table(
+            table_name,
+            metadata if metadata is not None else sa.MetaData(),
+            sa.Column("key", sa.String(255), primary_key=True),
+            sa.Column("seen_at", sa.DateTime, nullable=False, index=True),
+        )
+
+    def create_table(self) -> None:
+        """Create the table if it does not exist."""
+        self.table.create(self._engine, checkfirst=True)
+
+    def _cutoff(self) -> datetime.datetime | None:
+        if self._ttl is None:
+            return None
+        return _utcnow() - datetime.timedelta(seconds=self._ttl)
+
+    def add(self, key: str) -> bool:
+        table = self.table
+        cutoff = self._cutoff()
+        with self._engine.begin() as conn:
+            if cutoff is not None:
+                conn.execute(
+                    table.delete().where(table.c.key == key, table.c.seen_at < cutoff)
+                )
+            try:
+                with conn.begin_nested():
+                    conn.execute(table.insert().values(key=key, seen_at=_utcnow()))
+            except sa.exc.IntegrityError:
+                return False
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        table = self.table
+        query = sa.select(table.c.key).where(table.c.key == key)
+        cutoff = self._cutoff()
+        if cutoff is not None:
+            query = query.where(table.c.seen_at >= cutoff)
+        with self._engine.connect() as conn:
+            return conn.execute(query).first() is not None
+
+    def discard(self, key: str) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.key == key))
+
+    def purge(self) -> int:
+        """Delete expired keys.  Returns the number of rows removed."""
+        cutoff = self._cutoff()
+        if cutoff is None:
+            return 0
+        with self._engine.begin() as conn:
+            result = conn.execute(
+                self.table.delete().where(self.table.c.seen_at < cutoff)
+            )
+        return result.rowcount
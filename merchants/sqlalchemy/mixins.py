@@ -29,6 +29,7 @@ from __future__ import annotations
 
 import dataclasses
 import datetime
+import functools
 import inspect
 import types
 import typing
@@ -82,7 +83,8 @@ class PydanticToSAMixinConfig:
             stored as ``String(36)`` for broad database portability.
         default_string_len: Optional default length for ``String`` columns.
             When ``None`` (default), ``String()`` is used without a length.
-        auto_exclude: Set of field names to skip automatically.  Defaults to
+        auto_exclude: Field names to skip automatically (any iterable; stored
+            as a ``frozenset``).  Defaults to
             ``{"id", "created_at", "updated_at"}`` so that ORM models can
             define those columns themselves.
     """
@@ -94,6 +96,11 @@ class PydanticToSAMixinConfig:
         default_factory=lambda: frozenset({"id", "created_at", "updated_at"})
     )
 
+    def __post_init__(self) -> None:
+        # Configs key the column-spec cache, so any iterable of names (a
+        # plain ``set`` included) is stored as a hashable frozenset.
+        object.__setattr__(self, "auto_exclude", frozenset(self.auto_exclude))
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -197,64 +204,30 @@ def _sa_type_for(
     return _json_or_raise(py_type, "Python type", config.json_fallback)
 
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
-
-
-def pydantic_mixin_from_model(
-    pyd_model: type[pydantic.BaseModel],
-    *,
-    mixin_name: str | None = None,
-    include: set[str] | None = None,
-    exclude: set[str] | None = None,
-    config: PydanticToSAMixinConfig | None = None,
-) -> type:
-    """Generate a SQLAlchemy 2.0 typed mixin class from a Pydantic v2 model.
-
-    The returned class is a plain Python class (no declarative base) that
-    defines :class:`~sqlalchemy.orm.Mapped` annotations and
-    :func:`~sqlalchemy.orm.mapped_column` values for each selected field.
-    Downstream ORM models can inherit from it alongside a declarative
-    ``Base``.
-
-    Example::
+@dataclasses.dataclass(frozen=True, slots=True)
+class _ColumnSpec:
+    """Everything needed to build one ``mapped_column``; shared between calls."""
 
-        from merchants.sqlalchemy import pydantic_mixin_from_model
-        from myapp.schemas import UserSchema
+    name: str
+    annotation: Any
+    col_type: Any
+    col_kwargs: dict[str, Any]
 
-        UserMixin = pydantic_mixin_from_model(
-            UserSchema,
-            exclude={"password_hash"},
-        )
 
-        class User(Base, UserMixin):
-            __tablename__ = "user"
-            id: Mapped[int] = mapped_column(primary_key=True)
-
-    Args:
-        pyd_model: A Pydantic v2 ``BaseModel`` subclass.
-        mixin_name: Name for the generated class.  Defaults to
-            ``"<ModelName>SAMixin"``.
-        include: If given, only generate columns for these field names (after
-            applying ``auto_exclude``).
-        exclude: If given, skip these field names (takes precedence over
-            ``include``).
-        config: Optional :class:`PydanticToSAMixinConfig` instance.  Uses
-            sensible defaults when omitted.
-
-    Returns:
-        A dynamically generated mixin class.
+@functools.lru_cache(maxsize=256)
+def _column_specs(
+    pyd_model: type[pydantic.BaseModel],
+    include: frozenset[str] | None,
+    exclude: frozenset[str] | None,
+    config: PydanticToSAMixinConfig,
+) -> tuple[_ColumnSpec, ...]:
+    """Resolve type hints and column definitions for the selected fields.
 
-    Raises:
-        TypeError: When a field's type has no SQLAlchemy mapping and
-            ``config.json_fallback`` is ``False``.
+    Memoised: downstream packages build the same mixins at import time and
+    per app, and hint resolution dominates the cost.  Callers must not mutate
+    the returned specs; :func:`pydantic_mixin_from_model` copies the column
+    types and builds fresh ``mapped_column`` objects from them.
     """
-    if config is None:
-        config = _DEFAULT_CONFIG
-
-    name = mixin_name or f"{pyd_model.__name__}SAMixin"
-
     # Resolve type hints once (handles forward refs)
     try:
         hints = typing.get_type_hints(pyd_model)
@@ -269,8 +242,7 @@ def pydantic_mixin_from_model(
     if exclude is not None:
         selected = [f for f in selected if f not in exclude]
 
-    namespace: dict[str, Any] = {"__annotations__": {}}
-
+    specs: list[_ColumnSpec] = []
     for field_name in selected:
         field_info: pydantic.fields.FieldInfo = pyd_model.model_fields[field_name]
         raw_type = hints.get(field_name, field_info.annotation)
@@ -311,8 +283,94 @@ def pydantic_mixin_from_model(
             elif field_info.default_factory is not None:
                 col_kwargs["default"] = field_info.default_factory
 
-        # Annotate with Mapped[raw_type]
-        namespace["__annotations__"][field_name] = sa_orm.Mapped[raw_type]  # type: ignore[valid-type]
-        namespace[field_name] = sa_orm.mapped_column(col_type, **col_kwargs)
+        specs.append(
+            _ColumnSpec(
+                name=field_name,
+                # Annotate with Mapped[raw_type]
+                annotation=sa_orm.Mapped[raw_type],  # type: ignore[valid-type]
+                col_type=col_type,
+                col_kwargs=col_kwargs,
+            )
+        )
+    return tuple(specs)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def pydantic_mixin_from_model(
+    pyd_model: type[pydantic.BaseModel],
+    *,
+    mixin_name: str | None = None,
+    include: set[str] | None = None,
+    exclude: set[str] | None = None,
+    config: PydanticToSAMixinConfig | None = None,
+) -> type:
+    """Generate a SQLAlchemy 2.0 typed mixin class from a Pydantic v2 model.
+
+    The returned class is a plain Python class (no declarative base) that
+    defines :class:`~sqlalchemy.orm.Mapped` annotations and
+    :func:`~sqlalchemy.orm.mapped_column` values for each selected field.
+    Downstream ORM models can inherit from it alongside a declarative
+    ``Base``.
+
+    Column definitions are memoised per ``(pyd_model, include, exclude,
+    config)``; each call still returns a new class with freshly built
+    ``mapped_column`` objects, so repeated calls are cheap and independent.
+
+    Example::
+
+        from merchants.sqlalchemy import pydantic_mixin_from_model
+        from myapp.schemas import UserSchema
+
+        UserMixin = pydantic_mixin_from_model(
+            UserSchema,
+            exclude={"password_hash"},
+        )
+
+        class User(Base, UserMixin):
+            __tablename__ = "user"
+            id: Mapped[int] = mapped_column(primary_key=True)
+
+    Args:
+        pyd_model: A Pydantic v2 ``BaseModel`` subclass.
+        mixin_name: Name for the generated class.  Defaults to
+            ``"<ModelName>SAMixin"``.
+        include: If given, only generate columns for these field names (after
+            applying ``auto_exclude``).
+        exclude: If given, skip these field names (takes precedence over
+            ``include``).
+        config: Optional :class:`PydanticToSAMixinConfig` instance.  Uses
+            sensible defaults when omitted.
+
+    Returns:
+        A dynamically generated mixin class.
+
+    Raises:
+        TypeError: When a field's type has no SQLAlchemy mapping and
+            ``config.json_fallback`` is ``False``.
+    """
+    if config is None:
+        config = _DEFAULT_CONFIG
+
+    specs = _column_specs(
+        pyd_model,
+        None if include is None else frozenset(include),
+        None if exclude is None else frozenset(exclude),
+        config,
+    )
 
-    return type(name, (), namespace)
+    annotations: dict[str, Any] = {}
+    namespace: dict[str, Any] = {"__annotations__": annotations}
+    for spec in specs:
+        col_type = spec.col_type
+        # Like Column._copy(): only schema-attached types (Boolean, Enum) hold
+        # per-column state; plain types are safe to share between columns.
+        if isinstance(col_type, sa.types.SchemaType):
+            col_type = col_type.copy()
+        annotations[spec.name] = spec.annotation
+        namespace[spec.name] = sa_orm.mapped_column(col_type, **spec.col_kwargs)
+
+    return type(mixin_name or f"{pyd_model.__name__}SAMixin", (), namespace)
@@ -0,0 +1,174 @@
+"""Payment state machine: legal transitions, ordering and per-payment logs.
+
+:class:`~merchants.models.PaymentState` is a flat enum; this module adds the
+lifecycle rules around it so that webhook handlers can decide whether an
+incoming state should be applied *before* touching the database::
+
+    PENDING ──> PROCESSING ──> SUCCEEDED ──> REFUNDED
+       │             │
+       └─────────────┴──> FAILED / CANCELLED
+
+``UNKNOWN`` (a status no mapping recognised) may move to any known state but
+nothing moves back to it.  Tables are computed once at import time, so every
+check is a constant-time lookup.
+
+Usage::
+
+    from merchants.states import can_transition, is_regression
+
+    event = parse_event(body, provider="stripe")
+    if not can_transition(payment.state, event.state):
+        return  # duplicate, out-of-order or illegal - skip the DB write
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from collections.abc import Iterator, Mapping
+from types import MappingProxyType
+
+from merchants.models import _FINAL_STATES, PaymentState
+
+#: State code of each :class:`~merchants.models.PaymentState`; the index into this tuple.
+STATE_CODES: tuple[PaymentState, ...] = tuple(PaymentState)
+_CODE_OF = {state: code for code, state in enumerate(STATE_CODES)}
+
+_PENDING = PaymentState.PENDING
+_PROCESSING = PaymentState.PROCESSING
+_SUCCEEDED = PaymentState.SUCCEEDED
+_FAILED = PaymentState.FAILED
+_CANCELLED = PaymentState.CANCELLED
+_REFUNDED = PaymentState.REFUNDED
+_UNKNOWN = PaymentState.UNKNOWN
+
+#: Legal next states for each state.  Final states other than ``SUCCEEDED``
+#: have none.
+TRANSITIONS: Mapping[PaymentState, frozenset[PaymentState]] = MappingProxyType(
+    {
+        _UNKNOWN: frozenset(
+            {_PENDING, _PROCESSING, _SUCCEEDED, _FAILED, _CANCELLED, _REFUNDED}
+        ),
+        _PENDING: frozenset({_PROCESSING, _SUCCEEDED, _FAILED, _CANCELLED}),
+        _PROCESSING: frozenset({_SUCCEEDED, _FAILED, _CANCELLED}),
+        _SUCCEEDED: frozenset({_REFUNDED}),
+        _FAILED: frozenset(),
+        _CANCELLED: frozenset(),
+        _REFUNDED: frozenset(),
+    }
+)
+
+#: Position of each state in the lifecycle.  A later event whose state ranks
+#: lower than the current one arrived out of order.
+RANK: Mapping[PaymentState, int] = MappingProxyType(
+    {
+        _UNKNOWN: 0,
+        _PENDING: 1,
+        _PROCESSING: 2,
+        _SUCCEEDED: 3,
+        _FAILED: 3,
+        _CANCELLED: 3,
+        _REFUNDED: 4,
+    }
+)
+
+#: States after which no further transitions are expected (``REFUNDED`` included).
+FINAL_STATES: frozenset[PaymentState] = _FINAL_STATES
+
+
+def can_transition(old: PaymentState, new: PaymentState) -> bool:
+    """Return True when moving from ``old`` to ``new`` is a legal state change.
+
+    Staying in the same state is not a change and returns False.
+
+    >>> can_transition(PaymentState.PENDING, PaymentState.SUCCEEDED)
+    True
+    >>> can_transition(PaymentState.SUCCEEDED, PaymentState.PENDING)
+    False
+    """
+    return new in TRANSITIONS[old]
+
+
+def is_regression(old: PaymentState, new: PaymentState) -> bool:
+    """Return True when ``new`` is earlier in the lifecycle than ``old``.
+
+    Such events are stale (delivered out of order) and should be discarded.
+    """
+    return RANK[new] < RANK[old]
+
+
+def is_final(state: PaymentState) -> bool:
+    """Return True when no further transitions are expected from ``state``."""
+    return state in _FINAL_STATES
+
+
+class TransitionLog:
+    """Append-only record of one payment's accepted state changes.
+
+    States are stored as one-byte codes into :data:`STATE_CODES` and
+    timestamps as doubles, both in :mod:`array` buffers, so a log costs a
+    few bytes per entry rather than an object per entry.
+
+    Args:
+        payment_id: The payment this log belongs to.
+        initial: Starting state (default ``PENDING``).
+        at: Unix timestamp of the starting state (default: now).
+    """
+
+    __slots__ = ("payment_id", "_states", "_times")
+
+    def __init__(
+        self,
+        payment_id: str,
+        initial: PaymentState = PaymentState.PENDING,
+        *,
+        at: float | None = None,
+    ) -> None:
+        self.payment_id = payment_id
+        self._states = array("B", [_CODE_OF[PaymentState(initial)]])
+        self._times = array("d", [time.time() if at is None else at])
+
+    @property
+    def current(self) -> PaymentState:
+        """The most recent state."""
+        return STATE_CODES[self._states[-1]]
+
+    @property
+    def is_final(self) -> bool:
+        """Return True when :attr:`current` is a final state."""
+        return self.current in _FINAL_STATES
+
+    def record(self, state: PaymentState, *, at: float | None = None) -> bool:
+        """Append ``state`` if it is a legal transition from :attr:`current`.
+
+        Duplicates, out-of-order and illegal states are ignored.
+
+        Args:
+            state: The newly observed state.
+            at: Unix timestamp of the change (default: now).
+
+        Returns:
+            True if the state was appended.
+        """
+        if not can_transition(self.current, state):
+            return False
+        self._states.append(_CODE_OF[PaymentState(state)])
+        self._times.append(time.time() if at is None else at)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __iter__(self) -> Iterator[tuple[PaymentState, float]]:
+        """Yield ``(state, timestamp)`` pairs, oldest first."""
+        for code, at in zip(self._states, self._times):
+            yield STATE_CODES[code], at
+
+    @property
+    def states(self) -> list[PaymentState]:
+        """Every recorded state, oldest first."""
+        return [STATE_CODES[code] for code in self._states]
+
+    def __repr__(self) -> str:
+        path = " -> ".join(state.value for state in self.states)
+        return f"TransitionLog({self.payment_id!r}, {path})"
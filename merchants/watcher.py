@@ -0,0 +1,291 @@
+"""Multiplexed payment status watcher.
+
+A single :class:`StatusWatcher` tracks any number of pending payments across
+providers.  Entries live in a heap keyed by their next check time; due
+lookups are fanned out through a bounded thread pool, state transitions are
+reported through a callback, and entries are dropped as soon as they reach a
+final state.
+
+Usage::
+
+    from merchants.watcher import StatusWatcher
+
+    def on_transition(status, old_state):
+        print(f"{status.payment_id}: {old_state.value} -> {status.state.value}")
+
+    watcher = StatusWatcher(on_transition=on_transition, max_workers=32)
+    watcher.watch("tok_123", "flow")
+    watcher.watch("pay_456", "khipu", state=PaymentState.PROCESSING)
+    watcher.start()       # background thread; or call poll_due() yourself
+    ...
+    watcher.stop()
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from merchants.models import _FINAL_STATES, PaymentState, PaymentStatus
+from merchants.providers import Provider, get_provider
+
+logger = logging.getLogger(__name__)
+
+#: ``on_transition(status, old_state)`` - ``status.state`` is the new state.
+TransitionCallback = Callable[[PaymentStatus, PaymentState], None]
+#: ``on_error(provider_key, payment_id, exc)``.
+ErrorCallback = Callable[[str, str, Exception], None]
+
+
+class _Watch:
+    __slots__ = ("provider", "payment_id", "state", "delay", "seq")
+
+    def __init__(
+        self, provider: Provider, payment_id: str, state: PaymentState, delay: float
+    ) -> None:
+        self.provider = provider
+        self.payment_id = payment_id
+        self.state = state
+        self.delay = delay
+        self.seq = 0
+
+
+class StatusWatcher:
+    """Poll many pending payments from one loop with bounded concurrency.
+
+    Each watched payment is re-checked on its own adaptive schedule, driven
+    by the provider's ``poll_interval`` / ``poll_max_interval`` /
+    ``poll_backoff`` attributes: the delay grows while the state is unchanged
+    and resets when it moves.  Lookups that error are retried on the same
+    backoff.
+
+    Args:
+        on_transition: Called as ``on_transition(status, old_state)`` whenever
+            a poll observes a different :class:`~merchants.models.PaymentState`.
+        on_error: Called as ``on_error(provider_key, payment_id, exc)`` when a
+            lookup raises.  Errors are logged when omitted.  Exceptions raised
+            by either callback are logged and the entry is rescheduled (or
+            dropped once final) as usual.
+        max_workers: Maximum number of concurrent provider lookups.
+        batch_size: Maximum number of due entries pulled per :meth:`poll_due`.
+        clock: Monotonic clock, overridable for tests.
+    """
+
+    def __init__(
+        self,
+        *,
+        on_transition: TransitionCallback | None = None,
+        on_error: ErrorCallback | None = None,
+        max_workers: int = 16,
+        batch_size: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._on_transition = on_transition
+        self._on_error = on_error
+        self._max_workers = max_workers
+        self._batch_size = batch_size
+        self._clock = clock
+        self._heap: list[tuple[float, int, tuple[str, str]]] = []
+        self._watches: dict[tuple[str, str], _Watch] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._executor: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def watch(
+        self,
+        payment_id: str,
+        provider: Provider | str,
+        *,
+        state: PaymentState = PaymentState.PENDING,
+        delay: float | None = None,
+    ) -> None:
+        """Start watching ``payment_id`` (replacing any existing entry).
+
+        Args:
+            payment_id: Provider-specific payment identifier.
+            provider: Provider instance or registered provider key.
+            state: Last known state, used to detect the first transition.
+            delay: Seconds until the first check; defaults to the provider's
+                ``poll_interval``.
+        """
+        resolved = get_provider(provider)
+        entry = _Watch(resolved, payment_id, state, resolved.poll_interval)
+        key = (resolved.key, payment_id)
+        with self._lock:
+            self._watches[key] = entry
+            self._schedule(
+                key, entry, resolved.poll_interval if delay is None else delay
+            )
+        self._wakeup.set()
+
+    def unwatch(self, payment_id: str, provider: Provider | str) -> bool:
+        """Stop watching a payment.  Returns ``True`` if it was being watched."""
+        key_name = provider.key if isinstance(provider, Provider) else provider
+        with self._lock:
+            return self._watches.pop((key_name, payment_id), None) is not None
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        """Membership test on ``(provider_key, payment_id)`` tuples."""
+        return key in self._watches
+
+    def _schedule(self, key: tuple[str, str], entry: _Watch, delay: float) -> None:
+        # Caller holds the lock.  Superseded heap items are skipped lazily by
+        # comparing their sequence number with the entry's current one.
+        entry.seq = next(self._counter)
+        heapq.heappush(self._heap, (self._clock() + delay, entry.seq, key))
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    def next_due_in(self) -> float | None:
+        """Seconds until the next entry is due (``0`` if overdue, ``None`` if idle)."""
+        with self._lock:
+            self._discard_stale()
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def _discard_stale(self) -> None:
+        heap = self._heap
+        while heap:
+            _, seq, key = heap[0]
+            entry = self._watches.get(key)
+            if entry is not None and entry.seq == seq:
+                return
+            heapq.heappop(heap)
+
+    def _pop_due(self) -> list[tuple[tuple[str, str], _Watch]]:
+        now = self._clock()
+        due: list[tuple[tuple[str, str], _Watch]] = []
+        with self._lock:
+            heap = self._heap
+            while heap and len(due) < self._batch_size:
+                self._discard_stale()
+                if not heap or heap[0][0] > now:
+                    break
+                _, _, key = heapq.heappop(heap)
+                entry = self._watches[key]
+                entry.seq = 0  # in flight: not scheduled until the lookup returns
+                due.append((key, entry))
+        return due
+
+    def poll_due(self) -> int:
+        """Look up every entry that is due (up to ``batch_size``) and reschedule.
+
+        Returns:
+            The number of lookups performed.
+        """
+        due = self._pop_due()
+        if not due:
+            return 0
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="merchants-watcher"
+            )
+        outcomes = self._executor.map(self._lookup, [entry for _, entry in due])
+        for (key, entry), outcome in zip(due, outcomes):
+            self._handle(key, entry, outcome)
+        return len(due)
+
+    @staticmethod
+    def _lookup(entry: _Watch) -> PaymentStatus | Exception:
+        try:
+            return entry.provider.get_payment(entry.payment_id)
+        except Exception as exc:
+            return exc
+
+    def _handle(
+        self, key: tuple[str, str], entry: _Watch, outcome: PaymentStatus | Exception
+    ) -> None:
+        provider = entry.provider
+        if isinstance(outcome, Exception):
+            if self._on_error is not None:
+                self._notify(self._on_error, provider.key, entry.payment_id, outcome)
+            else:
+                logger.warning(
+                    "Status lookup for %s/%s failed: %s",
+                    provider.key,
+                    entry.payment_id,
+                    outcome,
+                )
+            changed = False
+        else:
+            old_state = entry.state
+            changed = outcome.state is not old_state
+            if changed:
+                entry.state = outcome.state
+                if self._on_transition is not None:
+                    self._notify(self._on_transition, outcome, old_state)
+
+        with self._lock:
+            if self._watches.get(key) is not entry:
+                return  # unwatched or replaced while in flight
+            if entry.state in _FINAL_STATES:
+                del self._watches[key]
+                return
+            if changed:
+                entry.delay = provider.poll_interval
+            else:
+                entry.delay = min(
+                    entry.delay * provider.poll_backoff, provider.poll_max_interval
+                )
+            self._schedule(key, entry, entry.delay)
+
+    @staticmethod
+    def _notify(callback: Callable[..., None], *args: object) -> None:
+        # A failing callback must not kill the loop or orphan the entry, which
+        # is rescheduled (or dropped once final) as usual.
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception("Status watcher callback %r failed", callback)
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def run(self, idle_wait: float = 1.0) -> None:
+        """Poll until :meth:`stop` is called, sleeping until the next due entry."""
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            self.poll_due()
+            wait = self.next_due_in()
+            if wait is None or wait > 0:
+                self._wakeup.wait(idle_wait if wait is None else wait)
+
+    def start(self) -> None:
+        """Run :meth:`run` on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="merchants-status-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the background loop and release the lookup pool."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,596 @@
+"""Webhook verification and parsing utilities."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from merchants.models import WebhookEvent
+from merchants.webhooks.batch import parse_events, verify_signatures
+from merchants.webhooks.dedup import (
+    DedupStore,
+    MemoryDedupStore,
+    SQLiteDedupStore,
+    WebhookDeduplicator,
+    event_key,
+    payload_key,
+)
+from merchants.webhooks.dispatch import HandlerStats, WebhookDispatcher
+from merchants.webhooks.pipeline import (
+    AsyncWebhookPipeline,
+    WebhookPipeline,
+    WebhookQueueFull,
+    payment_partition_key,
+)
+from merchants.webhooks.schemas import WebhookSchema, schema_for
+from merchants.webhooks.streaming import (
+    verify_khipu_signature_stream,
+    verify_khipu_signature_stream_async,
+    verify_signature_stream,
+    verify_signature_stream_async,
+)
+
+__all__ = [
+    "AsyncWebhookPipeline",
+    "DedupStore",
+    "HandlerStats",
+    "MemoryDedupStore",
+    "ReplayGuard",
+    "SQLiteDedupStore",
+    "WebhookDeduplicator",
+    "WebhookDispatcher",
+    "WebhookNotifier",
+    "WebhookPipeline",
+    "WebhookQueueFull",
+    "WebhookReplayError",
+    "WebhookSchema",
+    "WebhookVerificationError",
+    "WebhookVerifier",
+    "event_key",
+    "parse_event",
+    "parse_events",
+    "payload_key",
+    "payment_partition_key",
+    "verify_khipu_signature",
+    "verify_khipu_signature_stream",
+    "verify_khipu_signature_stream_async",
+    "verify_signature",
+    "verify_signature_stream",
+    "verify_signature_stream_async",
+    "verify_signatures",
+    "verify_timestamped_signature",
+]
+
+
+class WebhookVerificationError(Exception):
+    """Raised when webhook HMAC signature verification fails."""
+
+
+def verify_signature(
+    payload: bytes,
+    secret: str | bytes,
+    signature: str,
+    *,
+    header_prefix: str = "sha256=",
+) -> None:
+    """Verify an HMAC-SHA256 webhook signature using constant-time comparison.
+
+    Args:
+        payload: Raw request body bytes.
+        secret: Webhook signing secret (str or bytes).
+        signature: The value from the provider's signature header
+            (e.g. ``"sha256=abc123…"``).
+        header_prefix: Expected prefix on the signature value
+            (default: ``"sha256="``).
+
+    Raises:
+        WebhookVerificationError: If the signature does not match.
+    """
+    if isinstance(secret, str):
+        secret = secret.encode()
+
+    expected_hex = hmac.new(secret, payload, hashlib.sha256).hexdigest()
+
+    # Strip optional prefix from provided signature
+    provided = signature
+    if provided.startswith(header_prefix):
+        provided = provided[len(header_prefix) :]
+
+    if not hmac.compare_digest(expected_hex, provided):
+        raise WebhookVerificationError("Webhook signature verification failed.")
+
+
+class WebhookReplayError(WebhookVerificationError):
+    """Raised when a correctly signed webhook is stale or has been seen before."""
+
+
+class ReplayGuard:
+    """Reject stale or replayed timestamped webhook signatures.
+
+    A webhook passes when its timestamp lies within ``tolerance`` seconds of
+    the current time (in either direction, to absorb clock skew) and its
+    ``(timestamp, signature)`` pair has not been accepted before.
+
+    Accepted pairs are remembered until their timestamp leaves the tolerance
+    window - after that the timestamp check alone rejects them - so memory
+    is bounded by the number of webhooks received within one window.
+    Membership is a dict lookup and expired pairs are dropped from the front
+    of an insertion-ordered queue, both O(1) amortised.
+
+    Example::
+
+        guard = ReplayGuard(tolerance=300)
+        verify_khipu_signature(body, secret, header, replay_guard=guard)
+
+    Args:
+        tolerance: Maximum accepted age (and future skew) in seconds.
+        clock: Wall clock returning unix seconds, overridable for tests.
+    """
+
+    def __init__(
+        self,
+        tolerance: float = 300.0,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+        self.tolerance = tolerance
+        self._clock = clock
+        self._seen: dict[tuple[str, str], float] = {}
+        self._expiry: deque[tuple[float, tuple[str, str]]] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def check(self, timestamp: str, signature: str, *, scale: float = 1.0) -> None:
+        """Validate and record one signed delivery.
+
+        Args:
+            timestamp: The timestamp exactly as it appears in the header.
+            signature: The signature value from the header.
+            scale: Factor converting ``timestamp`` to seconds (``0.001`` for
+                millisecond timestamps).
+
+        Raises:
+            WebhookReplayError: If the timestamp is unparseable, outside the
+                tolerance window, or the pair was already accepted.
+        """
+        try:
+            sent_at = float(timestamp) * scale
+        except ValueError:
+            raise WebhookReplayError(
+                f"Invalid webhook timestamp {timestamp!r}."
+            ) from None
+        now = self._clock()
+        if abs(now - sent_at) > self.tolerance:
+            raise WebhookReplayError(
+                "Webhook timestamp is outside the tolerance window."
+            )
+        nonce = (timestamp, signature)
+        with self._lock:
+            self._prune(now)
+            if nonce in self._seen:
+                raise WebhookReplayError("Webhook signature has already been used.")
+            expires = sent_at + self.tolerance
+            self._seen[nonce] = expires
+            self._expiry.append((expires, nonce))
+
+    def _prune(self, now: float) -> None:
+        # Caller holds the lock.  Entries arrive roughly in timestamp order;
+        # an entry stuck behind a later-expiring one lingers at most one
+        # extra window, which keeps the bound while avoiding a heap.
+        expiry = self._expiry
+        seen = self._seen
+        while expiry and expiry[0][0] < now:
+            _, nonce = expiry.popleft()
+            seen.pop(nonce, None)
+
+
+def _parse_signature_header(
+    header_value: str, timestamp_key: str, scheme: str
+) -> tuple[str | None, list[str]]:
+    timestamp: str | None = None
+    signatures: list[str] = []
+    for part in header_value.split(","):
+        key, _, val = part.strip().partition("=")
+        if key == timestamp_key:
+            timestamp = val
+        elif key == scheme and val:
+            signatures.append(val)
+    return timestamp, signatures
+
+
+def _timestamped_mac(secret: str | bytes, timestamp: str) -> Any:
+    if isinstance(secret, str):
+        secret = secret.encode()
+    # The signed message is "<timestamp>.<body>"; feeding the prefix and the
+    # body separately avoids copying the body into a concatenated buffer.
+    return hmac.new(secret, f"{timestamp}.".encode(), hashlib.sha256)
+
+
+def _match_timestamped(
+    mac: Any,
+    timestamp: str,
+    signatures: list[str],
+    encoding: str,
+    scale: float,
+    replay_guard: ReplayGuard | None,
+) -> bool:
+    if encoding == "hex":
+        expected = mac.hexdigest()
+    elif encoding == "base64":
+        expected = base64.b64encode(mac.digest()).decode()
+    else:
+        raise ValueError(f"Unsupported signature encoding {encoding!r}.")
+    for candidate in signatures:
+        if hmac.compare_digest(expected, candidate):
+            # Only correctly signed deliveries are recorded, so forged
+            # requests cannot fill the nonce cache.
+            if replay_guard is not None:
+                replay_guard.check(timestamp, candidate, scale=scale)
+            return True
+    return False
+
+
+def _check_timestamped(
+    payload: bytes,
+    secret: str | bytes,
+    timestamp: str,
+    signatures: list[str],
+    encoding: str,
+    scale: float,
+    replay_guard: ReplayGuard | None,
+) -> bool:
+    mac = _timestamped_mac(secret, timestamp)
+    mac.update(payload)
+    return _match_timestamped(mac, timestamp, signatures, encoding, scale, replay_guard)
+
+
+def verify_timestamped_signature(
+    payload: bytes,
+    secret: str | bytes,
+    header_value: str,
+    *,
+    scheme: str = "v1",
+    timestamp_key: str = "t",
+    encoding: str = "hex",
+    timestamp_scale: float = 1.0,
+    replay_guard: ReplayGuard | None = None,
+) -> str:
+    """Verify a timestamped HMAC-SHA256 signature header (Stripe style).
+
+    The header is a comma-separated list such as
+    ``t=1492774577,v1=5257a869…,v0=6ffbb59b…``; the signed message is
+    ``"<timestamp>.<body>"``.  Several ``scheme`` entries may be present
+    (e.g. during secret rotation) and any one of them matching is enough.
+
+    Args:
+        payload: Raw request body bytes.
+        secret: Webhook signing secret (str or bytes).
+        header_value: The full signature header value.
+        scheme: Key of the signature entries to check (default ``"v1"``).
+        timestamp_key: Key of the timestamp entry (default ``"t"``).
+        encoding: Signature encoding, ``"hex"`` or ``"base64"``.
+        timestamp_scale: Factor converting the timestamp to seconds
+            (``0.001`` for millisecond timestamps).
+        replay_guard: Optional :class:`ReplayGuard`; when given, stale or
+            previously accepted deliveries are rejected.
+
+    Returns:
+        The extracted timestamp string.
+
+    Raises:
+        WebhookVerificationError: If the header is malformed or no signature
+            matches.
+        WebhookReplayError: If ``replay_guard`` rejects the delivery.
+    """
+    timestamp, signatures = _parse_signature_header(header_value, timestamp_key, scheme)
+    if not timestamp or not signatures:
+        raise WebhookVerificationError(
+            f"Malformed signature header: missing {timestamp_key}= "
+            f"or {scheme}= component."
+        )
+    if not _check_timestamped(
+        payload, secret, timestamp, signatures, encoding, timestamp_scale, replay_guard
+    ):
+        raise WebhookVerificationError("Webhook signature verification failed.")
+    return timestamp
+
+
+def _parse_khipu_header(header_value: str) -> tuple[str, list[str]]:
+    timestamp, signatures = _parse_signature_header(header_value, "t", "s")
+    if not timestamp or not signatures:
+        raise WebhookVerificationError(
+            "Malformed x-khipu-signature header: missing t= or s= component."
+        )
+    return timestamp, signatures
+
+
+def verify_khipu_signature(
+    payload: bytes,
+    secret: str | bytes,
+    header_value: str,
+    *,
+    replay_guard: ReplayGuard | None = None,
+) -> str:
+    """Verify a Khipu v3.0 webhook signature (``x-khipu-signature`` header).
+
+    Khipu signs webhooks with HMAC-SHA256 using the format
+    ``t=<unix_ms>,s=<base64_signature>``.  The signed message is
+    ``"<timestamp>.<body>"``.
+
+    Args:
+        payload: Raw request body bytes (the JSON as sent by Khipu — must
+            not be re-serialised or whitespace-modified).
+        secret: Merchant secret (the Khipu receiver secret key).
+        header_value: The full ``x-khipu-signature`` header value,
+            e.g. ``"t=1711965600393,s=GYzp…Tdg="``.
+        replay_guard: Optional :class:`ReplayGuard`; when given, stale or
+            previously accepted deliveries are rejected.
+
+    Returns:
+        The extracted timestamp string.
+
+    Raises:
+        WebhookVerificationError: If the header is malformed or the
+            signature does not match.
+        WebhookReplayError: If ``replay_guard`` rejects the delivery.
+    """
+    timestamp, signatures = _parse_khipu_header(header_value)
+    if not _check_timestamped(
+        payload, secret, timestamp, signatures, "base64", 0.001, replay_guard
+    ):
+        raise WebhookVerificationError("Khipu webhook signature verification failed.")
+    return timestamp
+
+
+def _decode_signature(value: str, encoding: str) -> bytes | None:
+    try:
+        if encoding == "hex":
+            return bytes.fromhex(value)
+        if encoding == "base64":
+            return base64.b64decode(value, validate=True)
+    except ValueError:
+        return None
+    raise ValueError(f"Unsupported signature encoding {encoding!r}.")
+
+
+class WebhookVerifier:
+    """Reusable HMAC-SHA256 verifier with pre-keyed state and secret rotation.
+
+    Each secret is encoded and keyed once; per request the prepared
+    :mod:`hmac` object is copied instead of re-derived, and the provided
+    signature is decoded once and compared as raw bytes.  All active
+    secrets are tried in one call, and the id of the one that matched is
+    returned so callers can tell when the old secret can be retired.
+
+    Example::
+
+        verifier = WebhookVerifier({"2024-06": old_secret, "2024-12": new_secret})
+        key_id = verifier.verify(body, request.headers["X-Signature"])
+
+    Args:
+        secrets: A single secret, a sequence of secrets (ids are their
+            indices as strings), or a mapping of key id to secret.
+        header_prefix: Prefix stripped from plain signatures in
+            :meth:`verify` (default ``"sha256="``).
+        encoding: Signature encoding, ``"hex"`` or ``"base64"``.
+
+    Raises:
+        ValueError: If no secrets are given or ``encoding`` is unsupported.
+    """
+
+    def __init__(
+        self,
+        secrets: str | bytes | list[str | bytes] | dict[str, str | bytes],
+        *,
+        header_prefix: str = "sha256=",
+        encoding: str = "hex",
+    ) -> None:
+        if encoding not in ("hex", "base64"):
+            raise ValueError(f"Unsupported signature encoding {encoding!r}.")
+        if isinstance(secrets, (str, bytes)):
+            secrets = {"0": secrets}
+        elif not isinstance(secrets, dict):
+            secrets = {str(i): secret for i, secret in enumerate(secrets)}
+        if not secrets:
+            raise ValueError("WebhookVerifier needs at least one secret.")
+        self._header_prefix = header_prefix
+        self._encoding = encoding
+        self._lock = threading.Lock()
+        # Copy-on-write tuple: readers never lock, rotation swaps it atomically.
+        self._keys: tuple[tuple[str, Any], ...] = tuple(
+            (key_id, self._prepare(secret)) for key_id, secret in secrets.items()
+        )
+
+    @staticmethod
+    def _prepare(secret: str | bytes) -> Any:
+        if isinstance(secret, str):
+            secret = secret.encode()
+        return hmac.new(secret, digestmod=hashlib.sha256)
+
+    @property
+    def key_ids(self) -> list[str]:
+        """Ids of the active secrets, in the order they are tried."""
+        return [key_id for key_id, _ in self._keys]
+
+    def add_secret(self, key_id: str, secret: str | bytes) -> None:
+        """Activate ``secret`` under ``key_id`` (replacing an existing one)."""
+        prepared = self._prepare(secret)
+        with self._lock:
+            keys = [k for k in self._keys if k[0] != key_id]
+            keys.append((key_id, prepared))
+            self._keys = tuple(keys)
+
+    def remove_secret(self, key_id: str) -> None:
+        """Retire the secret registered under ``key_id``.
+
+        Raises:
+            KeyError: If ``key_id`` is unknown.
+            ValueError: If it is the last active secret.
+        """
+        with self._lock:
+            keys = tuple(k for k in self._keys if k[0] != key_id)
+            if len(keys) == len(self._keys):
+                raise KeyError(key_id)
+            if not keys:
+                raise ValueError("Cannot remove the last active secret.")
+            self._keys = keys
+
+    def _match(
+        self, parts: tuple[bytes, ...], signatures: list[bytes | None]
+    ) -> tuple[str, int] | None:
+        for key_id, prepared in self._keys:
+            mac = prepared.copy()
+            for part in parts:
+                mac.update(part)
+            expected = mac.digest()
+            for index, candidate in enumerate(signatures):
+                if candidate is not None and hmac.compare_digest(expected, candidate):
+                    return key_id, index
+        return None
+
+    def verify(self, payload: bytes, signature: str) -> str:
+        """Verify a plain signature (as :func:`verify_signature` does).
+
+        Returns:
+            The id of the secret that produced the signature.
+
+        Raises:
+            WebhookVerificationError: If no active secret matches.
+        """
+        if signature.startswith(self._header_prefix):
+            signature = signature[len(self._header_prefix) :]
+        match = self._match((payload,), [_decode_signature(signature, self._encoding)])
+        if match is None:
+            raise WebhookVerificationError("Webhook signature verification failed.")
+        return match[0]
+
+    def verify_timestamped(
+        self,
+        payload: bytes,
+        header_value: str,
+        *,
+        scheme: str = "v1",
+        timestamp_key: str = "t",
+        timestamp_scale: float = 1.0,
+        replay_guard: ReplayGuard | None = None,
+    ) -> tuple[str, str]:
+        """Verify a ``t=…,v1=…`` header (see :func:`verify_timestamped_signature`).
+
+        Returns:
+            ``(key_id, timestamp)``.
+
+        Raises:
+            WebhookVerificationError: If the header is malformed or no active
+                secret matches.
+            WebhookReplayError: If ``replay_guard`` rejects the delivery.
+        """
+        timestamp, raw = _parse_signature_header(header_value, timestamp_key, scheme)
+        if not timestamp or not raw:
+            raise WebhookVerificationError(
+                f"Malformed signature header: missing {timestamp_key}= "
+                f"or {scheme}= component."
+            )
+        decoded = [_decode_signature(value, self._encoding) for value in raw]
+        match = self._match((f"{timestamp}.".encode(), payload), decoded)
+        if match is None:
+            raise WebhookVerificationError("Webhook signature verification failed.")
+        key_id, index = match
+        if replay_guard is not None:
+            replay_guard.check(timestamp, raw[index], scale=timestamp_scale)
+        return key_id, timestamp
+
+
+def parse_event(
+    payload: bytes,
+    *,
+    provider: str = "unknown",
+) -> WebhookEvent:
+    """Best-effort parse and normalisation of a raw webhook payload.
+
+    Uses the :class:`~merchants.webhooks.schemas.WebhookSchema` declared by
+    the registered provider named ``provider``; otherwise falls back to
+    :data:`~merchants.webhooks.schemas.DEFAULT_SCHEMA`, which extracts the
+    common fields (``id``, ``event_type``/``type``, ``payment_id``,
+    ``status``) regardless of provider format.
+
+    Args:
+        payload: Raw request body bytes.
+        provider: Provider name hint for the returned event.
+
+    Returns:
+        A :class:`~merchants.models.WebhookEvent`.  Fields that cannot be
+        extracted are left as ``None`` / ``PaymentState.UNKNOWN``.
+    """
+    return schema_for(provider).parse(payload, provider=provider)
+
+
+class WebhookNotifier:
+    """In-process fan-out of parsed webhook events to interested waiters.
+
+    Webhook endpoints :meth:`publish` every event they parse; pollers such as
+    :meth:`~merchants.client.PaymentsResource.wait_until_final`
+    :meth:`subscribe` to a payment id and are woken as soon as a matching
+    event arrives, instead of waiting for their next poll.
+
+    Example::
+
+        notifier = WebhookNotifier()
+        client = Client("stripe", notifier=notifier)
+
+        # In the webhook view:
+        notifier.publish(provider.parse_webhook(body, headers))
+
+        # In the success page:
+        result = client.payments.wait_until_final(session_id, timeout=30)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, list[Callable[[WebhookEvent], None]]] = {}
+
+    def subscribe(
+        self, payment_id: str, callback: Callable[[WebhookEvent], None]
+    ) -> Callable[[], None]:
+        """Call ``callback(event)`` for every published event for ``payment_id``.
+
+        Callbacks run on the publishing thread and must not block.
+
+        Returns:
+            A zero-argument function that removes the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(payment_id, []).append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                callbacks = self._subscribers.get(payment_id)
+                if callbacks and callback in callbacks:
+                    callbacks.remove(callback)
+                    if not callbacks:
+                        del self._subscribers[payment_id]
+
+        return unsubscribe
+
+    def publish(self, event: WebhookEvent) -> int:
+        """Deliver ``event`` to every subscriber of ``event.payment_id``.
+
+        Returns:
+            The number of subscribers notified.
+        """
+        if not event.payment_id:
+            return 0
+        with self._lock:
+            callbacks = list(self._subscribers.get(event.payment_id, ()))
+        for callback in callbacks:
+            callback(event)
+        return len(callbacks)
@@ -0,0 +1,176 @@
+"""Batch webhook verification and parsing.
+
+For draining webhook backlogs (after an outage, or from a provider's bulk
+notification export) :func:`verify_signatures` and :func:`parse_events`
+process whole sequences of ``(payload, headers)`` pairs in one call.
+
+Both run in-process by default.  Pass ``processes=N`` to fan the work out
+over a :class:`~concurrent.futures.ProcessPoolExecutor`; items are sent to
+workers in chunks of ``chunksize`` to amortise pickling and IPC, and each
+worker keys its HMAC state once at start-up.  Parse workers import the
+provider's module at start-up, so its state table is in place under the
+``spawn`` and ``forkserver`` start methods as well as ``fork``.
+
+Usage::
+
+    from merchants.webhooks import parse_events, verify_signatures
+
+    results = verify_signatures(backlog, {"current": secret}, processes=8)
+    valid = [item for item, r in zip(backlog, results) if r.ok]
+    events = parse_events(valid, provider="stripe", processes=8)
+"""
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import Any
+
+import merchants.webhooks as webhooks
+from merchants.models import WebhookEvent
+from merchants.providers import _PROVIDER_CLASSES, _REGISTRY
+from merchants.result import Failure, Result, Success
+
+#: A raw webhook as received: ``(payload, headers)``.
+WebhookItem = tuple[bytes, dict[str, str]]
+
+_worker_verifier: Any = None
+_worker_header: str = ""
+
+
+def _get_header(headers: dict[str, str], name: str) -> str:
+    value = headers.get(name)
+    if value is not None:
+        return value
+    lowered = name.lower()
+    for key, val in headers.items():
+        if key.lower() == lowered:
+            return val
+    return ""
+
+
+def _verify(verifier: Any, header: str, item: WebhookItem) -> Result[str, Exception]:
+    payload, headers = item
+    signature = _get_header(headers, header)
+    try:
+        if not signature:
+            raise webhooks.WebhookVerificationError(f"Missing {header} header.")
+        return Success(verifier.verify(payload, signature))
+    except webhooks.WebhookVerificationError as exc:
+        return Failure(exc)
+
+
+def _init_worker(
+    secrets: Any, signature_header: str, header_prefix: str, encoding: str
+) -> None:
+    # Runs once per worker process: hmac objects are not picklable, so each
+    # process keys its own verifier from the secrets.
+    global _worker_verifier, _worker_header
+    _worker_verifier = webhooks.WebhookVerifier(
+        secrets, header_prefix=header_prefix, encoding=encoding
+    )
+    _worker_header = signature_header
+
+
+def _worker_verify(item: WebhookItem) -> Result[str, Exception]:
+    return _verify(_worker_verifier, _worker_header, item)
+
+
+def _provider_module(provider: str) -> str | None:
+    """Module defining the provider class registered for ``provider``, if any."""
+    cls = _PROVIDER_CLASSES.get(provider)
+    if cls is None and provider in _REGISTRY:
+        cls = type(_REGISTRY[provider])
+    return None if cls is None else cls.__module__
+
+
+def _init_parse_worker(module: str | None) -> None:
+    # Processes started with spawn/forkserver begin with empty provider
+    # tables; importing the class's module registers its state table again.
+    if module is not None:
+        importlib.import_module(module)
+
+
+def _worker_parse(args: tuple[bytes, str]) -> WebhookEvent:
+    payload, provider = args
+    return webhooks.parse_event(payload, provider=provider)
+
+
+def verify_signatures(
+    items: Iterable[WebhookItem],
+    secrets: str | bytes | list[str | bytes] | dict[str, str | bytes],
+    *,
+    signature_header: str = "X-Signature",
+    header_prefix: str = "sha256=",
+    encoding: str = "hex",
+    processes: int | None = None,
+    chunksize: int = 1024,
+    mp_context: BaseContext | None = None,
+) -> list[Result[str, Exception]]:
+    """Verify the HMAC-SHA256 signature of many webhooks.
+
+    Args:
+        items: ``(payload, headers)`` pairs.
+        secrets: Active secrets, in any form accepted by
+            :class:`~merchants.webhooks.WebhookVerifier`.
+        signature_header: Header carrying the signature (matched
+            case-insensitively).
+        header_prefix: Prefix stripped from the signature value.
+        encoding: Signature encoding, ``"hex"`` or ``"base64"``.
+        processes: Number of worker processes; ``None`` or ``0`` verifies
+            in the calling process.
+        chunksize: Items sent to a worker per round-trip.
+        mp_context: :mod:`multiprocessing` context for the worker pool
+            (default: the platform's start method).
+
+    Returns:
+        One result per item, in input order: ``Success(key_id)`` naming the
+        secret that matched, or ``Failure(WebhookVerificationError)``.
+    """
+    if not processes:
+        verifier = webhooks.WebhookVerifier(
+            secrets, header_prefix=header_prefix, encoding=encoding
+        )
+        return [_verify(verifier, signature_header, item) for item in items]
+    initargs = (secrets, signature_header, header_prefix, encoding)
+    with ProcessPoolExecutor(
+        processes, mp_context, initializer=_init_worker, initargs=initargs
+    ) as pool:
+        return list(pool.map(_worker_verify, items, chunksize=chunksize))
+
+
+def parse_events(
+    items: Iterable[WebhookItem],
+    *,
+    provider: str = "unknown",
+    processes: int | None = None,
+    chunksize: int = 1024,
+    mp_context: BaseContext | None = None,
+) -> list[WebhookEvent]:
+    """Parse many webhooks with :func:`~merchants.webhooks.parse_event`.
+
+    Args:
+        items: ``(payload, headers)`` pairs.
+        provider: Provider name hint for the returned events.
+        processes: Number of worker processes; ``None`` or ``0`` parses in
+            the calling process.
+        chunksize: Items sent to a worker per round-trip.
+        mp_context: :mod:`multiprocessing` context for the worker pool
+            (default: the platform's start method).
+
+    Returns:
+        One :class:`~merchants.models.WebhookEvent` per item, in input order.
+    """
+    if not processes:
+        return [
+            webhooks.parse_event(payload, provider=provider) for payload, _ in items
+        ]
+    # Headers are not needed for parsing, so they are not shipped to workers.
+    tagged: Iterator[tuple[bytes, str]] = ((payload, provider) for payload, _ in items)
+    initargs = (_provider_module(provider),)
+    with ProcessPoolExecutor(
+        processes, mp_context, initializer=_init_parse_worker, initargs=initargs
+    ) as pool:
+        return list(pool.map(_worker_parse, tagged, chunksize=chunksize))
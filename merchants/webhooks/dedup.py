@@ -0,0 +1,262 @@
+"""Webhook event de-duplication.
+
+Providers redeliver webhooks (retries, at-least-once delivery).  A
+:class:`WebhookDeduplicator` remembers what has already been accepted so
+duplicates are dropped before any verification, parsing or database work.
+
+Events are keyed by ``(provider, event_id)``; payloads without an event id
+fall back to a SHA-256 digest of the raw body.  The digest of every accepted
+payload is recorded too, so a byte-identical redelivery is rejected with a
+single store lookup, without parsing.
+
+Storage is pluggable through :class:`DedupStore`:
+
+- :class:`MemoryDedupStore` - bounded in-process LRU with optional TTL.
+- :class:`SQLiteDedupStore` - a local SQLite file shared by processes on one host.
+- :class:`merchants.sqlalchemy.SQLAlchemyDedupStore` - any SQLAlchemy database.
+
+Usage::
+
+    from merchants.webhooks import MemoryDedupStore, WebhookDeduplicator
+
+    dedup = WebhookDeduplicator(MemoryDedupStore(maxsize=100_000, ttl=86_400))
+
+    event = dedup.parse_webhook(provider, body, headers)
+    if event is None:
+        return "", 200   # duplicate - already handled
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+
+from merchants.models import PaymentState, WebhookEvent
+from merchants.providers import Provider
+
+
+def event_key(provider: str, event_id: str, state: PaymentState | None = None) -> str:
+    """Return the de-duplication key for a provider event id.
+
+    Args:
+        provider: Provider key.
+        event_id: Event id as reported by the provider.
+        state: Normalised state of the event.  Some providers (Khipu, Flow)
+            reuse the payment id or token as ``event_id``; including the
+            state keeps later transitions of the same payment distinct.
+    """
+    if state is None:
+        return f"{provider}:evt:{event_id}"
+    return f"{provider}:evt:{event_id}:{PaymentState(state).value}"
+
+
+def payload_key(provider: str, payload: bytes) -> str:
+    """Return the de-duplication key for a raw payload (SHA-256 digest)."""
+    return f"{provider}:sha256:{hashlib.sha256(payload).hexdigest()}"
+
+
+class DedupStore(ABC):
+    """Storage backend for :class:`WebhookDeduplicator`."""
+
+    @abstractmethod
+    def add(self, key: str) -> bool:
+        """Record ``key``.  Return ``True`` if it was new, ``False`` if already seen."""
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        """Return ``True`` if ``key`` has been recorded (and not expired)."""
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """Forget ``key`` (e.g. after a handler failed, to allow a retry)."""
+
+
+class MemoryDedupStore(DedupStore):
+    """Bounded in-memory LRU store with optional time-to-live.
+
+    Args:
+        maxsize: Maximum number of keys kept; the least recently seen key is
+            evicted first.
+        ttl: Seconds after which a key is forgotten (``None`` = never).
+        clock: Monotonic clock, overridable for tests.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100_000,
+        *,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._keys: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str, now: float) -> bool:
+        # Caller holds the lock.
+        expires = self._keys.get(key)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self._keys[key]
+            return False
+        return True
+
+    def add(self, key: str) -> bool:
+        now = self._clock()
+        expires = now + self._ttl if self._ttl is not None else float("inf")
+        with self._lock:
+            keys = self._keys
+            new = not self._alive(key, now)
+            keys[key] = expires
+            keys.move_to_end(key)
+            while len(keys) > self._maxsize:
+                keys.popitem(last=False)
+            return new
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._alive(key, self._clock())
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SQLiteDedupStore(DedupStore):
+    """De-duplication keys persisted in a SQLite database file.
+
+    Suitable for several worker processes on one host.  Keys older than
+    ``ttl`` seconds are ignored and removed by :meth:`purge`.
+
+    Args:
+        path: Database file path (``":memory:"`` for a private in-memory DB).
+        ttl: Seconds after which a key is forgotten (``None`` = never).
+        table: Table name; created on first use.
+    """
+
+    def __init__(
+        self,
+        path: str = "merchants_dedup.sqlite3",
+        *,
+        ttl: float | None = None,
+        table: str = "merchants_webhook_dedup",
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name {table!r}.")
+        self._ttl = ttl
+        self._table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+
+    def _cutoff(self) -> float:
+        return time.time() - self._ttl if self._ttl is not None else float("-inf")
+
+    def add(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                f"INSERT INTO {self._table} (key, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE seen_at < ?",
+                (key, now, self._cutoff()),
+            )
+        # rowcount is 1 for a fresh insert or an expired-row refresh, 0 otherwise.
+        return cur.rowcount > 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {self._table} WHERE key = ? AND seen_at >= ?",
+                (key, self._cutoff()),
+            ).fetchone()
+        return row is not None
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def purge(self) -> int:
+        """Delete expired keys.  Returns the number of rows removed."""
+        with self._lock:
+            cur = self._conn.execute(
+                f"DELETE FROM {self._table} WHERE seen_at < ?", (self._cutoff(),)
+            )
+        return cur.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class WebhookDeduplicator:
+    """Drop redelivered webhooks before they are processed again.
+
+    Args:
+        store: Backend that records accepted keys.
+    """
+
+    def __init__(self, store: DedupStore) -> None:
+        self._store = store
+
+    def seen_payload(self, provider: str, payload: bytes) -> bool:
+        """Return ``True`` if this exact payload was already accepted."""
+        return payload_key(provider, payload) in self._store
+
+    def accept(self, event: WebhookEvent, payload: bytes) -> bool:
+        """Record a parsed event.  Return ``False`` if it is a duplicate.
+
+        The event is keyed by ``(event.event_id, event.state)`` when an id is
+        present, otherwise by the payload digest; the digest is always
+        recorded as well.  The state is part of the key because some
+        providers reuse the payment id as ``event_id``, so a later
+        ``pending`` -> ``succeeded`` notification must not look like a
+        redelivery.
+        """
+        digest = payload_key(event.provider, payload)
+        if event.event_id:
+            new = self._store.add(
+                event_key(event.provider, event.event_id, event.state)
+            )
+            self._store.add(digest)
+            return new
+        return self._store.add(digest)
+
+    def forget(self, event: WebhookEvent, payload: bytes) -> None:
+        """Undo :meth:`accept`, so a redelivery of this event is processed again."""
+        if event.event_id:
+            self._store.discard(event_key(event.provider, event.event_id, event.state))
+        self._store.discard(payload_key(event.provider, payload))
+
+    def parse_webhook(
+        self, provider: Provider, payload: bytes, headers: dict[str, str]
+    ) -> WebhookEvent | None:
+        """Parse via ``provider.parse_webhook`` unless the webhook is a duplicate.
+
+        Byte-identical redeliveries are rejected before parsing; other
+        duplicates are caught by event id after parsing.
+
+        Returns:
+            The parsed :class:`~merchants.models.WebhookEvent`, or ``None``
+            for a duplicate.
+        """
+        if self.seen_payload(provider.key, payload):
+            return None
+        event = provider.parse_webhook(payload, headers)
+        return event if self.accept(event, payload) else None
@@ -0,0 +1,354 @@
+"""Route parsed webhook events to registered handlers.
+
+:class:`WebhookDispatcher` replaces hand-written ``if event.event_type ==
+...`` chains.  Handlers register for a ``(provider, event_type, state)``
+pattern where any part may be left as a wildcard; each handler that matches
+an event runs in registration order, isolated from the others' failures,
+and its call count, error count and run time are tracked.
+
+Usage::
+
+    from merchants.models import PaymentState
+    from merchants.webhooks import WebhookDispatcher
+
+    dispatcher = WebhookDispatcher()
+
+    @dispatcher.on(state=PaymentState.SUCCEEDED)
+    def fulfil(event):
+        orders.mark_paid(event.payment_id)
+
+    @dispatcher.on(provider="stripe", event_type="charge.refunded")
+    async def refund(event):
+        await ledger.record_refund(event.payment_id)
+
+    results = await dispatcher.dispatch_async(event)
+
+A dispatcher plugs straight into the ingestion pipelines::
+
+    dispatcher = WebhookDispatcher(raise_errors=True)
+    WebhookPipeline(provider, dispatcher.dispatch, dedup=dedup)
+    AsyncWebhookPipeline(provider, dispatcher.dispatch_async, dedup=dedup)
+
+Use ``raise_errors=True`` there: a pipeline only forgets a de-duplicated
+event (so the provider's redelivery is processed) when its handler raises.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import inspect
+import itertools
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from merchants.models import PaymentState, WebhookEvent
+from merchants.providers import Provider
+from merchants.result import Failure, Result, Success
+
+logger = logging.getLogger(__name__)
+
+#: ``handler(event)``; may return an awaitable when used with
+#: :meth:`WebhookDispatcher.dispatch_async`.
+EventHandler = Callable[[WebhookEvent], Any]
+#: ``on_error(exc, event, handler)``.
+DispatchErrorHandler = Callable[[Exception, WebhookEvent, EventHandler], None]
+
+_Pattern = tuple[str | None, str | None, PaymentState | None]
+
+# Patterns consulted for a concrete (provider, event_type, state) key, one
+# per combination of wildcarded positions.
+_WILDCARD_MASKS = tuple(itertools.product((False, True), repeat=3))
+
+
+@dataclasses.dataclass
+class HandlerStats:
+    """Timing and outcome counters for one handler.
+
+    Attributes:
+        calls: Number of invocations.
+        errors: Number of invocations that raised.
+        total_time: Cumulative run time in seconds.
+        max_time: Slowest single run in seconds.
+    """
+
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        """Average run time in seconds (``0.0`` before the first call)."""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class _Registration:
+    __slots__ = ("handler", "seq", "stats")
+
+    def __init__(self, handler: EventHandler, seq: int, stats: HandlerStats) -> None:
+        self.handler = handler
+        self.seq = seq
+        self.stats = stats
+
+
+def _handler_name(handler: EventHandler) -> str:
+    module = getattr(handler, "__module__", None) or ""
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+    return f"{module}.{name}" if module else name
+
+
+class WebhookDispatcher:
+    """Dispatch :class:`~merchants.models.WebhookEvent` objects to handlers.
+
+    Routing is a dictionary lookup: registration indexes handlers by their
+    exact pattern, and the ordered handler tuple for each concrete
+    ``(provider, event_type, state)`` key is resolved once from the eight
+    wildcard combinations and then cached until the next registration
+    change.
+
+    Args:
+        on_error: Called as ``on_error(exc, event, handler)`` when a handler
+            raises.  Errors are logged when omitted.
+        raise_errors: After every matching handler has run, re-raise the
+            first handler exception instead of returning it as a
+            :class:`~merchants.result.Failure`.  Enable this when the
+            dispatcher is the handler of a pipeline with ``dedup`` so failed
+            events are released for redelivery.
+        cache_size: Maximum number of resolved routes kept; the cache is
+            reset when full.
+        clock: High-resolution timer used for handler metrics.
+    """
+
+    def __init__(
+        self,
+        *,
+        on_error: DispatchErrorHandler | None = None,
+        raise_errors: bool = False,
+        cache_size: int = 4096,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._on_error = on_error
+        self._raise_errors = raise_errors
+        self._cache_size = cache_size
+        self._clock = clock
+        self._patterns: dict[_Pattern, list[_Registration]] = {}
+        self._routes: dict[_Pattern, tuple[_Registration, ...]] = {}
+        self._stats: dict[str, HandlerStats] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def register(
+        self,
+        handler: EventHandler,
+        *,
+        provider: Provider | str | None = None,
+        event_type: str | None = None,
+        state: PaymentState | None = None,
+    ) -> Callable[[], None]:
+        """Register ``handler`` for events matching the given pattern.
+
+        ``None`` in any position matches every value.
+
+        Args:
+            handler: Callable taking the event.
+            provider: Provider instance or key.
+            event_type: Exact ``event.event_type``.
+            state: Exact ``event.state``.
+
+        Returns:
+            A callable that removes this registration.
+        """
+        key = provider.key if isinstance(provider, Provider) else provider
+        pattern: _Pattern = (key, event_type, state)
+        name = _handler_name(handler)
+        with self._lock:
+            seq = next(self._counter)
+            # Lambdas and closures from one factory share a qualified name;
+            # later registrations get their sequence number appended.
+            if name in self._stats:
+                name = f"{name}#{seq}"
+            stats = self._stats[name] = HandlerStats()
+            registration = _Registration(handler, seq, stats)
+            self._patterns.setdefault(pattern, []).append(registration)
+            self._routes = {}
+
+        def unregister() -> None:
+            with self._lock:
+                entries = self._patterns.get(pattern, [])
+                if registration in entries:
+                    entries.remove(registration)
+                    if not entries:
+                        del self._patterns[pattern]
+                    self._routes = {}
+
+        return unregister
+
+    def on(
+        self,
+        *,
+        provider: Provider | str | None = None,
+        event_type: str | None = None,
+        state: PaymentState | None = None,
+    ) -> Callable[[EventHandler], EventHandler]:
+        """Decorator form of :meth:`register`."""
+
+        def decorator(handler: EventHandler) -> EventHandler:
+            self.register(
+                handler, provider=provider, event_type=event_type, state=state
+            )
+            return handler
+
+        return decorator
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def _resolve(self, event: WebhookEvent) -> tuple[_Registration, ...]:
+        key: _Pattern = (event.provider, event.event_type, event.state)
+        routes = self._routes
+        found = routes.get(key)
+        if found is not None:
+            return found
+        with self._lock:
+            patterns = self._patterns
+            matched: list[_Registration] = []
+            for mask in _WILDCARD_MASKS:
+                pattern = tuple(None if wild else part for wild, part in zip(mask, key))
+                matched.extend(patterns.get(pattern, ()))  # type: ignore[arg-type]
+            matched.sort(key=lambda r: r.seq)
+            found = tuple(matched)
+            if len(self._routes) >= self._cache_size:
+                self._routes = {}
+            self._routes[key] = found
+        return found
+
+    def handlers_for(self, event: WebhookEvent) -> list[EventHandler]:
+        """Return the handlers that :meth:`dispatch` would call, in order."""
+        return [r.handler for r in self._resolve(event)]
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def _record(
+        self, registration: _Registration, elapsed: float, failed: bool
+    ) -> None:
+        stats = registration.stats
+        with self._lock:
+            stats.calls += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+            if failed:
+                stats.errors += 1
+
+    def _fail(
+        self, exc: Exception, event: WebhookEvent, handler: EventHandler
+    ) -> Failure[Exception]:
+        if self._on_error is not None:
+            # A failing error hook must not skip the remaining handlers.
+            try:
+                self._on_error(exc, event, handler)
+            except Exception:
+                logger.exception(
+                    "Dispatch on_error hook failed for handler %s",
+                    _handler_name(handler),
+                )
+        else:
+            logger.error(
+                "Webhook handler %s failed for %s event %s",
+                _handler_name(handler),
+                event.provider,
+                event.event_id,
+                exc_info=exc,
+            )
+        return Failure(exc)
+
+    def _finish(
+        self, results: list[Result[Any, Exception]]
+    ) -> list[Result[Any, Exception]]:
+        if self._raise_errors:
+            for result in results:
+                if isinstance(result, Failure):
+                    raise result.error
+        return results
+
+    def dispatch(self, event: WebhookEvent) -> list[Result[Any, Exception]]:
+        """Call every matching handler synchronously.
+
+        Returns:
+            One result per handler, in call order: ``Success(return value)``
+            or ``Failure(exception)``.  Coroutine handlers fail with
+            :class:`TypeError`; use :meth:`dispatch_async` for those.
+
+        Raises:
+            Exception: The first handler failure, when the dispatcher was
+                created with ``raise_errors=True``.
+        """
+        results: list[Result[Any, Exception]] = []
+        for registration in self._resolve(event):
+            handler = registration.handler
+            started = self._clock()
+            try:
+                value = handler(event)
+                if inspect.isawaitable(value):
+                    if inspect.iscoroutine(value):
+                        value.close()
+                    raise TypeError(
+                        f"Handler {_handler_name(handler)} is asynchronous; "
+                        "use dispatch_async()."
+                    )
+            except Exception as exc:
+                self._record(registration, self._clock() - started, True)
+                results.append(self._fail(exc, event, handler))
+                continue
+            self._record(registration, self._clock() - started, False)
+            results.append(Success(value))
+        return self._finish(results)
+
+    async def dispatch_async(self, event: WebhookEvent) -> list[Result[Any, Exception]]:
+        """Call every matching handler, awaiting asynchronous ones in turn.
+
+        Returns:
+            Same as :meth:`dispatch`.
+
+        Raises:
+            Exception: Same as :meth:`dispatch`.
+        """
+        results: list[Result[Any, Exception]] = []
+        for registration in self._resolve(event):
+            handler = registration.handler
+            started = self._clock()
+            try:
+                value = handler(event)
+                if inspect.isawaitable(value):
+                    value = await value
+            except Exception as exc:
+                self._record(registration, self._clock() - started, True)
+                results.append(self._fail(exc, event, handler))
+                continue
+            self._record(registration, self._clock() - started, False)
+            results.append(Success(value))
+        return self._finish(results)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, HandlerStats]:
+        """Return a snapshot of per-registration metrics keyed by handler name.
+
+        Keys are the handler's qualified name; a registration whose name is
+        already taken (another lambda, a closure from the same factory, or
+        the same function registered twice) is keyed ``"<name>#<seq>"``.
+        """
+        with self._lock:
+            return {name: dataclasses.replace(s) for name, s in self._stats.items()}
@@ -0,0 +1,422 @@
+"""In-process webhook ingestion pipeline.
+
+Webhook views hand the raw body and headers to :meth:`WebhookPipeline.submit`
+and return ``200`` straight away; verification, :meth:`Provider.parse_webhook`
+and the application handler run later on a worker pool.
+
+Work is spread over *lanes*: each lane is a bounded queue drained by exactly
+one worker, and every payload is routed to a lane by its partition key
+(the payment id by default).  Events for the same payment therefore run
+one at a time, in submission order, while different payments proceed in
+parallel.  When a lane is full, :meth:`~WebhookPipeline.submit` raises
+:class:`WebhookQueueFull` (or blocks, if asked to) so the view can answer
+``503`` and let the provider retry later.
+
+Usage::
+
+    from merchants.webhooks import WebhookPipeline
+
+    def handle(event):
+        Payment.update_state(event.payment_id, event.state)
+
+    pipeline = WebhookPipeline("stripe", handle, workers=8, maxsize=10_000)
+    pipeline.start()
+
+    @app.post("/webhooks/stripe")
+    def stripe_webhook():
+        try:
+            pipeline.submit(request.get_data(), dict(request.headers))
+        except WebhookQueueFull:
+            return "", 503
+        return "", 200
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any
+from urllib.parse import parse_qs
+
+from merchants.models import WebhookEvent
+from merchants.providers import Provider, get_provider
+from merchants.webhooks.dedup import WebhookDeduplicator
+
+logger = logging.getLogger(__name__)
+
+#: ``handler(event)`` - may return an awaitable in :class:`AsyncWebhookPipeline`.
+WebhookHandler = Callable[[WebhookEvent], Any]
+#: ``verify(payload, headers)`` - raise to reject the payload.
+WebhookVerifierFunc = Callable[[bytes, dict[str, str]], None]
+#: ``partition_key(payload, headers)`` - lane routing key, ``None`` for any lane.
+PartitionKey = Callable[[bytes, dict[str, str]], str | None]
+#: ``on_error(exc, payload, headers)``.
+PipelineErrorHandler = Callable[[Exception, bytes, dict[str, str]], None]
+
+
+class WebhookQueueFull(Exception):
+    """Raised when the pipeline lane for a payload has no free capacity."""
+
+
+def payment_partition_key(payload: bytes, headers: dict[str, str]) -> str | None:
+    """Best-effort payment id used to route a payload to its lane.
+
+    Understands JSON bodies (``payment_id``, ``token``, ``resource.id``,
+    ``data.object.id``) and form-encoded bodies (``token``, ``payment_id``).
+    Returns ``None`` when no identifier is found.
+    """
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        qs = parse_qs(payload.decode(errors="replace"))
+        values = qs.get("token") or qs.get("payment_id")
+        return values[0] if values else None
+    if not isinstance(data, dict):
+        return None
+    candidate = data.get("payment_id") or data.get("token")
+    if not candidate:
+        resource = data.get("resource")
+        if isinstance(resource, dict):
+            candidate = resource.get("id")
+    if not candidate:
+        obj = data.get("data")
+        obj = obj.get("object") if isinstance(obj, dict) else None
+        if isinstance(obj, dict):
+            candidate = obj.get("id")
+    return str(candidate) if candidate else None
+
+
+class _PipelineBase:
+    def __init__(
+        self,
+        provider: Provider | str,
+        handler: WebhookHandler,
+        *,
+        workers: int,
+        maxsize: int,
+        verify: WebhookVerifierFunc | None,
+        partition_key: PartitionKey | None,
+        on_error: PipelineErrorHandler | None,
+        dedup: WebhookDeduplicator | None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self._provider = get_provider(provider)
+        self._handler = handler
+        self._workers = workers
+        self._lane_size = max(1, maxsize // workers)
+        self._verify = verify
+        self._partition_key = partition_key
+        self._on_error = on_error
+        self._dedup = dedup
+        self._round_robin = itertools.count()
+
+    def _lane_for(self, payload: bytes, headers: dict[str, str]) -> int:
+        key = self._partition_key(payload, headers) if self._partition_key else None
+        if key is None:
+            return next(self._round_robin) % self._workers
+        return hash(key) % self._workers
+
+    def _parse(self, payload: bytes, headers: dict[str, str]) -> WebhookEvent | None:
+        dedup = self._dedup
+        if dedup is not None and dedup.seen_payload(self._provider.key, payload):
+            return None
+        if self._verify is not None:
+            self._verify(payload, headers)
+        event = self._provider.parse_webhook(payload, headers)
+        if dedup is not None and not dedup.accept(event, payload):
+            return None
+        return event
+
+    def _release(self, event: WebhookEvent | None, payload: bytes) -> None:
+        # A failed handler must not leave the event marked as processed,
+        # otherwise the provider's redelivery would be dropped as a duplicate.
+        if event is not None and self._dedup is not None:
+            self._dedup.forget(event, payload)
+
+    def _report(self, exc: Exception, payload: bytes, headers: dict[str, str]) -> None:
+        if self._on_error is not None:
+            # A failing error handler must not take the lane worker down.
+            try:
+                self._on_error(exc, payload, headers)
+            except Exception:
+                logger.exception(
+                    "Webhook on_error handler failed for provider %r",
+                    self._provider.key,
+                )
+        else:
+            logger.exception(
+                "Webhook processing failed for provider %r",
+                self._provider.key,
+                exc_info=exc,
+            )
+
+
+class WebhookPipeline(_PipelineBase):
+    """Thread-based webhook pipeline with bounded lanes and per-payment ordering.
+
+    Args:
+        provider: Provider instance or registered key whose
+            :meth:`~merchants.providers.Provider.parse_webhook` is used.
+        handler: Called with each parsed :class:`~merchants.models.WebhookEvent`.
+        workers: Number of lanes / worker threads.
+        maxsize: Total queued payloads across all lanes (split evenly).
+        verify: Optional ``verify(payload, headers)`` run before parsing,
+            e.g. a :func:`verify_signature` wrapper.  Raise to reject.
+        partition_key: Maps a payload to its ordering key; defaults to
+            :func:`payment_partition_key`.  ``None`` spreads payloads
+            round-robin with no ordering guarantee.
+        on_error: Called as ``on_error(exc, payload, headers)`` when
+            verification, parsing or the handler raises.  Logged if omitted.
+        dedup: Optional :class:`~merchants.webhooks.WebhookDeduplicator`;
+            duplicates are dropped before verification where possible and
+            never reach ``handler``.  An event whose handler raises is
+            forgotten again so the provider's retry is processed.
+    """
+
+    def __init__(
+        self,
+        provider: Provider | str,
+        handler: WebhookHandler,
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        verify: WebhookVerifierFunc | None = None,
+        partition_key: PartitionKey | None = payment_partition_key,
+        on_error: PipelineErrorHandler | None = None,
+        dedup: WebhookDeduplicator | None = None,
+    ) -> None:
+        super().__init__(
+            provider,
+            handler,
+            workers=workers,
+            maxsize=maxsize,
+            verify=verify,
+            partition_key=partition_key,
+            on_error=on_error,
+            dedup=dedup,
+        )
+        self._lanes: list[queue.Queue[tuple[bytes, dict[str, str]] | None]] = [
+            queue.Queue(self._lane_size) for _ in range(workers)
+        ]
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        if self._threads:
+            return
+        for index, lane in enumerate(self._lanes):
+            thread = threading.Thread(
+                target=self._work,
+                args=(lane,),
+                name=f"merchants-webhooks-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(
+        self,
+        payload: bytes,
+        headers: dict[str, str],
+        *,
+        block: bool = False,
+        timeout: float | None = None,
+    ) -> None:
+        """Enqueue a raw webhook for background processing.
+
+        Raises:
+            WebhookQueueFull: If the target lane is full (immediately, or
+                after ``timeout`` seconds when ``block=True``).
+        """
+        lane = self._lanes[self._lane_for(payload, headers)]
+        try:
+            lane.put((payload, headers), block=block, timeout=timeout)
+        except queue.Full:
+            raise WebhookQueueFull("Webhook pipeline lane is full.") from None
+
+    def pending(self) -> int:
+        """Approximate number of queued, not yet processed payloads."""
+        return sum(lane.qsize() for lane in self._lanes)
+
+    def join(self) -> None:
+        """Block until every submitted payload has been processed."""
+        for lane in self._lanes:
+            lane.join()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Process what is queued, then stop the workers."""
+        for lane in self._lanes:
+            lane.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def __enter__(self) -> WebhookPipeline:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _work(self, lane: queue.Queue[tuple[bytes, dict[str, str]] | None]) -> None:
+        while True:
+            item = lane.get()
+            try:
+                if item is None:
+                    return
+                payload, headers = item
+                event = None
+                try:
+                    event = self._parse(payload, headers)
+                    if event is not None:
+                        self._handler(event)
+                except Exception as exc:
+                    self._release(event, payload)
+                    self._report(exc, payload, headers)
+            finally:
+                lane.task_done()
+
+
+class AsyncWebhookPipeline(_PipelineBase):
+    """asyncio counterpart of :class:`WebhookPipeline`.
+
+    Lanes are :class:`asyncio.Queue` objects drained by one task each, and
+    ``handler`` may be a coroutine function.  Arguments are the same as for
+    :class:`WebhookPipeline`, plus:
+
+    Args:
+        offload_parse: Run verification and parsing in a worker thread via
+            :func:`asyncio.to_thread` (useful when ``parse_webhook`` performs
+            network I/O, like :class:`~merchants.providers.flow.FlowProvider`).
+    """
+
+    def __init__(
+        self,
+        provider: Provider | str,
+        handler: WebhookHandler,
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        verify: WebhookVerifierFunc | None = None,
+        partition_key: PartitionKey | None = payment_partition_key,
+        on_error: PipelineErrorHandler | None = None,
+        dedup: WebhookDeduplicator | None = None,
+        offload_parse: bool = False,
+    ) -> None:
+        super().__init__(
+            provider,
+            handler,
+            workers=workers,
+            maxsize=maxsize,
+            verify=verify,
+            partition_key=partition_key,
+            on_error=on_error,
+            dedup=dedup,
+        )
+        self._offload_parse = offload_parse
+        self._lanes: list[asyncio.Queue[tuple[bytes, dict[str, str]] | None]] = []
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        """Create the lanes and worker tasks on the running loop (idempotent)."""
+        if self._tasks:
+            return
+        self._lanes = [asyncio.Queue(self._lane_size) for _ in range(self._workers)]
+        self._tasks = [asyncio.create_task(self._work(lane)) for lane in self._lanes]
+
+    def submit_nowait(self, payload: bytes, headers: dict[str, str]) -> None:
+        """Enqueue without waiting.
+
+        Raises:
+            WebhookQueueFull: If the target lane is full.
+            RuntimeError: If the pipeline has not been started.
+        """
+        lane = self._lane(payload, headers)
+        try:
+            lane.put_nowait((payload, headers))
+        except asyncio.QueueFull:
+            raise WebhookQueueFull("Webhook pipeline lane is full.") from None
+
+    async def submit(
+        self,
+        payload: bytes,
+        headers: dict[str, str],
+        *,
+        timeout: float | None = None,
+    ) -> None:
+        """Enqueue, waiting up to ``timeout`` seconds for lane capacity.
+
+        Raises:
+            WebhookQueueFull: If no capacity frees up within ``timeout``.
+            RuntimeError: If the pipeline has not been started.
+        """
+        lane = self._lane(payload, headers)
+        try:
+            await asyncio.wait_for(lane.put((payload, headers)), timeout)
+        except asyncio.TimeoutError:
+            raise WebhookQueueFull("Webhook pipeline lane is full.") from None
+
+    def _lane(
+        self, payload: bytes, headers: dict[str, str]
+    ) -> asyncio.Queue[tuple[bytes, dict[str, str]] | None]:
+        if not self._lanes:
+            raise RuntimeError(
+                "AsyncWebhookPipeline is not started; await start() or use "
+                "'async with' before submitting."
+            )
+        return self._lanes[self._lane_for(payload, headers)]
+
+    def pending(self) -> int:
+        """Approximate number of queued, not yet processed payloads."""
+        return sum(lane.qsize() for lane in self._lanes)
+
+    async def join(self) -> None:
+        """Wait until every submitted payload has been processed."""
+        for lane in self._lanes:
+            await lane.join()
+
+    async def stop(self) -> None:
+        """Process what is queued, then stop the worker tasks."""
+        for lane in self._lanes:
+            await lane.put(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    async def __aenter__(self) -> AsyncWebhookPipeline:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    async def _work(
+        self, lane: asyncio.Queue[tuple[bytes, dict[str, str]] | None]
+    ) -> None:
+        while True:
+            item = await lane.get()
+            try:
+                if item is None:
+                    return
+                payload, headers = item
+                event = None
+                try:
+                    if self._offload_parse:
+                        event = await asyncio.to_thread(self._parse, payload, headers)
+                    else:
+                        event = self._parse(payload, headers)
+                    if event is not None:
+                        result = self._handler(event)
+                        if inspect.isawaitable(result):
+                            await result
+                except Exception as exc:
+                    self._release(event, payload)
+                    self._report(exc, payload, headers)
+            finally:
+                lane.task_done()
@@ -0,0 +1,176 @@
+"""Declarative webhook extraction schemas.
+
+A :class:`WebhookSchema` names where a provider's webhook body keeps the
+event id, event type, payment id and raw status.  Paths are written as
+dotted strings (``"data.object.id"``); a field may list several paths, and
+the first one yielding a truthy value wins.  Paths are compiled once into
+small accessor functions, so parsing does no string splitting and allocates
+no placeholder dicts for missing keys.
+
+Providers declare their schema in the :attr:`~merchants.providers.Provider.webhook_schema`
+class attribute; :func:`~merchants.webhooks.parse_event` picks it by the
+provider hint and falls back to :data:`DEFAULT_SCHEMA`, which probes the
+common Stripe, PayPal and generic layouts.
+
+Usage::
+
+    from merchants.webhooks.schemas import WebhookSchema
+
+    class AcmeProvider(Provider):
+        key = "acme"
+        webhook_schema = WebhookSchema(
+            event_id="uuid",
+            event_type="kind",
+            payment_id=("charge.id", "charge_id"),
+            status="charge.state",
+        )
+
+        def parse_webhook(self, payload, headers):
+            return self.webhook_schema.parse(payload, provider=self.key)
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from merchants.models import PaymentState, WebhookEvent, build_webhook_event
+from merchants.providers import _PROVIDER_SCHEMAS, _REGISTRY, normalise_state
+
+#: A dotted path, or several alternative paths tried in order.
+FieldSpec = str | Sequence[str]
+
+_Accessor = Callable[[dict[str, Any]], Any]
+
+
+def _compile_path(path: str) -> _Accessor:
+    keys = tuple(path.split("."))
+    if len(keys) == 1:
+        (key,) = keys
+        return lambda data: data.get(key)
+
+    def get(data: dict[str, Any]) -> Any:
+        value: Any = data
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    return get
+
+
+def _compile_field(spec: FieldSpec) -> _Accessor:
+    paths = (spec,) if isinstance(spec, str) else tuple(spec)
+    accessors = tuple(_compile_path(p) for p in paths)
+    if not accessors:
+        return lambda data: None
+    if len(accessors) == 1:
+        return accessors[0]
+
+    def first(data: dict[str, Any]) -> Any:
+        for accessor in accessors:
+            value = accessor(data)
+            if value:
+                return value
+        return None
+
+    return first
+
+
+class WebhookSchema:
+    """Where a provider's webhook body keeps the fields of a :class:`WebhookEvent`.
+
+    Args:
+        event_id: Path(s) to the event id.
+        event_type: Path(s) to the event type.
+        payment_id: Path(s) to the payment id.
+        status: Path(s) to the provider's raw payment status, normalised with
+            :func:`~merchants.providers.normalise_state` using the state
+            table of the provider passed to :meth:`parse`.
+        default_event_type: Event type used when none is found.
+    """
+
+    __slots__ = ("_event_id", "_event_type", "_payment_id", "_status", "_default_type")
+
+    def __init__(
+        self,
+        *,
+        event_id: FieldSpec = (),
+        event_type: FieldSpec = (),
+        payment_id: FieldSpec = (),
+        status: FieldSpec = (),
+        default_event_type: str = "unknown",
+    ) -> None:
+        self._event_id = _compile_field(event_id)
+        self._event_type = _compile_field(event_type)
+        self._payment_id = _compile_field(payment_id)
+        self._status = _compile_field(status)
+        self._default_type = default_event_type
+
+    def extract(self, data: dict[str, Any]) -> tuple[Any, str, Any, str | None]:
+        """Return ``(event_id, event_type, payment_id, raw_status)`` from ``data``.
+
+        ``raw_status`` is ``None`` when the body carries no status.
+        """
+        status = self._status(data)
+        return (
+            self._event_id(data),
+            str(self._event_type(data) or self._default_type),
+            self._payment_id(data),
+            str(status) if status else None,
+        )
+
+    def parse(self, payload: bytes, *, provider: str) -> WebhookEvent:
+        """Decode a JSON webhook body and build a normalised :class:`WebhookEvent`.
+
+        Bodies that are not a JSON object yield an event with every field
+        left empty / ``PaymentState.UNKNOWN``.  A missing status is
+        ``UNKNOWN`` without consulting the provider's state table, so only
+        statuses the provider actually sent show up in
+        :meth:`~merchants.providers.StateMap.unknown_states`.
+        """
+        try:
+            data = json.loads(payload)
+        except (ValueError, TypeError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        event_id, event_type, payment_id, raw_status = self.extract(data)
+        return build_webhook_event(
+            event_id=None if event_id is None else str(event_id),
+            event_type=event_type,
+            payment_id=None if payment_id is None else str(payment_id),
+            state=(
+                PaymentState.UNKNOWN
+                if raw_status is None
+                else normalise_state(raw_status, provider)
+            ),
+            provider=provider,
+            raw=data,
+        )
+
+
+#: Best-effort schema covering the Stripe, PayPal and generic layouts.
+DEFAULT_SCHEMA = WebhookSchema(
+    event_id=("id", "event_id"),
+    event_type=("type", "event_type"),
+    payment_id=("payment_id", "resource.id", "data.object.id"),
+    status=("status", "data.object.status", "resource.status"),
+)
+
+
+def schema_for(provider: str) -> WebhookSchema:
+    """Return the webhook schema for the provider key ``provider``.
+
+    A schema on the instance registered under ``provider`` wins; otherwise
+    the one declared by the provider class with that key is used, whether
+    or not an instance was ever registered.  Falls back to
+    :data:`DEFAULT_SCHEMA` for unknown keys and for providers that do not
+    declare one.
+    """
+    schema = getattr(_REGISTRY.get(provider), "webhook_schema", None)
+    if schema is None:
+        schema = _PROVIDER_SCHEMAS.get(provider)
+    return schema if schema is not None else DEFAULT_SCHEMA
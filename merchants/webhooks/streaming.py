@@ -0,0 +1,197 @@
+"""Streaming HMAC verification for large or chunked webhook bodies.
+
+The functions here feed the body to the HMAC chunk by chunk as it arrives
+(from a WSGI ``wsgi.input`` reader, an ASGI ``receive`` loop, or a
+:class:`memoryview` over a buffer) instead of requiring one contiguous
+``bytes`` object.  Chunks are buffered as they go and joined into a single
+``bytes`` only once the signature matches; the caller then hands that to
+the parser.
+
+Usage (Starlette / FastAPI)::
+
+    from merchants.webhooks import verify_khipu_signature_stream_async
+
+    timestamp, body = await verify_khipu_signature_stream_async(
+        request.stream(), secret, request.headers["x-khipu-signature"]
+    )
+    event = provider.parse_webhook(body, dict(request.headers))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from collections.abc import AsyncIterable, Iterable
+from typing import Any
+
+import merchants.webhooks as webhooks
+
+#: A body given whole or as chunks.
+Chunks = bytes | bytearray | memoryview | Iterable[bytes | bytearray | memoryview]
+#: A body arriving asynchronously in chunks.
+AsyncChunks = AsyncIterable[bytes | bytearray | memoryview]
+
+
+class _Buffer:
+    """Feeds chunks to a MAC while keeping them for the parser."""
+
+    __slots__ = ("mac", "_parts", "_size", "_max_size")
+
+    def __init__(self, mac: Any, max_size: int | None) -> None:
+        self.mac = mac
+        self._parts: list[bytes | bytearray | memoryview] = []
+        self._size = 0
+        self._max_size = max_size
+
+    def feed(
+        self, chunk: bytes | bytearray | memoryview, *, keep: bool = False
+    ) -> None:
+        self._size += len(chunk)
+        if self._max_size is not None and self._size > self._max_size:
+            raise webhooks.WebhookVerificationError(
+                f"Webhook body exceeds {self._max_size} bytes."
+            )
+        self.mac.update(chunk)
+        # Mutable chunks are snapshotted: readers commonly reuse one buffer
+        # for every read.  A whole body passed by the caller is kept as is
+        # (``keep``) and only copied by :meth:`body` once it verified.
+        if not keep and not isinstance(chunk, bytes):
+            chunk = bytes(chunk)
+        self._parts.append(chunk)
+
+    def body(self) -> bytes:
+        parts = self._parts
+        if len(parts) == 1:
+            return parts[0] if isinstance(parts[0], bytes) else bytes(parts[0])
+        return b"".join(parts)
+
+
+def _feed_all(buffer: _Buffer, chunks: Chunks) -> None:
+    if isinstance(chunks, (bytes, bytearray, memoryview)):
+        buffer.feed(chunks, keep=True)
+        return
+    for chunk in chunks:
+        buffer.feed(chunk)
+
+
+async def _afeed_all(buffer: _Buffer, chunks: AsyncChunks) -> None:
+    async for chunk in chunks:
+        buffer.feed(chunk)
+
+
+def _plain_mac(secret: str | bytes) -> Any:
+    if isinstance(secret, str):
+        secret = secret.encode()
+    return hmac.new(secret, digestmod=hashlib.sha256)
+
+
+def _check_plain(mac: Any, signature: str, header_prefix: str) -> None:
+    if signature.startswith(header_prefix):
+        signature = signature[len(header_prefix) :]
+    if not hmac.compare_digest(mac.hexdigest(), signature):
+        raise webhooks.WebhookVerificationError(
+            "Webhook signature verification failed."
+        )
+
+
+def _check_khipu(
+    mac: Any,
+    timestamp: str,
+    signatures: list[str],
+    replay_guard: webhooks.ReplayGuard | None,
+) -> None:
+    if not webhooks._match_timestamped(
+        mac, timestamp, signatures, "base64", 0.001, replay_guard
+    ):
+        raise webhooks.WebhookVerificationError(
+            "Khipu webhook signature verification failed."
+        )
+
+
+def verify_signature_stream(
+    chunks: Chunks,
+    secret: str | bytes,
+    signature: str,
+    *,
+    header_prefix: str = "sha256=",
+    max_size: int | None = None,
+) -> bytes:
+    """Streaming counterpart of :func:`~merchants.webhooks.verify_signature`.
+
+    Args:
+        chunks: The body as ``bytes``/``memoryview`` or an iterable of chunks.
+        secret: Webhook signing secret (str or bytes).
+        signature: The value from the provider's signature header.
+        header_prefix: Expected prefix on the signature value.
+        max_size: Reject bodies larger than this many bytes.
+
+    Returns:
+        The complete body, for the parser.
+
+    Raises:
+        WebhookVerificationError: If the signature does not match or the
+            body exceeds ``max_size``.
+    """
+    buffer = _Buffer(_plain_mac(secret), max_size)
+    _feed_all(buffer, chunks)
+    _check_plain(buffer.mac, signature, header_prefix)
+    return buffer.body()
+
+
+async def verify_signature_stream_async(
+    chunks: AsyncChunks,
+    secret: str | bytes,
+    signature: str,
+    *,
+    header_prefix: str = "sha256=",
+    max_size: int | None = None,
+) -> bytes:
+    """Async-iterable variant of :func:`verify_signature_stream`."""
+    buffer = _Buffer(_plain_mac(secret), max_size)
+    await _afeed_all(buffer, chunks)
+    _check_plain(buffer.mac, signature, header_prefix)
+    return buffer.body()
+
+
+def verify_khipu_signature_stream(
+    chunks: Chunks,
+    secret: str | bytes,
+    header_value: str,
+    *,
+    replay_guard: webhooks.ReplayGuard | None = None,
+    max_size: int | None = None,
+) -> tuple[str, bytes]:
+    """Streaming counterpart of :func:`~merchants.webhooks.verify_khipu_signature`.
+
+    The header is parsed before any chunk is consumed, so a malformed
+    header fails without reading the body.
+
+    Returns:
+        ``(timestamp, body)``.
+
+    Raises:
+        WebhookVerificationError: If the header is malformed, the signature
+            does not match or the body exceeds ``max_size``.
+        WebhookReplayError: If ``replay_guard`` rejects the delivery.
+    """
+    timestamp, signatures = webhooks._parse_khipu_header(header_value)
+    buffer = _Buffer(webhooks._timestamped_mac(secret, timestamp), max_size)
+    _feed_all(buffer, chunks)
+    _check_khipu(buffer.mac, timestamp, signatures, replay_guard)
+    return timestamp, buffer.body()
+
+
+async def verify_khipu_signature_stream_async(
+    chunks: AsyncChunks,
+    secret: str | bytes,
+    header_value: str,
+    *,
+    replay_guard: webhooks.ReplayGuard | None = None,
+    max_size: int | None = None,
+) -> tuple[str, bytes]:
+    """Async-iterable variant of :func:`verify_khipu_signature_stream`."""
+    timestamp, signatures = webhooks._parse_khipu_header(header_value)
+    buffer = _Buffer(webhooks._timestamped_mac(secret, timestamp), max_size)
+    await _afeed_all(buffer, chunks)
+    _check_khipu(buffer.mac, timestamp, signatures, replay_guard)
+    return timestamp, buffer.body()
@@ -1,8 +1,23 @@
 """Tests for amount formatting utilities."""
 
+import pickle
+from array import array
 from decimal import Decimal
 
-from merchants.amount import from_minor_units, to_decimal_string, to_minor_units
+import pytest
+
+from merchants.amount import (
+    CURRENCIES,
+    CurrencyTable,
+    Money,
+    currency_exponent,
+    from_minor_units,
+    from_minor_units_many,
+    to_decimal_string,
+    to_decimal_strings,
+    to_minor_units,
+    to_minor_units_many,
+)
 
 
 class TestToDecimalString:
@@ -63,3 +78,133 @@ class TestFromMinorUnits:
     def test_round_trip(self):
         original = Decimal("42.50")
         assert from_minor_units(to_minor_units(original)) == original
+
+
+class TestBatchConversions:
+    AMOUNTS = ["19.99", "1.005", "-1.005", " 7.5 ", "1e2", 9.99, Decimal("0.125"), 3]
+
+    def test_to_minor_units_many_matches_scalar(self):
+        for decimals in (0, 2, 3):
+            assert to_minor_units_many(self.AMOUNTS, decimals) == [
+                to_minor_units(a, decimals) for a in self.AMOUNTS
+            ]
+
+    def test_to_minor_units_many_array_output(self):
+        result = to_minor_units_many(["1.00", "2.50"], out="array")
+        assert isinstance(result, array)
+        assert result.typecode == "q"
+        assert list(result) == [100, 250]
+
+    def test_to_minor_units_many_numpy_output(self):
+        np = pytest.importorskip("numpy")
+        result = to_minor_units_many(["1.00", "2.50"], out="numpy")
+        assert result.dtype == np.int64
+        assert result.tolist() == [100, 250]
+
+    def test_from_minor_units_many_matches_scalar(self):
+        minors = array("q", [1999, 5, 0, -150])
+        for decimals in (0, 2, 3):
+            batch = from_minor_units_many(minors, decimals)
+            scalar = [from_minor_units(m, decimals) for m in minors]
+            assert [str(d) for d in batch] == [str(d) for d in scalar]
+
+    def test_to_decimal_strings_matches_scalar(self):
+        assert to_decimal_strings(self.AMOUNTS) == [
+            to_decimal_string(a) for a in self.AMOUNTS
+        ]
+        assert to_decimal_strings(["0.0005", "-0.001", "007.50"], decimals=3) == [
+            "0.001",
+            "-0.001",
+            "7.500",
+        ]
+
+
+class TestCurrencyTable:
+    def test_iso_exponents_case_insensitive(self):
+        assert currency_exponent("USD") == 2
+        assert currency_exponent("jpy") == 0
+        assert currency_exponent("Kwd") == 3
+        assert currency_exponent("CLF") == 4
+        assert currency_exponent("XYZ") == 2
+
+    def test_overrides_and_lookup(self):
+        table = CURRENCIES.with_overrides({"huf": 0})
+        assert table.exponent("HUF") == 0
+        assert CURRENCIES.exponent("HUF") == 2
+        assert "bhd" in table and "XYZ" not in table
+        assert table["BHD"] == 3
+        with pytest.raises(KeyError):
+            table["XYZ"]
+        assert len(table) == len(CURRENCIES)
+
+    def test_custom_default(self):
+        assert CurrencyTable({"ABC": 1}, default=0).exponent("usd") == 0
+
+
+class TestMoney:
+    def test_construction_and_formatting(self):
+        money = Money.of("19.99", "usd")
+        assert money == Money(1999, "USD")
+        assert repr(money) == "Money(1999, 'USD')"
+        assert str(money) == "19.99"
+        assert money.amount == Decimal("19.99")
+        assert str(Money(-5, "USD")) == "-0.05"
+        assert str(Money(1000, "JPY")) == "1000"
+        assert Money.of("1.2345", "KWD").minor == 1235
+
+    def test_rejects_non_integer_minor_units(self):
+        with pytest.raises(TypeError):
+            Money(19.99, "USD")  # type: ignore[arg-type]
+        with pytest.raises(TypeError):
+            Money(True, "USD")
+
+    def test_arithmetic_stays_integral(self):
+        a = Money(1999, "USD")
+        assert a + Money(1, "USD") == Money(2000, "USD")
+        assert a - a == Money.zero("USD")
+        assert 3 * a == a * 3 == Money(5997, "USD")
+        assert -a < a and abs(-a) == a
+        assert not Money.zero("USD")
+        with pytest.raises(ValueError):
+            a + Money(1, "EUR")
+        with pytest.raises(ValueError):
+            a < Money(1, "EUR")
+
+    def test_allocate_and_split_preserve_total(self):
+        parts = Money(100, "USD").split(3)
+        assert [p.minor for p in parts] == [34, 33, 33]
+        assert [p.minor for p in Money(-100, "USD").split(3)] == [-33, -33, -34]
+        assert [p.minor for p in Money(1000, "USD").allocate([70, 20, 10])] == [
+            700,
+            200,
+            100,
+        ]
+        with pytest.raises(ValueError):
+            Money(100, "USD").allocate([])
+
+    def test_allocate_gives_leftovers_by_remainder_and_never_to_zero_ratios(self):
+        assert [p.minor for p in Money(5, "USD").allocate([0, 1, 1])] == [0, 3, 2]
+        assert [p.minor for p in Money(5, "USD").allocate([1, 0, 0, 1])] == [
+            3,
+            0,
+            0,
+            2,
+        ]
+        # 10 * [1, 2, 3] / 6 -> 1.67, 3.33, 5.0: the largest remainder wins.
+        assert [p.minor for p in Money(10, "USD").allocate([1, 2, 3])] == [2, 3, 5]
+        assert [p.minor for p in Money(-5, "USD").allocate([0, 1, 1])] == [0, -2, -3]
+
+    def test_immutable_hashable_and_picklable(self):
+        money = Money(1999, "USD", exponent=4)
+        with pytest.raises(AttributeError):
+            money.minor = 1  # type: ignore[misc]
+        assert pickle.loads(pickle.dumps(money)) == money
+        assert len({money, Money(1999, "USD", exponent=4)}) == 1
+        assert repr(money) == "Money(1999, 'USD', exponent=4)"
+
+    def test_accepted_by_amount_helpers(self):
+        money = Money(1999, "USD")
+        assert to_minor_units(money) == 1999
+        assert to_minor_units(money, decimals=0) == 20
+        assert to_decimal_string(money, decimals=3) == "19.990"
+        assert to_minor_units_many([money, "0.01"]) == [1999, 1]
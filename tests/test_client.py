@@ -0,0 +1,140 @@
+"""Tests for the Client / PaymentsResource helpers."""
+
+import asyncio
+import threading
+from decimal import Decimal
+
+import pytest
+
+from merchants.amount import Money
+from merchants.client import Client, PaymentsResource
+from merchants.models import PaymentState, PaymentStatus, WebhookEvent
+from merchants.providers import Provider, UserError
+from merchants.providers.dummy import DummyProvider
+from merchants.result import Failure, Success
+from merchants.webhooks import WebhookNotifier
+
+
+class _SequenceProvider(Provider):
+    """Returns the queued states in order, repeating the last one forever."""
+
+    key = "sequence"
+    poll_interval = 0.01
+    poll_max_interval = 0.02
+
+    def __init__(self, states):
+        self._states = list(states)
+        self.calls = 0
+
+    def create_checkout(self, *a, **kw):
+        raise UserError("not implemented")
+
+    def get_payment(self, payment_id):
+        self.calls += 1
+        state = self._states.pop(0) if len(self._states) > 1 else self._states[0]
+        return PaymentStatus(payment_id=payment_id, state=state, provider=self.key)
+
+    def parse_webhook(self, payload, headers):
+        raise NotImplementedError
+
+
+class TestWaitUntilFinal:
+    def test_returns_final_status(self):
+        provider = _SequenceProvider(
+            [PaymentState.PENDING, PaymentState.PROCESSING, PaymentState.SUCCEEDED]
+        )
+        result = PaymentsResource(provider).wait_until_final("pay_1", timeout=5)
+        assert isinstance(result, Success)
+        assert result.unwrap().state == PaymentState.SUCCEEDED
+        assert provider.calls == 3
+
+    def test_timeout_returns_last_status(self):
+        provider = _SequenceProvider([PaymentState.PENDING])
+        result = PaymentsResource(provider).wait_until_final("pay_1", timeout=0.05)
+        assert isinstance(result, Failure)
+        assert result.error.state == PaymentState.PENDING
+
+    def test_webhook_short_circuits(self):
+        provider = _SequenceProvider([PaymentState.PENDING])
+        provider.poll_interval = provider.poll_max_interval = 30.0
+        notifier = WebhookNotifier()
+        client = Client(provider, notifier=notifier)
+        event = WebhookEvent(
+            event_type="payment.succeeded",
+            payment_id="pay_1",
+            state=PaymentState.SUCCEEDED,
+            provider="sequence",
+        )
+        threading.Timer(0.05, notifier.publish, args=(event,)).start()
+        result = client.payments.wait_until_final("pay_1", timeout=10)
+        assert result.ok
+        assert result.unwrap().state == PaymentState.SUCCEEDED
+        assert provider.calls == 1
+
+    def test_webhook_for_other_provider_is_ignored(self):
+        provider = _SequenceProvider([PaymentState.PENDING])
+        notifier = WebhookNotifier()
+        resource = PaymentsResource(provider, notifier=notifier)
+        event = WebhookEvent(
+            event_type="x",
+            payment_id="pay_1",
+            state=PaymentState.SUCCEEDED,
+            provider="other",
+        )
+        threading.Timer(0.01, notifier.publish, args=(event,)).start()
+        result = resource.wait_until_final("pay_1", timeout=0.1)
+        assert not result.ok
+
+    def test_unsubscribes_after_wait(self):
+        provider = _SequenceProvider([PaymentState.SUCCEEDED])
+        notifier = WebhookNotifier()
+        PaymentsResource(provider, notifier=notifier).wait_until_final("pay_1")
+        event = WebhookEvent(event_type="x", payment_id="pay_1")
+        assert notifier.publish(event) == 0
+
+    def test_async_webhook_short_circuits(self):
+        provider = _SequenceProvider([PaymentState.PENDING])
+        provider.poll_interval = provider.poll_max_interval = 30.0
+        notifier = WebhookNotifier()
+        resource = PaymentsResource(provider, notifier=notifier)
+        event = WebhookEvent(
+            event_type="payment.failed",
+            payment_id="pay_1",
+            state=PaymentState.FAILED,
+            provider="sequence",
+        )
+
+        async def run():
+            threading.Timer(0.05, notifier.publish, args=(event,)).start()
+            return await resource.wait_until_final_async("pay_1", timeout=10)
+
+        result = asyncio.run(run())
+        assert result.unwrap().state == PaymentState.FAILED
+
+    def test_async_timeout(self):
+        provider = _SequenceProvider([PaymentState.PROCESSING])
+        resource = PaymentsResource(provider)
+        result = asyncio.run(resource.wait_until_final_async("pay_1", timeout=0.05))
+        assert isinstance(result, Failure)
+        assert result.error.state == PaymentState.PROCESSING
+
+
+class TestCreateCheckoutMoney:
+    def test_money_amount_is_converted_by_provider(self):
+        session = Client(DummyProvider()).payments.create_checkout(
+            Money(1999, "usd"),
+            "USD",
+            success_url="https://example.com/ok",
+            cancel_url="https://example.com/cancel",
+        )
+        assert session.amount == Decimal("19.99")
+        assert isinstance(session.amount, Decimal)
+
+    def test_currency_mismatch_raises(self):
+        with pytest.raises(ValueError):
+            Client(DummyProvider()).payments.create_checkout(
+                Money(1999, "USD"),
+                "EUR",
+                success_url="https://example.com/ok",
+                cancel_url="https://example.com/cancel",
+            )
@@ -0,0 +1,115 @@
+"""Tests for the columnar PaymentStatusBatch container."""
+
+from decimal import Decimal
+
+import pytest
+
+from merchants.columnar import PaymentStatusBatch
+from merchants.compact import CompactPaymentStatus
+from merchants.models import PaymentState, PaymentStatus
+
+
+def _status(pid, state, provider="stripe", amount=None, currency=None):
+    return PaymentStatus(
+        payment_id=pid,
+        state=state,
+        provider=provider,
+        amount=None if amount is None else Decimal(amount),
+        currency=currency,
+    )
+
+
+@pytest.fixture
+def batch():
+    return PaymentStatusBatch(
+        [
+            _status("a", PaymentState.SUCCEEDED, amount="10.005", currency="USD"),
+            _status("b", PaymentState.SUCCEEDED, "paypal", "5.25", "USD"),
+            _status("c", PaymentState.PENDING, amount="1000", currency="CLP"),
+            _status("d", PaymentState.SUCCEEDED, "khipu", "2500", "CLP"),
+            _status("e", PaymentState.FAILED, "khipu"),
+        ]
+    )
+
+
+class TestPaymentStatusBatch:
+    def test_rows_round_trip(self, batch):
+        assert len(batch) == 5
+        first = batch.row(0)
+        assert isinstance(first, CompactPaymentStatus)
+        assert first.amount == Decimal("10.005")
+        assert first.currency == "USD"
+        last = batch.row(4)
+        assert last.amount is None and last.currency is None
+        assert [r.payment_id for r in batch] == ["a", "b", "c", "d", "e"]
+
+    def test_sum_by_currency(self, batch):
+        assert batch.sum_by_currency() == {
+            "USD": Decimal("15.255"),
+            "CLP": Decimal("2500"),
+        }
+        assert batch.sum_by_currency(state=None)["CLP"] == Decimal("3500")
+
+    def test_where_and_final(self, batch):
+        assert not batch.all_final()
+        assert batch.where(final=False).payment_ids == ["c"]
+        assert batch.where(final=True).all_final()
+        khipu_done = batch.where(provider="khipu", state=PaymentState.SUCCEEDED)
+        assert khipu_done.payment_ids == ["d"]
+        assert batch.where(currency="EUR").payment_ids == []
+        assert batch.where(
+            state=[PaymentState.PENDING, PaymentState.FAILED]
+        ).payment_ids == ["c", "e"]
+
+    def test_currency_codes_are_case_insensitive(self):
+        batch = PaymentStatusBatch(
+            [
+                CompactPaymentStatus(
+                    "a", PaymentState.SUCCEEDED, "stripe", Decimal(2), "usd"
+                ),
+                CompactPaymentStatus(
+                    "b", PaymentState.SUCCEEDED, "paypal", Decimal(3), "USD"
+                ),
+            ]
+        )
+        assert batch.sum_by_currency() == {"USD": Decimal("5")}
+        assert batch.where(currency="usd").payment_ids == ["a", "b"]
+        assert batch.row(0).currency == "USD"
+
+    def test_where_accepts_state_strings(self, batch):
+        assert batch.where(state="succeeded").payment_ids == ["a", "b", "d"]
+        assert batch.where(state=["pending", PaymentState.FAILED]).payment_ids == [
+            "c",
+            "e",
+        ]
+
+    def test_by_provider_and_counts(self, batch):
+        groups = batch.by_provider()
+        assert {k: v.payment_ids for k, v in groups.items()} == {
+            "stripe": ["a", "c"],
+            "paypal": ["b"],
+            "khipu": ["d", "e"],
+        }
+        assert batch.count_by_state() == {
+            PaymentState.SUCCEEDED: 3,
+            PaymentState.PENDING: 1,
+            PaymentState.FAILED: 1,
+        }
+
+    def test_extend_from_stream(self):
+        batch = PaymentStatusBatch(scale=2)
+        batch.extend(
+            CompactPaymentStatus(
+                f"p{i}", PaymentState.SUCCEEDED, "dummy", Decimal(1), "USD"
+            )
+            for i in range(3)
+        )
+        assert batch.sum_by_currency() == {"USD": Decimal("3")}
+        assert list(batch.amounts) == [100, 100, 100]
+
+    def test_to_numpy(self, batch):
+        np = pytest.importorskip("numpy")
+        columns = batch.to_numpy()
+        assert columns["state"].dtype == np.uint8
+        assert columns["amount"][0] == 100050
+        assert list(columns["currency"]) == ["USD", "USD", "CLP", "CLP", None]
@@ -0,0 +1,77 @@
+"""Tests for the slotted compact model counterparts."""
+
+import dataclasses
+from decimal import Decimal
+
+import pytest
+
+from merchants.client import Client
+from merchants.compact import (
+    CompactCheckoutSession,
+    CompactPaymentStatus,
+    CompactWebhookEvent,
+    compact,
+)
+from merchants.models import CheckoutSession, PaymentState, PaymentStatus, WebhookEvent
+from merchants.providers.dummy import DummyProvider
+
+
+class TestCompactModels:
+    def test_payment_status_round_trip_shares_dicts(self):
+        status = PaymentStatus(
+            payment_id="pay_1",
+            state=PaymentState.SUCCEEDED,
+            provider="stripe",
+            amount=Decimal("9.99"),
+            currency="USD",
+            raw={"id": "pay_1"},
+        )
+        small = CompactPaymentStatus.from_model(status)
+        assert small.raw is status.raw
+        assert small.is_final and small.is_success
+        back = small.to_model()
+        assert back == status
+        assert back.raw is status.raw
+
+    def test_instances_are_slotted_and_frozen(self):
+        event = CompactWebhookEvent(event_type="x", payment_id="p")
+        assert not hasattr(event, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            event.state = PaymentState.FAILED  # type: ignore[misc]
+
+    @pytest.mark.parametrize(
+        ("model", "expected"),
+        [
+            (WebhookEvent(event_type="x", event_id="e"), CompactWebhookEvent),
+            (
+                CheckoutSession(
+                    session_id="s",
+                    redirect_url="https://example.com",
+                    provider="dummy",
+                    amount=Decimal("1"),
+                    currency="USD",
+                ),
+                CompactCheckoutSession,
+            ),
+        ],
+    )
+    def test_compact_dispatches_by_type(self, model, expected):
+        small = compact(model)
+        assert type(small) is expected
+        assert small.to_model() == model
+
+    def test_compact_rejects_other_types(self):
+        with pytest.raises(TypeError):
+            compact({"payment_id": "p"})
+
+    def test_provider_and_client_return_compact_status(self):
+        provider = DummyProvider(always_state=PaymentState.SUCCEEDED)
+        status = provider.get_payment_compact("dummy_1")
+        assert isinstance(status, CompactPaymentStatus)
+        assert status.state == PaymentState.SUCCEEDED
+        from_client = Client(provider).payments.get("dummy_1", compact=True)
+        assert isinstance(from_client, CompactPaymentStatus)
+        event = provider.parse_webhook_compact(
+            b'{"payment_id": "dummy_1", "status": "succeeded"}', {}
+        )
+        assert isinstance(event, CompactWebhookEvent)
@@ -2,7 +2,20 @@
 
 from decimal import Decimal
 
-from merchants.models import PaymentModel, PaymentState, PaymentStatus, WebhookEvent
+import pytest
+from pydantic import ValidationError
+
+from merchants.amount import Money
+from merchants.models import (
+    PaymentModel,
+    PaymentState,
+    PaymentStatus,
+    WebhookEvent,
+    build_payment_status,
+    build_webhook_event,
+    set_strict_models,
+    strict_models_enabled,
+)
 
 
 class TestPaymentStatus:
@@ -129,3 +142,64 @@ class TestPaymentModel:
             state=PaymentState.SUCCEEDED,
         )
         assert p.state == PaymentState.SUCCEEDED
+
+    def test_money_amount_fills_currency(self):
+        p = PaymentModel(
+            merchants_id="550e8400-e29b-41d4-a716-446655440000",
+            amount=Money(4999, "usd"),
+            provider="stripe",
+        )
+        assert p.amount == Decimal("49.99")
+        assert p.currency == "USD"
+
+    def test_money_currency_mismatch_rejected(self):
+        with pytest.raises(ValidationError):
+            PaymentModel(
+                merchants_id="550e8400-e29b-41d4-a716-446655440000",
+                amount=Money(4999, "USD"),
+                currency="EUR",
+                provider="stripe",
+            )
+
+
+class TestTrustedBuilders:
+    def test_payment_status_matches_validated_model(self):
+        raw = {"id": "pi_1", "nested": {"a": 1}}
+        built = build_payment_status(
+            payment_id="pi_1",
+            state=PaymentState.SUCCEEDED,
+            provider="stripe",
+            amount=Decimal("9.99"),
+            currency="USD",
+            raw=raw,
+        )
+        validated = PaymentStatus(
+            payment_id="pi_1",
+            state=PaymentState.SUCCEEDED,
+            provider="stripe",
+            amount=Decimal("9.99"),
+            currency="USD",
+            raw=raw,
+        )
+        assert built == validated
+        assert built.is_final
+        assert built.metadata == {} and built.full_object == {}
+
+    def test_trusted_mode_shares_raw_dict(self, monkeypatch):
+        monkeypatch.setattr("merchants.models._strict_models", False)
+        raw = {"id": "evt_1"}
+        event = build_webhook_event(event_type="x", raw=raw)
+        assert event.raw is raw
+        assert event.state is PaymentState.UNKNOWN
+
+    def test_strict_mode_validates(self, monkeypatch):
+        monkeypatch.setattr("merchants.models._strict_models", False)
+        set_strict_models(True)
+        assert strict_models_enabled()
+        with pytest.raises(ValidationError):
+            build_webhook_event(event_type="x", event_id=123)
+        with pytest.raises(ValidationError):
+            build_payment_status(payment_id="p", state="bogus", provider="x")
+        set_strict_models(False)
+        # Trusted mode does not check types.
+        assert build_webhook_event(event_type="x", event_id=123).event_id == 123
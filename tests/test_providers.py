@@ -1,13 +1,18 @@
 """Tests for provider selection, registry, and state normalisation."""
 
+import threading
 from decimal import Decimal
 from unittest.mock import MagicMock
 
 import pytest
 
-from merchants.models import PaymentState
+from merchants.autoload import tenant_resolver_from_config
+from merchants.client import Client
+from merchants.models import PaymentState, RetentionPolicy
 from merchants.providers import (
     Provider,
+    ProviderRegistry,
+    StateMap,
     UserError,
     get_provider,
     list_providers,
@@ -45,6 +50,60 @@ class TestNormaliseState:
     def test_mapping(self, raw, expected):
         assert normalise_state(raw) == expected
 
+    def test_provider_specific_tables(self):
+        assert normalise_state("COMPLETED", "paypal") == PaymentState.SUCCEEDED
+        assert normalise_state("declined", "paypal") == PaymentState.FAILED
+        assert normalise_state("declined", "stripe") == PaymentState.UNKNOWN
+        assert normalise_state("paid", "not-a-provider") == PaymentState.SUCCEEDED
+
+    @pytest.mark.parametrize("provider", ["stripe", "paypal"])
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            ("paid", PaymentState.SUCCEEDED),
+            ("refunded", PaymentState.REFUNDED),
+            ("cancelled", PaymentState.CANCELLED),
+            ("error", PaymentState.FAILED),
+        ],
+    )
+    def test_provider_tables_keep_generic_statuses(self, provider, raw, expected):
+        # e.g. Stripe invoice.paid events report status "paid".
+        assert normalise_state(raw, provider) == expected
+
+
+class TestStateMap:
+    def test_precased_variants_and_fallback(self):
+        states = StateMap({"Requires_Action": "pending"})
+        assert states("requires_action") == PaymentState.PENDING
+        assert states("REQUIRES_ACTION") == PaymentState.PENDING
+        assert states("rEqUiReS_aCtIoN") == PaymentState.PENDING
+        assert "REQUIRES_action" in states and len(states) == 1
+
+    def test_unknown_states_are_counted_and_bounded(self, caplog):
+        states = StateMap({"done": PaymentState.SUCCEEDED}, max_unknown=2)
+        with caplog.at_level("WARNING", logger="merchants.providers"):
+            for raw in ("new", "new", "newer", "newest", "x" * 100):
+                assert states(raw) == PaymentState.UNKNOWN
+        assert states.unknown_states() == {"new": 2, "newer": 1}
+        assert states.unknown_overflow == 2
+        assert len(caplog.records) == 2
+        states.reset_unknown()
+        assert states.unknown_states() == {} and states.unknown_overflow == 0
+
+    def test_subclass_state_mapping_is_compiled_once(self):
+        class _Mapped(Provider):
+            key = "test_state_mapped"
+            state_mapping = {"ok": PaymentState.SUCCEEDED}
+
+            def create_checkout(self, *a, **kw): ...
+            def get_payment(self, payment_id): ...
+            def parse_webhook(self, payload, headers): ...
+
+        assert isinstance(_Mapped.states, StateMap)
+        assert _Mapped().states("OK") == PaymentState.SUCCEEDED
+        assert normalise_state("ok", "test_state_mapped") == PaymentState.SUCCEEDED
+        assert Provider.states("succeeded") == PaymentState.SUCCEEDED
+
 
 class TestProviderRegistry:
     def setup_method(self):
@@ -67,6 +126,121 @@ class TestProviderRegistry:
         assert "test_dummy" in list_providers()
 
 
+class TestTenantRegistry:
+    def test_register_and_get(self):
+        registry = ProviderRegistry()
+        acme = _make_dummy_provider("stripe")
+        globex = _make_dummy_provider("stripe")
+        registry.register("acme", acme)
+        registry.register("globex", globex)
+        assert registry.get("acme", "stripe") is acme
+        assert registry.get("globex", "stripe") is globex
+        assert registry.tenants() == ["acme", "globex"]
+
+    def test_missing_without_resolver_raises(self):
+        with pytest.raises(KeyError, match="acme"):
+            ProviderRegistry().get("acme", "stripe")
+
+    def test_lazy_construction_is_cached(self):
+        built = []
+
+        def resolver(tenant, key):
+            built.append((tenant, key))
+            return _make_dummy_provider(key)
+
+        registry = ProviderRegistry(resolver)
+        first = registry.get("acme", "paypal")
+        assert registry.get("acme", "paypal") is first
+        assert built == [("acme", "paypal")]
+
+    def test_resolver_returning_none_raises(self):
+        registry = ProviderRegistry(lambda tenant, key: None)
+        with pytest.raises(KeyError):
+            registry.get("acme", "stripe")
+
+    def test_lru_eviction_spares_pinned_and_recent(self):
+        registry = ProviderRegistry(
+            lambda tenant, key: _make_dummy_provider(key), max_size=10
+        )
+        pinned = _make_dummy_provider("stripe")
+        registry.register("pinned", pinned)
+        for i in range(10):
+            registry.get(f"t{i}", "stripe")
+        registry.get("t0", "stripe")  # refresh t0
+        registry.get("t10", "stripe")  # overflow evicts the oldest lazy entry
+        assert ("t0", "stripe") in registry
+        assert ("t1", "stripe") not in registry
+        assert ("pinned", "stripe") in registry
+        assert registry.get("pinned", "stripe") is pinned
+
+    def test_new_entry_survives_its_own_eviction(self):
+        built = []
+
+        def resolver(tenant, key):
+            built.append(tenant)
+            return _make_dummy_provider(key)
+
+        registry = ProviderRegistry(resolver, max_size=2)
+        for tenant in ("a", "b", "c", "c", "c"):
+            registry.get(tenant, "stripe")
+        assert built == ["a", "b", "c"]
+        assert ("c", "stripe") in registry
+        assert ("a", "stripe") not in registry
+
+    def test_usage_ticks_track_only_cached_entries(self):
+        registry = ProviderRegistry(
+            lambda tenant, key: _make_dummy_provider(key), max_size=5
+        )
+        for i in range(50):
+            registry.get(f"t{i}", "stripe")
+            registry.get(f"t{i // 2}", "stripe")
+        assert set(registry._last_used) <= set(registry._entries)
+
+    def test_slow_resolver_does_not_block_other_tenants(self):
+        slow_started, release = threading.Event(), threading.Event()
+
+        def resolver(tenant, key):
+            if tenant == "slow":
+                slow_started.set()
+                release.wait(5)
+            return _make_dummy_provider(key)
+
+        registry = ProviderRegistry(resolver)
+        worker = threading.Thread(target=registry.get, args=("slow", "stripe"))
+        worker.start()
+        assert slow_started.wait(5)
+        try:
+            registry.get("fast", "stripe")  # would deadlock-wait on the lock
+            assert ("slow", "stripe") not in registry
+        finally:
+            release.set()
+            worker.join(5)
+        assert ("slow", "stripe") in registry
+
+    def test_unregister(self):
+        registry = ProviderRegistry()
+        registry.register("acme", _make_dummy_provider("stripe"))
+        assert registry.unregister("acme", "stripe")
+        assert not registry.unregister("acme", "stripe")
+        assert len(registry) == 0
+
+    def test_client_resolves_tenant(self):
+        registry = ProviderRegistry()
+        provider = _make_dummy_provider("stripe")
+        registry.register("acme", provider)
+        client = Client("stripe", tenant="acme", registry=registry)
+        assert client.payments._provider is provider
+
+    def test_resolver_from_config(self):
+        configs = {"acme": {"STRIPE_API_KEY": "sk_acme"}, "globex": {}}
+        resolver = tenant_resolver_from_config(configs.get)
+        provider = resolver("acme", "stripe")
+        assert isinstance(provider, StripeProvider)
+        assert provider._api_key == "sk_acme"
+        assert resolver("globex", "stripe") is None
+        assert resolver("unknown", "stripe") is None
+
+
 class TestStripeProvider:
     def _make_transport(self, status_code: int, body: dict) -> MagicMock:
         t = MagicMock()
@@ -115,6 +289,17 @@ class TestStripeProvider:
         payload = transport.send.call_args.kwargs["json"]
         assert payload["line_items"][0]["price_data"]["unit_amount"] == 1000
 
+    def test_three_decimal_currency(self):
+        body = {"id": "cs_kwd", "url": "https://stripe.com/pay/cs_kwd"}
+        transport = self._make_transport(200, body)
+        provider = StripeProvider("sk_test_key", transport=transport)
+        provider.create_checkout(
+            Decimal("1.5"), "kwd", "https://example.com/ok", "https://example.com/no"
+        )
+        payload = transport.send.call_args.kwargs["json"]
+        assert payload["line_items"][0]["price_data"]["unit_amount"] == 1500
+        assert provider.currency_exponent("MGA") == 0
+
 
 class TestPayPalProvider:
     def _make_transport(self, status_code: int, body: dict) -> MagicMock:
@@ -155,6 +340,195 @@ class TestPayPalProvider:
                 "https://example.com/cancel",
             )
 
+    @pytest.mark.parametrize(
+        ("currency", "expected"), [("JPY", "1000"), ("huf", "1000"), ("BHD", "999.500")]
+    )
+    def test_amount_uses_currency_exponent(self, currency, expected):
+        body = {"id": "ORDER-1", "links": []}
+        transport = self._make_transport(201, body)
+        PayPalProvider("token_xyz", transport=transport).create_checkout(
+            Decimal(expected),
+            currency,
+            "https://example.com/ok",
+            "https://example.com/no",
+        )
+        payload = transport.send.call_args.kwargs["json"]
+        assert payload["purchase_units"][0]["amount"]["value"] == expected
+
+
+class TestKhipuProvider:
+    def _make_transport(self, status_code: int, body: dict) -> MagicMock:
+        t = MagicMock()
+        t.send.return_value = HttpResponse(status_code, {}, body)
+        return t
+
+    def test_create_checkout_uses_instance_api_key(self):
+        from merchants.providers.khipu import KhipuProvider
+
+        body = {"payment_id": "kp_1", "payment_url": "https://khipu.com/payment/kp_1"}
+        t1 = self._make_transport(200, body)
+        t2 = self._make_transport(200, body)
+        p1 = KhipuProvider("key-one", transport=t1)
+        p2 = KhipuProvider("key-two", transport=t2)
+        session = p1.create_checkout(
+            Decimal("1000"), "clp", "https://example.com/ok", "https://example.com/no"
+        )
+        p2.get_payment("kp_2")
+        assert session.session_id == "kp_1"
+        assert session.redirect_url == "https://khipu.com/payment/kp_1"
+        method, url = t1.send.call_args.args
+        assert (method, url) == ("POST", "https://payment-api.khipu.com/v3/payments")
+        assert t1.send.call_args.kwargs["headers"]["x-api-key"] == "key-one"
+        assert t1.send.call_args.kwargs["json"]["currency"] == "CLP"
+        assert t1.send.call_args.kwargs["json"]["amount"] == "1000"
+        assert t2.send.call_args.kwargs["headers"]["x-api-key"] == "key-two"
+
+    def test_imports_without_khipu_tools(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys; sys.modules['khipu_tools'] = None; "
+            "from merchants.providers.khipu import KhipuProvider"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_get_payment(self):
+        from merchants.providers.khipu import KhipuProvider
+
+        body = {
+            "payment_id": "kp_1",
+            "status": "done",
+            "amount": 1000,
+            "currency": "CLP",
+        }
+        transport = self._make_transport(200, body)
+        status = KhipuProvider("key", transport=transport).get_payment("kp_1")
+        assert status.state == PaymentState.SUCCEEDED
+        assert status.amount == Decimal("1000")
+        assert transport.send.call_args.args[1].endswith("/v3/payments/kp_1")
+
+    def test_error_response_raises_user_error(self):
+        from merchants.providers.khipu import KhipuProvider
+
+        transport = self._make_transport(400, {"message": "Invalid amount"})
+        with pytest.raises(UserError, match="Invalid amount") as exc_info:
+            KhipuProvider("key", transport=transport).create_checkout(
+                Decimal("0"), "CLP", "https://example.com/ok", "https://example.com/no"
+            )
+        assert exc_info.value.code == "400"
+
+    def test_full_retention_shares_response(self, monkeypatch):
+        from merchants.providers.khipu import KhipuProvider
+
+        monkeypatch.setattr("merchants.models._strict_models", False)
+        body = {"payment_id": "kp_1", "payment_url": "https://khipu.com/payment/kp_1"}
+        provider = KhipuProvider("key", transport=self._make_transport(200, body))
+        session = provider.create_checkout(
+            Decimal("1000"), "CLP", "https://example.com/ok", "https://example.com/no"
+        )
+        assert session.raw is session.full_object
+        assert session.payload["currency"] == "CLP"
+
+    @pytest.mark.parametrize(
+        ("retention", "keeps_raw"),
+        [(RetentionPolicy.RAW, True), ("none", False)],
+    )
+    def test_retention_policy(self, retention, keeps_raw):
+        from merchants.providers.khipu import KhipuProvider
+
+        body = {"payment_id": "kp_1", "status": "done", "amount": 1000}
+        provider = KhipuProvider(
+            "key", transport=self._make_transport(200, body), retention=retention
+        )
+        session = provider.create_checkout(
+            Decimal("1000"), "CLP", "https://example.com/ok", "https://example.com/no"
+        )
+        status = provider.get_payment("kp_1")
+        assert session.session_id == "kp_1"
+        assert status.state == PaymentState.SUCCEEDED
+        assert session.full_object == {} and session.payload == {}
+        assert status.full_object == {}
+        assert (status.raw == body) is keeps_raw
+
+
+class TestFlowProvider:
+    def _provider(self, monkeypatch, calls, flow_statuses=None, **kwargs):
+        from pyflowcl.models import PaymentStatus as FlowStatus
+
+        import merchants.providers.flow as flow_module
+
+        def fake_get_status(client, token):
+            calls.append(token)
+            code = flow_statuses.pop(0) if flow_statuses else 2
+            return FlowStatus.from_dict(
+                {
+                    "status": code,
+                    "amount": 1000,
+                    "currency": "CLP",
+                    "commerceOrder": "o1",
+                }
+            )
+
+        monkeypatch.setattr(flow_module, "flow_get_status", fake_get_status)
+        return flow_module.FlowProvider("key", "secret", **kwargs)
+
+    def test_parse_webhook_resolves_inline_by_default(self, monkeypatch):
+        calls = []
+        provider = self._provider(monkeypatch, calls)
+        event = provider.parse_webhook(b"token=tok_1", {})
+        assert calls == ["tok_1"]
+        assert event.state == PaymentState.SUCCEEDED
+        assert event.event_type == "Payment.succeeded"
+
+    def test_deferred_parse_skips_flow_call(self, monkeypatch):
+        calls = []
+        provider = self._provider(monkeypatch, calls, defer_webhook_status=True)
+        event = provider.parse_webhook(b"token=tok_1", {})
+        assert calls == []
+        assert event.payment_id == "tok_1"
+        assert event.state == PaymentState.PENDING
+        resolved = provider.resolve_webhook(event)
+        assert resolved.state == PaymentState.SUCCEEDED
+        assert calls == ["tok_1"]
+
+    def test_resolve_webhooks_batches_unique_tokens(self, monkeypatch):
+        calls = []
+        provider = self._provider(monkeypatch, calls, defer_webhook_status=True)
+        events = [
+            provider.parse_webhook(f"token={t}".encode(), {}) for t in ("a", "b", "a")
+        ]
+        resolved = provider.resolve_webhooks(events)
+        assert sorted(calls) == ["a", "b"]
+        assert [e.payment_id for e in resolved] == ["a", "b", "a"]
+        assert all(e.state == PaymentState.SUCCEEDED for e in resolved)
+
+    def test_status_cache_reuses_recent_lookups(self, monkeypatch):
+        calls = []
+        provider = self._provider(monkeypatch, calls, status_cache_ttl=60)
+        provider.get_payment("tok_1")
+        provider.parse_webhook(b'{"token": "tok_1"}', {})
+        assert calls == ["tok_1"]
+
+    def test_status_cache_skips_non_final_states(self, monkeypatch):
+        calls = []
+        provider = self._provider(
+            monkeypatch, calls, flow_statuses=[1, 2], status_cache_ttl=60
+        )
+        assert provider.get_payment("tok_1").state == PaymentState.PENDING
+        event = provider.parse_webhook(b'{"token": "tok_1"}', {})
+        assert event.state == PaymentState.SUCCEEDED
+        assert calls == ["tok_1", "tok_1"]
+
+    def test_resolve_webhook_async(self, monkeypatch):
+        import asyncio
+
+        calls = []
+        provider = self._provider(monkeypatch, calls, defer_webhook_status=True)
+        event = provider.parse_webhook(b"token=tok_9", {})
+        resolved = asyncio.run(provider.resolve_webhook_async(event))
+        assert resolved.state == PaymentState.SUCCEEDED
+
 
 class TestGenericProvider:
     def _make_transport(self, status_code: int, body: dict) -> MagicMock:
@@ -0,0 +1,146 @@
+"""Tests for the multi-provider RoutingClient."""
+
+from decimal import Decimal
+
+import pytest
+
+from merchants.models import CheckoutSession, PaymentState, PaymentStatus
+from merchants.providers import Provider, UserError, register_provider
+from merchants.router import Route, RoutingClient
+from merchants.transport import TransportError
+
+
+class _FakeProvider(Provider):
+    def __init__(self, key, fail_with=None):
+        self.key = key
+        self.fail_with = fail_with
+        self.calls = 0
+
+    def create_checkout(
+        self, amount, currency, success_url, cancel_url, metadata=None, **kw
+    ):
+        self.calls += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        return CheckoutSession(
+            session_id=f"{self.key}_1",
+            redirect_url="https://pay.example.com",
+            provider=self.key,
+            amount=amount,
+            currency=currency,
+        )
+
+    def get_payment(self, payment_id):
+        return PaymentStatus(
+            payment_id=payment_id, state=PaymentState.PENDING, provider=self.key
+        )
+
+    def parse_webhook(self, payload, headers):
+        raise NotImplementedError
+
+
+def _checkout(router, amount="10.00", currency="USD"):
+    return router.create_checkout(amount, currency, "https://ok", "https://cancel")
+
+
+class TestRoute:
+    def test_currency_constraint_is_case_insensitive(self):
+        route = Route("x", currencies={"clp"})
+        assert route.accepts(Decimal("1000"), "CLP")
+        assert not route.accepts(Decimal("1000"), "USD")
+
+    def test_amount_bounds(self):
+        route = Route("x", min_amount=Decimal("1"), max_amount=Decimal("100"))
+        assert route.accepts(Decimal("100"), "USD")
+        assert not route.accepts(Decimal("0.5"), "USD")
+        assert not route.accepts(Decimal("100.01"), "USD")
+
+    def test_weight_must_be_positive(self):
+        with pytest.raises(ValueError):
+            Route("x", weight=0)
+
+
+class TestRoutingClient:
+    def test_resolves_registered_keys(self):
+        register_provider(_FakeProvider("route_reg"))
+        router = RoutingClient(["route_reg"])
+        assert _checkout(router).provider == "route_reg"
+
+    def test_filters_by_constraints(self):
+        clp = _FakeProvider("clp_only")
+        usd = _FakeProvider("usd_only")
+        router = RoutingClient(
+            [Route(clp, currencies={"CLP"}), Route(usd, currencies={"USD"})]
+        )
+        assert _checkout(router, "5000", "CLP").provider == "clp_only"
+        assert _checkout(router, "5", "USD").provider == "usd_only"
+
+    def test_no_route_raises_user_error(self):
+        router = RoutingClient([Route(_FakeProvider("a"), currencies={"CLP"})])
+        with pytest.raises(UserError) as exc_info:
+            _checkout(router, currency="EUR")
+        assert exc_info.value.code == "no_route"
+
+    def test_fails_over_on_transport_error(self):
+        bad = _FakeProvider("bad", fail_with=TransportError("down"))
+        good = _FakeProvider("good")
+        router = RoutingClient([bad, good])
+        assert _checkout(router).provider == "good"
+        stats = router.stats()
+        assert stats["bad"].failures == 1
+        assert stats["good"].failures == 0
+
+    def test_fails_over_on_5xx(self):
+        bad = _FakeProvider("bad", fail_with=UserError("oops", code="503"))
+        router = RoutingClient([bad, _FakeProvider("good")])
+        assert _checkout(router).provider == "good"
+
+    def test_does_not_fail_over_on_4xx(self):
+        bad = _FakeProvider("bad", fail_with=UserError("invalid", code="400"))
+        good = _FakeProvider("good")
+        router = RoutingClient([bad, good])
+        with pytest.raises(UserError):
+            _checkout(router)
+        assert good.calls == 0
+
+    def test_all_failing_reraises_last_error(self):
+        router = RoutingClient(
+            [
+                _FakeProvider("a", fail_with=TransportError("a down")),
+                _FakeProvider("b", fail_with=TransportError("b down")),
+            ]
+        )
+        with pytest.raises(TransportError, match="b down"):
+            _checkout(router)
+
+    def test_unhealthy_route_is_demoted(self):
+        flaky = _FakeProvider("flaky", fail_with=TransportError("down"))
+        stable = _FakeProvider("stable")
+        router = RoutingClient([flaky, stable], alpha=1.0)
+        _checkout(router)
+        assert [p.key for p in router.candidates("10", "USD")] == ["stable", "flaky"]
+        flaky.fail_with = None
+        _checkout(router)
+        assert flaky.calls == 1
+
+    def test_prefers_lower_latency(self):
+        a = _FakeProvider("a")
+        b = _FakeProvider("b")
+        router = RoutingClient([a, b])
+        router._record("a", 0.5, False)
+        router._record("b", 0.1, False)
+        assert [p.key for p in router.candidates("10", "USD")] == ["b", "a"]
+
+    def test_weight_scales_score(self):
+        a = _FakeProvider("a")
+        b = _FakeProvider("b")
+        router = RoutingClient([Route(a, weight=10.0), b])
+        router._record("a", 0.5, False)
+        router._record("b", 0.1, False)
+        assert router.candidates("10", "USD")[0] is a
+
+    def test_get_uses_named_provider(self):
+        router = RoutingClient([_FakeProvider("a"), _FakeProvider("b")])
+        assert router.get("pay_1", provider="b").provider == "b"
+        with pytest.raises(KeyError):
+            router.get("pay_1", provider="zzz")
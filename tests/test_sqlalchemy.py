@@ -14,6 +14,7 @@ from pydantic import BaseModel, Field
 
 from merchants.models import get_sa_metadata
 from merchants.sqlalchemy import PydanticToSAMixinConfig, pydantic_mixin_from_model
+from merchants.sqlalchemy.mixins import _column_specs
 
 # ---------------------------------------------------------------------------
 # Sample Pydantic schemas
@@ -446,6 +447,77 @@ class TestStrSubclassMapping:
         assert col_type.length == 16
 
 
+# ---------------------------------------------------------------------------
+# Tests: memoised column definitions
+# ---------------------------------------------------------------------------
+
+
+class TestMixinCache:
+    def setup_method(self):
+        _column_specs.cache_clear()
+
+    def test_repeated_calls_hit_cache_but_build_fresh_columns(self):
+        first = pydantic_mixin_from_model(UserSchema, exclude={"age"})
+        second = pydantic_mixin_from_model(
+            UserSchema, exclude=frozenset({"age"}), mixin_name="Other"
+        )
+        info = _column_specs.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+        assert first is not second and second.__name__ == "Other"
+        assert first.email is not second.email
+        assert first.email.column is not second.email.column
+        # Schema-attached types are cloned per column, plain types shared.
+        assert first.is_active.column.type is not second.is_active.column.type
+        assert first.email.column.type is second.email.column.type
+
+    def test_key_includes_selection_and_config(self):
+        pydantic_mixin_from_model(UserSchema)
+        assert not hasattr(
+            pydantic_mixin_from_model(UserSchema, include={"age"}), "email"
+        )
+        config = PydanticToSAMixinConfig(default_string_len=50)
+        assert (
+            pydantic_mixin_from_model(
+                UserSchema, config=config
+            ).email.column.type.length
+            == 320
+        )
+        assert _column_specs.cache_info().misses == 3
+
+    def test_plain_set_auto_exclude_is_hashable(self):
+        config = PydanticToSAMixinConfig(auto_exclude={"age"})
+        assert config.auto_exclude == frozenset({"age"})
+        first = pydantic_mixin_from_model(UserSchema, config=config)
+        second = pydantic_mixin_from_model(
+            UserSchema, config=PydanticToSAMixinConfig(auto_exclude={"age"})
+        )
+        assert not hasattr(first, "age") and hasattr(first, "email")
+        assert not hasattr(second, "age")
+        assert _column_specs.cache_info().hits == 1
+
+    def test_unsupported_type_errors_are_not_cached(self):
+        config = PydanticToSAMixinConfig(json_fallback=False)
+        for _ in range(2):
+            with pytest.raises(TypeError):
+                pydantic_mixin_from_model(NestedSchema, config=config)
+
+    def test_cached_mixins_map_in_separate_metadata(self):
+        tables = []
+        for _ in range(2):
+            Mixin = pydantic_mixin_from_model(UserSchema)
+
+            class Base(sa_orm.DeclarativeBase): ...
+
+            class User(Base, Mixin):
+                __tablename__ = "user"
+                id: sa_orm.Mapped[int] = sa_orm.mapped_column(primary_key=True)
+
+            engine = sa.create_engine("sqlite:///:memory:")
+            Base.metadata.create_all(engine)
+            tables.append(User.__table__)
+        assert tables[0] is not tables[1]
+
+
 # ---------------------------------------------------------------------------
 # Tests: PaymentModel mixin generation
 # ---------------------------------------------------------------------------
@@ -588,3 +660,34 @@ class TestPaymentModelMixin:
             "cancel_url",
         }
         assert expected.issubset(cols)
+
+    def test_money_is_converted_at_the_payment_model_boundary(self):
+        from merchants.amount import Money
+        from merchants.models import PaymentModel
+
+        PaymentMixin = pydantic_mixin_from_model(
+            PaymentModel, mixin_name="MoneyPaymentMixin"
+        )
+
+        class Base(sa_orm.DeclarativeBase): ...
+
+        class Payment(Base, PaymentMixin):
+            __tablename__ = "payments"
+            id: sa_orm.Mapped[int] = sa_orm.mapped_column(primary_key=True)
+
+            # Downstream models may declare their own validators.
+            @sa_orm.validates("amount")
+            def _check_amount(self, key, value):
+                assert value >= 0
+                return value
+
+        engine = sa.create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        model = PaymentModel(
+            merchants_id="m1", provider="dummy", amount=Money(1999, "USD")
+        )
+        with sa_orm.Session(engine) as session:
+            session.add(Payment(**model.model_dump(exclude={"id"})))
+            session.commit()
+            stored = session.scalars(sa.select(Payment)).one()
+            assert (stored.amount, stored.currency) == (Decimal("19.99"), "USD")
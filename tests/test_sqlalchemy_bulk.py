@@ -0,0 +1,216 @@
+"""Tests for merchants.sqlalchemy.bulk – batched upserts and state updates."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+import sqlalchemy as sa
+import sqlalchemy.orm as sa_orm
+
+from merchants.compact import CompactPaymentStatus
+from merchants.models import PaymentModel, PaymentState, PaymentStatus, WebhookEvent
+from merchants.sqlalchemy import (
+    apply_status_updates,
+    bulk,
+    pydantic_mixin_from_model,
+    upsert_payments,
+)
+
+S = PaymentState
+PaymentMixin = pydantic_mixin_from_model(PaymentModel, mixin_name="BulkPaymentMixin")
+
+
+class Base(sa_orm.DeclarativeBase): ...
+
+
+class Payment(Base, PaymentMixin):
+    __tablename__ = "payments"
+    id: sa_orm.Mapped[int] = sa_orm.mapped_column(primary_key=True)
+
+
+def _payment(n: int, state: PaymentState = S.PENDING, **kw) -> PaymentModel:
+    return PaymentModel(
+        merchants_id=f"m{n}",
+        transaction_id=f"tx{n}",
+        provider="stripe",
+        amount=Decimal("10.00"),
+        currency="USD",
+        state=state,
+        **kw,
+    )
+
+
+def _status(n: int, state: PaymentState) -> PaymentStatus:
+    return PaymentStatus(payment_id=f"tx{n}", state=state, provider="stripe")
+
+
+@pytest.fixture()
+def engine():
+    engine = sa.create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(params=["native", "portable"])
+def conn(request, engine, monkeypatch):
+    """A connection using ON CONFLICT/RETURNING, or the portable fallback."""
+    if request.param == "portable":
+        monkeypatch.setattr(bulk, "_ON_CONFLICT_INSERTS", {})
+        monkeypatch.setattr(engine.dialect, "update_returning", False)
+    with engine.begin() as conn:
+        yield conn
+
+
+def _states(conn) -> dict[str, str]:
+    rows = conn.execute(sa.select(Payment.transaction_id, Payment.state))
+    return {tx: state for tx, state in rows}
+
+
+class TestUpsertPayments:
+    def test_inserts_then_updates_in_batches(self, conn):
+        rows = upsert_payments(
+            conn, Payment, [_payment(n) for n in range(5)], batch_size=2
+        )
+        assert sorted(r.merchants_id for r in rows) == [f"m{n}" for n in range(5)]
+
+        rows = upsert_payments(
+            conn,
+            Payment,
+            [_payment(1, S.SUCCEEDED, email="a@example.com"), _payment(9)],
+        )
+        assert {r.merchants_id for r in rows} == {"m1", "m9"}
+        stored = conn.execute(
+            sa.select(Payment.__table__).where(Payment.merchants_id == "m1")
+        ).one()
+        assert stored.state == "succeeded" and stored.email == "a@example.com"
+        assert (
+            conn.execute(sa.select(sa.func.count()).select_from(Payment)).scalar() == 6
+        )
+
+    def test_mappings_keyed_on_transaction_id_with_column_subset(self, conn):
+        upsert_payments(conn, Payment, [_payment(1)])
+        upsert_payments(
+            conn,
+            Payment,
+            [
+                {
+                    "merchants_id": "other",
+                    "transaction_id": "tx1",
+                    "provider": "stripe",
+                    "amount": Decimal("99"),
+                    "currency": "USD",
+                    "email": "b@example.com",
+                    "not_a_column": 1,
+                }
+            ],
+            key="transaction_id",
+            update=["email"],
+        )
+        stored = conn.execute(sa.select(Payment.__table__)).one()
+        assert stored.merchants_id == "m1"
+        assert stored.amount == Decimal("10.00")
+        assert stored.email == "b@example.com"
+
+    def test_empty_update_leaves_existing_rows(self, conn):
+        upsert_payments(conn, Payment, [_payment(1)])
+        upsert_payments(conn, Payment, [_payment(1, S.FAILED)], update=())
+        assert _states(conn) == {"tx1": "pending"}
+
+    def test_duplicate_keys_in_one_batch_last_wins(self, conn):
+        rows = upsert_payments(
+            conn, Payment, [_payment(1), _payment(2), _payment(1, S.FAILED)]
+        )
+        assert sorted(r.merchants_id for r in rows) == ["m1", "m2"]
+        assert _states(conn) == {"tx1": "failed", "tx2": "pending"}
+
+    def test_rejects_bad_batch_size(self, conn):
+        with pytest.raises(ValueError):
+            upsert_payments(conn, Payment, [_payment(1)], batch_size=0)
+
+    def test_rejects_records_without_key(self, conn):
+        # Two distinct payments without a transaction id must not be merged.
+        no_tx = [
+            _payment(n).model_copy(update={"transaction_id": None}) for n in (1, 2)
+        ]
+        with pytest.raises(ValueError, match="transaction_id"):
+            upsert_payments(conn, Payment, no_tx, key="transaction_id")
+        rows = upsert_payments(conn, Payment, no_tx)  # keyed on merchants_id
+        assert sorted(r.merchants_id for r in rows) == ["m1", "m2"]
+
+
+class TestApplyStatusUpdates:
+    def test_applies_only_legal_transitions_and_returns_changed_rows(self, conn):
+        upsert_payments(
+            conn,
+            Payment,
+            [_payment(1), _payment(2, S.SUCCEEDED), _payment(3, S.FAILED), _payment(4)],
+        )
+        updates = [
+            _status(1, S.PROCESSING),
+            _status(1, S.SUCCEEDED),
+            _status(1, S.PROCESSING),  # out of order within the batch
+            _status(2, S.PENDING),  # stale
+            CompactPaymentStatus(payment_id="tx2", state=S.REFUNDED, provider="stripe"),
+            _status(3, S.SUCCEEDED),  # illegal from FAILED
+            WebhookEvent(event_type="x", payment_id="tx4", state=S.CANCELLED),
+            WebhookEvent(event_type="x", payment_id=None, state=S.FAILED),
+            _status(4, S.UNKNOWN),
+            _status(99, S.SUCCEEDED),  # not in the table
+        ]
+        rows = apply_status_updates(conn, Payment, updates, batch_size=100)
+        assert {r.transaction_id: r.state for r in rows} == {
+            "tx1": "succeeded",
+            "tx2": "refunded",
+            "tx4": "cancelled",
+        }
+        assert _states(conn) == {
+            "tx1": "succeeded",
+            "tx2": "refunded",
+            "tx3": "failed",
+            "tx4": "cancelled",
+        }
+        assert apply_status_updates(conn, Payment, updates) == []
+
+    def test_multi_step_sequence_in_one_batch(self, conn):
+        upsert_payments(
+            conn,
+            Payment,
+            [_payment(1), _payment(2), _payment(3, S.PROCESSING), _payment(4)],
+        )
+        updates = [
+            _status(1, S.SUCCEEDED),
+            _status(1, S.REFUNDED),
+            _status(2, S.REFUNDED),  # delivered before its capture
+            _status(2, S.PROCESSING),
+            _status(2, S.SUCCEEDED),
+            _status(3, S.SUCCEEDED),
+            _status(3, S.REFUNDED),
+            _status(4, S.REFUNDED),  # no capture seen: not reachable
+        ]
+        rows = apply_status_updates(conn, Payment, updates)
+        assert {r.transaction_id: r.state for r in rows} == {
+            "tx1": "refunded",
+            "tx2": "refunded",
+            "tx3": "refunded",
+        }
+        assert _states(conn)["tx4"] == "pending"
+
+    def test_unchecked_transitions_overwrite_differing_states(self, conn):
+        upsert_payments(conn, Payment, [_payment(1, S.FAILED), _payment(2, S.PENDING)])
+        rows = apply_status_updates(
+            conn,
+            Payment,
+            [_status(1, S.SUCCEEDED), _status(2, S.PENDING)],
+            check_transitions=False,
+        )
+        assert [r.transaction_id for r in rows] == ["tx1"]
+        assert _states(conn) == {"tx1": "succeeded", "tx2": "pending"}
+
+    def test_works_through_a_session(self, engine):
+        with sa_orm.Session(engine) as session:
+            upsert_payments(session, Payment, [_payment(1)])
+            rows = apply_status_updates(session, Payment, [_status(1, S.SUCCEEDED)])
+            session.commit()
+            assert [r.state for r in rows] == ["succeeded"]
+            assert session.scalars(sa.select(Payment)).one().state == "succeeded"
@@ -0,0 +1,89 @@
+"""Tests for the payment state machine."""
+
+import pytest
+
+from merchants.columnar import STATE_CODES as COLUMNAR_CODES
+from merchants.models import PaymentState
+from merchants.states import (
+    FINAL_STATES,
+    RANK,
+    STATE_CODES,
+    TRANSITIONS,
+    TransitionLog,
+    can_transition,
+    is_final,
+    is_regression,
+)
+
+S = PaymentState
+
+
+class TestTransitions:
+    @pytest.mark.parametrize(
+        ("old", "new", "allowed"),
+        [
+            (S.PENDING, S.PROCESSING, True),
+            (S.PENDING, S.SUCCEEDED, True),
+            (S.PROCESSING, S.FAILED, True),
+            (S.SUCCEEDED, S.REFUNDED, True),
+            (S.UNKNOWN, S.SUCCEEDED, True),
+            (S.PENDING, S.PENDING, False),
+            (S.SUCCEEDED, S.PENDING, False),
+            (S.FAILED, S.SUCCEEDED, False),
+            (S.PROCESSING, S.REFUNDED, False),
+            (S.SUCCEEDED, S.UNKNOWN, False),
+        ],
+    )
+    def test_can_transition(self, old, new, allowed):
+        assert can_transition(old, new) is allowed
+
+    def test_tables_cover_every_state(self):
+        assert set(TRANSITIONS) == set(PaymentState) == set(RANK)
+        assert all(not TRANSITIONS[s] for s in FINAL_STATES - {S.SUCCEEDED})
+        with pytest.raises(TypeError):
+            TRANSITIONS[S.FAILED] = frozenset({S.SUCCEEDED})  # type: ignore[index]
+
+    def test_legal_transitions_never_regress(self):
+        for old, targets in TRANSITIONS.items():
+            for new in targets:
+                assert not is_regression(old, new)
+
+    def test_regression_and_finality(self):
+        assert is_regression(S.SUCCEEDED, S.PENDING)
+        assert is_regression(S.PROCESSING, S.UNKNOWN)
+        assert not is_regression(S.FAILED, S.SUCCEEDED)
+        assert is_final(S.REFUNDED) and not is_final(S.PROCESSING)
+
+    def test_accepts_raw_state_values(self):
+        assert can_transition("pending", "succeeded")  # type: ignore[arg-type]
+
+    def test_codes_shared_with_columnar(self):
+        assert STATE_CODES is COLUMNAR_CODES
+
+
+class TestTransitionLog:
+    def test_records_only_legal_transitions(self):
+        log = TransitionLog("pay_1", at=1.0)
+        assert log.record(S.PROCESSING, at=2.0)
+        assert not log.record(S.PENDING, at=3.0)
+        assert not log.record(S.PROCESSING, at=4.0)
+        assert log.record(S.SUCCEEDED, at=5.0)
+        assert log.record(S.REFUNDED, at=6.0)
+        assert log.is_final
+        assert log.current is S.REFUNDED
+        assert list(log) == [
+            (S.PENDING, 1.0),
+            (S.PROCESSING, 2.0),
+            (S.SUCCEEDED, 5.0),
+            (S.REFUNDED, 6.0),
+        ]
+        assert repr(log) == (
+            "TransitionLog('pay_1', pending -> processing -> succeeded -> refunded)"
+        )
+
+    def test_compact_storage(self):
+        log = TransitionLog("pay_2", S.UNKNOWN)
+        log.record(S.FAILED)
+        assert not hasattr(log, "__dict__")
+        assert log._states.itemsize == 1
+        assert log.states == [S.UNKNOWN, S.FAILED] and len(log) == 2
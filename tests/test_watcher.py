@@ -0,0 +1,143 @@
+"""Tests for the multiplexed StatusWatcher."""
+
+from merchants.models import PaymentState, PaymentStatus
+from merchants.providers import Provider, UserError
+from merchants.watcher import StatusWatcher
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _ScriptedProvider(Provider):
+    key = "scripted"
+    poll_interval = 1.0
+    poll_max_interval = 4.0
+    poll_backoff = 2.0
+
+    def __init__(self):
+        self.states: dict[str, list[PaymentState]] = {}
+        self.calls: list[str] = []
+
+    def create_checkout(self, *a, **kw):
+        raise UserError("not implemented")
+
+    def get_payment(self, payment_id):
+        self.calls.append(payment_id)
+        queue = self.states[payment_id]
+        state = queue.pop(0) if len(queue) > 1 else queue[0]
+        if state is None:
+            raise RuntimeError("boom")
+        return PaymentStatus(payment_id=payment_id, state=state, provider=self.key)
+
+    def parse_webhook(self, payload, headers):
+        raise NotImplementedError
+
+
+def _make(**kwargs):
+    clock = _Clock()
+    provider = _ScriptedProvider()
+    transitions = []
+    watcher = StatusWatcher(
+        on_transition=lambda status, old: transitions.append(
+            (status.payment_id, old, status.state)
+        ),
+        clock=clock,
+        **kwargs,
+    )
+    return watcher, provider, clock, transitions
+
+
+class TestStatusWatcher:
+    def test_nothing_due_before_interval(self):
+        watcher, provider, clock, _ = _make()
+        provider.states["p1"] = [PaymentState.PENDING]
+        watcher.watch("p1", provider)
+        assert watcher.poll_due() == 0
+        assert watcher.next_due_in() == 1.0
+
+    def test_transition_callbacks_and_drop_on_final(self):
+        watcher, provider, clock, transitions = _make()
+        provider.states["p1"] = [PaymentState.PROCESSING, PaymentState.SUCCEEDED]
+        watcher.watch("p1", provider)
+        clock.now = 1.0
+        assert watcher.poll_due() == 1
+        clock.now = 2.0
+        assert watcher.poll_due() == 1
+        assert transitions == [
+            ("p1", PaymentState.PENDING, PaymentState.PROCESSING),
+            ("p1", PaymentState.PROCESSING, PaymentState.SUCCEEDED),
+        ]
+        assert len(watcher) == 0
+        assert watcher.next_due_in() is None
+
+    def test_backoff_grows_while_unchanged(self):
+        watcher, provider, clock, transitions = _make()
+        provider.states["p1"] = [PaymentState.PENDING]
+        watcher.watch("p1", provider)
+        delays = []
+        for _ in range(4):
+            clock.now += watcher.next_due_in()
+            watcher.poll_due()
+            delays.append(watcher.next_due_in())
+        assert delays == [2.0, 4.0, 4.0, 4.0]
+        assert transitions == []
+
+    def test_batches_many_entries(self):
+        watcher, provider, clock, _ = _make(batch_size=50)
+        for i in range(120):
+            provider.states[f"p{i}"] = [PaymentState.SUCCEEDED]
+            watcher.watch(f"p{i}", provider)
+        clock.now = 1.0
+        assert watcher.poll_due() == 50
+        assert watcher.poll_due() == 50
+        assert watcher.poll_due() == 20
+        assert len(watcher) == 0
+
+    def test_unwatch_skips_lookup(self):
+        watcher, provider, clock, _ = _make()
+        provider.states["p1"] = [PaymentState.PENDING]
+        watcher.watch("p1", provider)
+        assert ("scripted", "p1") in watcher
+        assert watcher.unwatch("p1", provider)
+        clock.now = 5.0
+        assert watcher.poll_due() == 0
+        assert provider.calls == []
+
+    def test_errors_are_reported_and_retried(self):
+        errors = []
+        watcher, provider, clock, _ = _make(
+            on_error=lambda key, pid, exc: errors.append((key, pid, str(exc)))
+        )
+        provider.states["p1"] = [None, PaymentState.FAILED]
+        watcher.watch("p1", provider)
+        clock.now = 1.0
+        watcher.poll_due()
+        assert errors == [("scripted", "p1", "boom")]
+        assert len(watcher) == 1
+        clock.now = 3.0
+        watcher.poll_due()
+        assert len(watcher) == 0
+
+    def test_failing_callbacks_keep_entry_scheduled(self):
+        def explode(*args):
+            raise ValueError("callback bug")
+
+        clock = _Clock()
+        provider = _ScriptedProvider()
+        watcher = StatusWatcher(on_transition=explode, on_error=explode, clock=clock)
+        provider.states["p1"] = [None, PaymentState.PROCESSING, PaymentState.FAILED]
+        watcher.watch("p1", provider)
+        clock.now = 1.0
+        assert watcher.poll_due() == 1  # on_error raises
+        assert len(watcher) == 1
+        clock.now = 3.0
+        assert watcher.poll_due() == 1  # on_transition raises
+        assert len(watcher) == 1
+        clock.now += watcher.next_due_in()
+        assert watcher.poll_due() == 1
+        assert len(watcher) == 0
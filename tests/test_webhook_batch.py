@@ -0,0 +1,68 @@
+"""Tests for batch webhook verification and parsing."""
+
+import hashlib
+import hmac
+import json
+import multiprocessing
+
+from merchants.models import PaymentState
+from merchants.webhooks import WebhookVerificationError, parse_events, verify_signatures
+
+
+def _item(i, secret="whsec", header="X-Signature"):
+    payload = json.dumps({"event_id": f"evt_{i}", "status": "paid"}).encode()
+    digest = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    return payload, {header: f"sha256={digest}"}
+
+
+class TestVerifySignatures:
+    def test_results_in_input_order(self):
+        items = [_item(0), _item(1, secret="other"), (b"{}", {}), _item(3)]
+        results = verify_signatures(items, {"current": "whsec"})
+        assert [r.ok for r in results] == [True, False, False, True]
+        assert results[0].value == "current"
+        assert isinstance(results[1].error, WebhookVerificationError)
+        assert "Missing" in str(results[2].error)
+
+    def test_header_lookup_is_case_insensitive(self):
+        results = verify_signatures([_item(0, header="x-signature")], "whsec")
+        assert results[0].ok
+
+    def test_rotation_reports_key_id(self):
+        items = [_item(0, secret="old"), _item(1, secret="new")]
+        results = verify_signatures(items, {"old": "old", "new": "new"})
+        assert [r.value for r in results] == ["old", "new"]
+
+    def test_process_pool(self):
+        items = [_item(i) for i in range(50)] + [_item(50, secret="bad")]
+        results = verify_signatures(items, "whsec", processes=2, chunksize=8)
+        assert [r.ok for r in results] == [True] * 50 + [False]
+
+
+class TestParseEvents:
+    def test_parses_every_item(self):
+        events = parse_events([_item(i) for i in range(3)], provider="generic")
+        assert [e.event_id for e in events] == ["evt_0", "evt_1", "evt_2"]
+        assert all(e.provider == "generic" for e in events)
+        assert all(e.state == PaymentState.SUCCEEDED for e in events)
+
+    def test_process_pool(self):
+        items = [_item(i) for i in range(20)]
+        events = parse_events(items, processes=2, chunksize=4)
+        assert [e.event_id for e in events] == [f"evt_{i}" for i in range(20)]
+
+    def test_spawned_workers_use_provider_state_table(self):
+        import merchants.providers.paypal  # noqa: F401  registers "paypal"
+
+        payload = json.dumps(
+            {"id": "WH-1", "resource": {"id": "o1", "status": "DECLINED"}}
+        ).encode()
+        in_process = parse_events([(payload, {})], provider="paypal")
+        spawned = parse_events(
+            [(payload, {})],
+            provider="paypal",
+            processes=1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        assert in_process[0].state == PaymentState.FAILED
+        assert spawned[0].state == PaymentState.FAILED
@@ -0,0 +1,213 @@
+"""Tests for webhook de-duplication."""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+import sqlalchemy as sa
+
+from merchants.models import PaymentState
+from merchants.providers.generic import GenericProvider
+from merchants.sqlalchemy import SQLAlchemyDedupStore
+from merchants.webhooks import (
+    MemoryDedupStore,
+    SQLiteDedupStore,
+    WebhookDeduplicator,
+    WebhookPipeline,
+    event_key,
+    payload_key,
+)
+
+
+def _provider():
+    return GenericProvider("https://x/checkout", "https://x/payments/{payment_id}")
+
+
+def _payload(event_id, status="paid", **extra):
+    return json.dumps(
+        {"event_id": event_id, "payment_id": "pay_1", "status": status, **extra}
+    ).encode()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeys:
+    def test_event_key_is_namespaced_by_provider(self):
+        assert event_key("stripe", "evt_1") != event_key("paypal", "evt_1")
+
+    def test_payload_key_is_digest(self):
+        assert payload_key("generic", b"a") == payload_key("generic", b"a")
+        assert payload_key("generic", b"a") != payload_key("generic", b"b")
+
+    def test_event_key_distinguishes_states(self):
+        pending = event_key("khipu", "pay_1", PaymentState.PENDING)
+        paid = event_key("khipu", "pay_1", PaymentState.SUCCEEDED)
+        assert pending != paid
+        assert pending != event_key("khipu", "pay_1")
+
+
+class TestMemoryDedupStore:
+    def test_add_reports_new_keys(self):
+        store = MemoryDedupStore()
+        assert store.add("k") is True
+        assert store.add("k") is False
+        assert "k" in store
+
+    def test_evicts_least_recently_seen(self):
+        store = MemoryDedupStore(maxsize=2)
+        store.add("a")
+        store.add("b")
+        store.add("a")  # refresh
+        store.add("c")
+        assert "a" in store
+        assert "b" not in store
+        assert len(store) == 2
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        store = MemoryDedupStore(ttl=10, clock=clock)
+        store.add("k")
+        clock.now = 9.9
+        assert "k" in store
+        clock.now = 10.0
+        assert "k" not in store
+        assert store.add("k") is True
+
+    def test_discard(self):
+        store = MemoryDedupStore()
+        store.add("k")
+        store.discard("k")
+        assert "k" not in store
+        store.discard("missing")
+
+
+class TestSQLiteDedupStore:
+    def test_add_and_contains(self):
+        store = SQLiteDedupStore(":memory:")
+        assert store.add("k") is True
+        assert store.add("k") is False
+        assert "k" in store
+        store.discard("k")
+        assert "k" not in store
+        store.close()
+
+    def test_expired_key_is_accepted_again(self):
+        store = SQLiteDedupStore(":memory:", ttl=-1)
+        assert store.add("k") is True
+        assert "k" not in store
+        assert store.add("k") is True
+        assert store.purge() == 1
+
+    def test_rejects_bad_table_name(self):
+        with pytest.raises(ValueError):
+            SQLiteDedupStore(":memory:", table="x; DROP TABLE y")
+
+
+class TestSQLAlchemyDedupStore:
+    def _store(self, **kwargs):
+        store = SQLAlchemyDedupStore(sa.create_engine("sqlite://"), **kwargs)
+        store.create_table()
+        return store
+
+    def test_add_and_contains(self):
+        store = self._store()
+        assert store.add("k") is True
+        assert store.add("k") is False
+        assert "k" in store
+        store.discard("k")
+        assert "k" not in store
+        assert store.add("k") is True
+
+    def test_expired_key_is_accepted_again(self):
+        store = self._store(ttl=-1)
+        assert store.add("k") is True
+        assert "k" not in store
+        assert store.add("k") is True
+        assert store.purge() == 1
+
+    def test_attaches_to_metadata(self):
+        metadata = sa.MetaData()
+        SQLAlchemyDedupStore(
+            sa.create_engine("sqlite://"), metadata=metadata, table_name="dedup"
+        )
+        assert "dedup" in metadata.tables
+
+
+class TestWebhookDeduplicator:
+    def test_drops_identical_redelivery_without_parsing(self):
+        provider = _provider()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        assert dedup.parse_webhook(provider, _payload("evt_1"), {}) is not None
+
+        provider.parse_webhook = MagicMock()
+        assert dedup.parse_webhook(provider, _payload("evt_1"), {}) is None
+        provider.parse_webhook.assert_not_called()
+
+    def test_drops_same_event_id_with_different_body(self):
+        provider = _provider()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        assert dedup.parse_webhook(provider, _payload("evt_1"), {}) is not None
+        assert dedup.parse_webhook(provider, _payload("evt_1", retry=1), {}) is None
+        assert dedup.parse_webhook(provider, _payload("evt_2"), {}) is not None
+
+    def test_state_change_with_reused_event_id_is_accepted(self):
+        # Khipu and Flow report the payment id / token as the event id.
+        provider = _provider()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        pending = dedup.parse_webhook(provider, _payload("pay_1", "pending"), {})
+        paid = dedup.parse_webhook(provider, _payload("pay_1", "paid"), {})
+        assert pending.state == PaymentState.PENDING
+        assert paid.state == PaymentState.SUCCEEDED
+        assert dedup.parse_webhook(provider, _payload("pay_1", retry=1), {}) is None
+
+    def test_falls_back_to_payload_digest_without_event_id(self):
+        provider = _provider()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        body = b'{"payment_id": "pay_1", "status": "paid"}'
+        event = provider.parse_webhook(body, {})
+        assert event.event_id is None
+        assert dedup.accept(event, body) is True
+        assert dedup.accept(event, body) is False
+
+    def test_forget_allows_reprocessing(self):
+        provider = _provider()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        event = dedup.parse_webhook(provider, _payload("evt_1"), {})
+        dedup.forget(event, _payload("evt_1"))
+        assert dedup.parse_webhook(provider, _payload("evt_1"), {}) is not None
+
+
+class TestPipelineDedup:
+    def test_duplicates_never_reach_handler(self):
+        seen = []
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        with WebhookPipeline(_provider(), seen.append, dedup=dedup) as pipeline:
+            for _ in range(3):
+                pipeline.submit(_payload("evt_1"), {})
+            pipeline.submit(_payload("evt_2"), {})
+            pipeline.join()
+        assert [e.event_id for e in seen] == ["evt_1", "evt_2"]
+
+    def test_failed_handler_allows_retry(self):
+        calls = []
+
+        def handle(event):
+            calls.append(event.event_id)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        with WebhookPipeline(
+            _provider(), handle, dedup=dedup, on_error=lambda *a: None
+        ) as pipeline:
+            pipeline.submit(_payload("evt_1"), {})
+            pipeline.join()
+            pipeline.submit(_payload("evt_1"), {})
+            pipeline.join()
+        assert calls == ["evt_1", "evt_1"]
@@ -0,0 +1,201 @@
+"""Tests for the webhook event dispatcher."""
+
+import asyncio
+import json
+
+import pytest
+
+from merchants.models import PaymentState, WebhookEvent
+from merchants.providers.generic import GenericProvider
+from merchants.webhooks import (
+    MemoryDedupStore,
+    WebhookDeduplicator,
+    WebhookDispatcher,
+    WebhookPipeline,
+)
+
+
+def _event(provider="stripe", event_type="payment.succeeded", state=None):
+    return WebhookEvent(
+        event_id="evt_1",
+        event_type=event_type,
+        payment_id="pay_1",
+        state=state or PaymentState.SUCCEEDED,
+        provider=provider,
+    )
+
+
+class TestRouting:
+    def test_wildcards_and_registration_order(self):
+        dispatcher = WebhookDispatcher()
+        calls = []
+        dispatcher.register(lambda e: calls.append("any"))
+        dispatcher.register(lambda e: calls.append("stripe"), provider="stripe")
+        dispatcher.register(
+            lambda e: calls.append("succeeded"), state=PaymentState.SUCCEEDED
+        )
+        dispatcher.register(lambda e: calls.append("paypal"), provider="paypal")
+        dispatcher.register(
+            lambda e: calls.append("exact"),
+            provider="stripe",
+            event_type="payment.succeeded",
+            state=PaymentState.SUCCEEDED,
+        )
+        dispatcher.dispatch(_event())
+        assert calls == ["any", "stripe", "succeeded", "exact"]
+
+    def test_no_match(self):
+        dispatcher = WebhookDispatcher()
+        dispatcher.register(lambda e: None, state=PaymentState.FAILED)
+        assert dispatcher.dispatch(_event()) == []
+
+    def test_provider_instance_and_decorator(self):
+        from merchants.providers.dummy import DummyProvider
+
+        dispatcher = WebhookDispatcher()
+
+        @dispatcher.on(provider=DummyProvider())
+        def handle(event):
+            return event.payment_id
+
+        assert dispatcher.handlers_for(_event(provider="dummy")) == [handle]
+        assert dispatcher.dispatch(_event(provider="dummy"))[0].value == "pay_1"
+
+    def test_registration_invalidates_cached_routes(self):
+        dispatcher = WebhookDispatcher()
+        first = dispatcher.register(lambda e: 1)
+        assert len(dispatcher.handlers_for(_event())) == 1
+        dispatcher.register(lambda e: 2, provider="stripe")
+        assert len(dispatcher.handlers_for(_event())) == 2
+        first()
+        assert len(dispatcher.handlers_for(_event())) == 1
+
+
+class TestDispatch:
+    def test_errors_are_isolated(self):
+        errors = []
+        dispatcher = WebhookDispatcher(on_error=lambda exc, e, h: errors.append(exc))
+
+        def boom(event):
+            raise RuntimeError("boom")
+
+        dispatcher.register(boom)
+        dispatcher.register(lambda e: "ok")
+        results = dispatcher.dispatch(_event())
+        assert [r.ok for r in results] == [False, True]
+        assert results[1].value == "ok"
+        assert isinstance(errors[0], RuntimeError)
+
+    def test_failing_error_hook_does_not_skip_handlers(self):
+        def on_error(exc, event, handler):
+            raise RuntimeError("hook bug")
+
+        dispatcher = WebhookDispatcher(on_error=on_error)
+        dispatcher.register(lambda e: 1 / 0)
+        dispatcher.register(lambda e: "ok")
+        results = dispatcher.dispatch(_event())
+        assert [r.ok for r in results] == [False, True]
+        assert isinstance(results[0].error, ZeroDivisionError)
+
+    def test_sync_dispatch_rejects_coroutine_handlers(self):
+        dispatcher = WebhookDispatcher(on_error=lambda *a: None)
+
+        async def handler(event):
+            return 1
+
+        dispatcher.register(handler)
+        (result,) = dispatcher.dispatch(_event())
+        assert isinstance(result.error, TypeError)
+
+    def test_async_dispatch_mixes_sync_and_async(self):
+        dispatcher = WebhookDispatcher()
+
+        async def async_handler(event):
+            await asyncio.sleep(0)
+            return "async"
+
+        dispatcher.register(lambda e: "sync")
+        dispatcher.register(async_handler)
+        results = asyncio.run(dispatcher.dispatch_async(_event()))
+        assert [r.value for r in results] == ["sync", "async"]
+
+    def test_raise_errors_reraises_after_every_handler_ran(self):
+        called = []
+        dispatcher = WebhookDispatcher(raise_errors=True, on_error=lambda *a: None)
+
+        def boom(event):
+            called.append("boom")
+            raise RuntimeError("boom")
+
+        dispatcher.register(boom)
+        dispatcher.register(lambda e: called.append("ok"))
+        with pytest.raises(RuntimeError, match="boom"):
+            dispatcher.dispatch(_event())
+        with pytest.raises(RuntimeError, match="boom"):
+            asyncio.run(dispatcher.dispatch_async(_event()))
+        assert called == ["boom", "ok", "boom", "ok"]
+        assert sum(s.errors for s in dispatcher.stats().values()) == 2
+
+    def test_raise_errors_lets_pipeline_retry_deduplicated_events(self):
+        attempts = []
+        dispatcher = WebhookDispatcher(raise_errors=True, on_error=lambda *a: None)
+
+        @dispatcher.on()
+        def flaky(event):
+            attempts.append(event.event_id)
+            if len(attempts) == 1:
+                raise RuntimeError("db down")
+
+        provider = GenericProvider(
+            "https://x/checkout", "https://x/payments/{payment_id}"
+        )
+        body = json.dumps(
+            {"event_id": "evt_1", "payment_id": "pay_1", "status": "paid"}
+        ).encode()
+        dedup = WebhookDeduplicator(MemoryDedupStore())
+        with WebhookPipeline(
+            provider, dispatcher.dispatch, dedup=dedup, on_error=lambda *a: None
+        ) as pipeline:
+            pipeline.submit(body, {})
+            pipeline.join()
+            pipeline.submit(body, {})  # provider redelivery
+            pipeline.join()
+        assert attempts == ["evt_1", "evt_1"]
+
+
+class TestStats:
+    def test_counts_and_timing(self):
+        ticks = iter([0.0, 0.5, 1.0, 3.0])
+        dispatcher = WebhookDispatcher(
+            clock=lambda: next(ticks), on_error=lambda *a: None
+        )
+
+        def handler(event):
+            if event.state is PaymentState.FAILED:
+                raise ValueError
+
+        dispatcher.register(handler)
+        dispatcher.dispatch(_event())
+        dispatcher.dispatch(_event(state=PaymentState.FAILED))
+        (stats,) = dispatcher.stats().values()
+        assert (stats.calls, stats.errors) == (2, 1)
+        assert stats.total_time == 2.5
+        assert stats.max_time == 2.0
+        assert stats.mean_time == 1.25
+
+    def test_same_named_handlers_get_separate_stats(self):
+        dispatcher = WebhookDispatcher()
+
+        def make(tag):
+            def handler(event):
+                return tag
+
+            return handler
+
+        dispatcher.register(make("a"), state=PaymentState.SUCCEEDED)
+        dispatcher.register(make("b"), state=PaymentState.FAILED)
+        dispatcher.register(lambda e: None, state=PaymentState.FAILED)
+        dispatcher.dispatch(_event())
+        stats = dispatcher.stats()
+        assert len(stats) == 3
+        assert sorted(s.calls for s in stats.values()) == [0, 0, 1]
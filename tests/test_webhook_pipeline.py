@@ -0,0 +1,156 @@
+"""Tests for the webhook ingestion pipeline."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from merchants.providers.generic import GenericProvider
+from merchants.webhooks import (
+    AsyncWebhookPipeline,
+    WebhookPipeline,
+    WebhookQueueFull,
+    WebhookVerificationError,
+    payment_partition_key,
+)
+
+
+def _provider():
+    return GenericProvider("https://x/checkout", "https://x/payments/{payment_id}")
+
+
+def _payload(payment_id, seq):
+    return json.dumps(
+        {"event_id": f"{payment_id}-{seq}", "payment_id": payment_id, "status": "paid"}
+    ).encode()
+
+
+class TestPartitionKey:
+    @pytest.mark.parametrize(
+        "payload, expected",
+        [
+            (b'{"payment_id": "p1"}', "p1"),
+            (b'{"token": "tok"}', "tok"),
+            (b'{"resource": {"id": "order_1"}}', "order_1"),
+            (b'{"data": {"object": {"id": "pi_1"}}}', "pi_1"),
+            (b"token=flow_tok", "flow_tok"),
+            (b'{"other": 1}', None),
+            (b"[1, 2]", None),
+        ],
+    )
+    def test_extracts_payment_id(self, payload, expected):
+        assert payment_partition_key(payload, {}) == expected
+
+
+class TestWebhookPipeline:
+    def test_processes_in_order_per_payment(self):
+        seen = []
+        lock = threading.Lock()
+
+        def handle(event):
+            with lock:
+                seen.append(event.event_id)
+
+        with WebhookPipeline(_provider(), handle, workers=4) as pipeline:
+            for seq in range(20):
+                for pid in ("a", "b", "c"):
+                    pipeline.submit(_payload(pid, seq), {})
+            pipeline.join()
+        for pid in ("a", "b", "c"):
+            ids = [e for e in seen if e.startswith(f"{pid}-")]
+            assert ids == [f"{pid}-{seq}" for seq in range(20)]
+
+    def test_back_pressure_raises_when_full(self):
+        pipeline = WebhookPipeline(_provider(), lambda e: None, workers=1, maxsize=2)
+        pipeline.submit(_payload("a", 1), {})
+        pipeline.submit(_payload("a", 2), {})
+        with pytest.raises(WebhookQueueFull):
+            pipeline.submit(_payload("a", 3), {})
+        assert pipeline.pending() == 2
+        pipeline.start()
+        pipeline.stop()
+        assert pipeline.pending() == 0
+
+    def test_errors_are_isolated(self):
+        errors = []
+        handled = []
+
+        def verify(payload, headers):
+            if headers.get("sig") != "ok":
+                raise WebhookVerificationError("bad signature")
+
+        pipeline = WebhookPipeline(
+            _provider(),
+            lambda e: handled.append(e.payment_id),
+            verify=verify,
+            on_error=lambda exc, payload, headers: errors.append(str(exc)),
+        )
+        with pipeline:
+            pipeline.submit(_payload("a", 1), {"sig": "nope"})
+            pipeline.submit(_payload("b", 1), {"sig": "ok"})
+            pipeline.join()
+        assert errors == ["bad signature"]
+        assert handled == ["b"]
+
+    def test_failing_error_handler_keeps_worker_alive(self):
+        handled = []
+
+        def handle(event):
+            if event.payment_id == "a":
+                raise ValueError("handler bug")
+            handled.append(event.payment_id)
+
+        def on_error(exc, payload, headers):
+            raise RuntimeError("on_error bug")
+
+        with WebhookPipeline(_provider(), handle, workers=1, on_error=on_error) as p:
+            p.submit(_payload("a", 1), {})
+            p.submit(_payload("b", 1), {})
+            p.join()
+        assert handled == ["b"]
+
+
+class TestAsyncWebhookPipeline:
+    def test_async_handler_and_ordering(self):
+        seen = []
+
+        async def handle(event):
+            await asyncio.sleep(0)
+            seen.append(event.event_id)
+
+        async def run():
+            async with AsyncWebhookPipeline(_provider(), handle, workers=3) as pipeline:
+                for seq in range(10):
+                    for pid in ("a", "b"):
+                        await pipeline.submit(_payload(pid, seq), {})
+                await pipeline.join()
+
+        asyncio.run(run())
+        assert [e for e in seen if e.startswith("a-")] == [f"a-{i}" for i in range(10)]
+        assert len(seen) == 20
+
+    def test_submit_nowait_raises_when_full(self):
+        async def run():
+            pipeline = AsyncWebhookPipeline(
+                _provider(), lambda e: None, workers=1, maxsize=1
+            )
+            await pipeline.start()
+            pipeline.submit_nowait(_payload("a", 1), {})
+            with pytest.raises(WebhookQueueFull):
+                pipeline.submit_nowait(_payload("a", 2), {})
+            with pytest.raises(WebhookQueueFull):
+                await pipeline.submit(_payload("a", 3), {}, timeout=0)
+            await pipeline.stop()
+
+        asyncio.run(run())
+
+    def test_submit_before_start_raises(self):
+        async def run():
+            pipeline = AsyncWebhookPipeline(_provider(), lambda e: None)
+            with pytest.raises(RuntimeError, match="not started"):
+                pipeline.submit_nowait(_payload("a", 1), {})
+            with pytest.raises(RuntimeError, match="not started"):
+                await pipeline.submit(_payload("a", 1), {})
+
+        asyncio.run(run())
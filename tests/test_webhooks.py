@@ -1,5 +1,7 @@
 """Tests for webhook verification and parsing."""
 
+import asyncio
+import base64
 import hashlib
 import hmac
 import json
@@ -7,7 +9,22 @@ import json
 import pytest
 
 from merchants.models import PaymentState
-from merchants.webhooks import WebhookVerificationError, parse_event, verify_signature
+from merchants.webhooks import (
+    ReplayGuard,
+    WebhookReplayError,
+    WebhookSchema,
+    WebhookVerificationError,
+    WebhookVerifier,
+    parse_event,
+    schema_for,
+    verify_khipu_signature,
+    verify_khipu_signature_stream,
+    verify_khipu_signature_stream_async,
+    verify_signature,
+    verify_signature_stream,
+    verify_signature_stream_async,
+    verify_timestamped_signature,
+)
 
 
 def _make_sig(payload: bytes, secret: str, prefix: str = "sha256=") -> str:
@@ -15,6 +32,24 @@ def _make_sig(payload: bytes, secret: str, prefix: str = "sha256=") -> str:
     return f"{prefix}{digest}"
 
 
+def _khipu_header(payload: bytes, secret: str, t: int) -> str:
+    digest = hmac.new(secret.encode(), f"{t}.".encode() + payload, hashlib.sha256)
+    return f"t={t},s={base64.b64encode(digest.digest()).decode()}"
+
+
+def _stripe_header(payload: bytes, secret: str, t: int) -> str:
+    digest = hmac.new(secret.encode(), f"{t}.".encode() + payload, hashlib.sha256)
+    return f"t={t},v1={digest.hexdigest()}"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
 class TestVerifySignature:
     def test_valid_signature(self):
         payload = b'{"id":"evt_1","type":"payment.succeeded"}'
@@ -94,3 +129,304 @@ class TestParseEvent:
         data = {"type": "payment.mystery", "status": "foobar"}
         event = parse_event(json.dumps(data).encode())
         assert event.state == PaymentState.UNKNOWN
+
+
+class TestTimestampedSignatures:
+    def test_khipu_valid(self):
+        header = _khipu_header(b"{}", "sk", 1_700_000_000_000)
+        assert verify_khipu_signature(b"{}", "sk", header) == "1700000000000"
+
+    def test_khipu_malformed(self):
+        with pytest.raises(WebhookVerificationError, match="Malformed"):
+            verify_khipu_signature(b"{}", "sk", "t=1")
+
+    def test_khipu_bad_signature(self):
+        header = _khipu_header(b"{}", "other", 1_700_000_000_000)
+        with pytest.raises(WebhookVerificationError, match="Khipu"):
+            verify_khipu_signature(b"{}", "sk", header)
+
+    def test_stripe_style_valid(self):
+        header = _stripe_header(b"body", "whsec", 1_700_000_000)
+        assert verify_timestamped_signature(b"body", "whsec", header) == "1700000000"
+
+    def test_stripe_style_any_matching_v1(self):
+        good = _stripe_header(b"body", "whsec", 1_700_000_000).split(",")[1]
+        header = f"t=1700000000,v1=deadbeef,{good},v0=ignored"
+        verify_timestamped_signature(b"body", "whsec", header)
+
+    def test_stripe_style_bad_signature(self):
+        header = _stripe_header(b"body", "other", 1_700_000_000)
+        with pytest.raises(WebhookVerificationError):
+            verify_timestamped_signature(b"body", "whsec", header)
+
+
+class TestReplayGuard:
+    def test_rejects_replayed_delivery(self):
+        guard = ReplayGuard(tolerance=300, clock=FakeClock())
+        header = _stripe_header(b"body", "whsec", 1_700_000_000)
+        verify_timestamped_signature(b"body", "whsec", header, replay_guard=guard)
+        with pytest.raises(WebhookReplayError):
+            verify_timestamped_signature(b"body", "whsec", header, replay_guard=guard)
+
+    def test_rejects_stale_and_future_timestamps(self):
+        guard = ReplayGuard(tolerance=300, clock=FakeClock())
+        for t in (1_700_000_000 - 301, 1_700_000_000 + 301):
+            header = _stripe_header(b"body", "whsec", t)
+            with pytest.raises(WebhookReplayError, match="tolerance"):
+                verify_timestamped_signature(
+                    b"body", "whsec", header, replay_guard=guard
+                )
+
+    def test_khipu_millisecond_timestamps(self):
+        guard = ReplayGuard(tolerance=300, clock=FakeClock())
+        header = _khipu_header(b"{}", "sk", 1_700_000_000_000)
+        verify_khipu_signature(b"{}", "sk", header, replay_guard=guard)
+        with pytest.raises(WebhookReplayError):
+            verify_khipu_signature(b"{}", "sk", header, replay_guard=guard)
+
+    def test_replay_error_is_verification_error(self):
+        assert issubclass(WebhookReplayError, WebhookVerificationError)
+
+    def test_forged_requests_are_not_recorded(self):
+        guard = ReplayGuard(tolerance=300, clock=FakeClock())
+        header = _stripe_header(b"body", "other", 1_700_000_000)
+        with pytest.raises(WebhookVerificationError):
+            verify_timestamped_signature(b"body", "whsec", header, replay_guard=guard)
+        assert len(guard) == 0
+
+    def test_nonces_expire_with_the_window(self):
+        clock = FakeClock()
+        guard = ReplayGuard(tolerance=10, clock=clock)
+        for i in range(5):
+            guard.check(str(int(clock.now)), f"sig{i}")
+        assert len(guard) == 5
+        clock.now += 11
+        guard.check(str(int(clock.now)), "fresh")
+        assert len(guard) == 1
+
+
+class TestWebhookVerifier:
+    def test_returns_matching_key_id(self):
+        verifier = WebhookVerifier({"old": "s1", "new": "s2"})
+        assert verifier.verify(b"data", _make_sig(b"data", "s1")) == "old"
+        assert verifier.verify(b"data", _make_sig(b"data", "s2")) == "new"
+
+    def test_single_secret_and_list(self):
+        assert WebhookVerifier("s1").verify(b"x", _make_sig(b"x", "s1")) == "0"
+        verifier = WebhookVerifier(["s1", b"s2"])
+        assert verifier.verify(b"x", _make_sig(b"x", "s2", prefix="")) == "1"
+
+    def test_rejects_unknown_secret_and_garbage(self):
+        verifier = WebhookVerifier({"a": "s1"})
+        with pytest.raises(WebhookVerificationError):
+            verifier.verify(b"x", _make_sig(b"x", "nope"))
+        with pytest.raises(WebhookVerificationError):
+            verifier.verify(b"x", "sha256=not-hex")
+
+    def test_rotation(self):
+        verifier = WebhookVerifier({"a": "s1"})
+        verifier.add_secret("b", "s2")
+        assert verifier.key_ids == ["a", "b"]
+        verifier.remove_secret("a")
+        with pytest.raises(WebhookVerificationError):
+            verifier.verify(b"x", _make_sig(b"x", "s1"))
+        with pytest.raises(ValueError):
+            verifier.remove_secret("b")
+        with pytest.raises(KeyError):
+            verifier.remove_secret("missing")
+
+    def test_verifier_is_reusable(self):
+        verifier = WebhookVerifier("s1")
+        for body in (b"one", b"two", b"one"):
+            verifier.verify(body, _make_sig(body, "s1"))
+
+    def test_timestamped_with_replay_guard(self):
+        verifier = WebhookVerifier({"old": "s1", "new": "s2"})
+        guard = ReplayGuard(clock=FakeClock())
+        header = _stripe_header(b"body", "s2", 1_700_000_000)
+        assert verifier.verify_timestamped(b"body", header, replay_guard=guard) == (
+            "new",
+            "1700000000",
+        )
+        with pytest.raises(WebhookReplayError):
+            verifier.verify_timestamped(b"body", header, replay_guard=guard)
+
+    def test_base64_encoding(self):
+        verifier = WebhookVerifier({"k": "sk"}, encoding="base64")
+        header = _khipu_header(b"{}", "sk", 1_700_000_000_000)
+        key_id, _ = verifier.verify_timestamped(
+            b"{}", header, scheme="s", timestamp_scale=0.001
+        )
+        assert key_id == "k"
+
+
+class TestWebhookSchema:
+    def test_nested_paths_and_alternatives(self):
+        schema = WebhookSchema(
+            event_id="uuid",
+            event_type="kind",
+            payment_id=("charge.id", "charge_id"),
+            status="charge.state",
+        )
+        assert schema.extract({"uuid": "e1", "kind": "k", "charge_id": "c1"}) == (
+            "e1",
+            "k",
+            "c1",
+            None,
+        )
+        data = {"charge": {"id": "c2", "state": "paid"}}
+        assert schema.extract(data) == (None, "unknown", "c2", "paid")
+
+    def test_missing_and_non_dict_intermediates(self):
+        schema = WebhookSchema(payment_id="a.b.c")
+        assert schema.extract({"a": "scalar"})[2] is None
+        assert schema.extract({"a": {"b": None}})[2] is None
+
+    def test_parse_non_object_body(self):
+        event = WebhookSchema(event_id="id").parse(b"[1, 2]", provider="x")
+        assert event.event_id is None
+        assert event.state == PaymentState.UNKNOWN
+        assert event.raw == {}
+
+    def test_missing_status_is_not_recorded_as_unmapped(self):
+        from merchants.providers import _DEFAULT_STATES
+
+        _DEFAULT_STATES.reset_unknown()
+        schema = WebhookSchema(payment_id="id", status="status")
+        assert schema.parse(b'{"id": "p1"}', provider="x").state is (
+            PaymentState.UNKNOWN
+        )
+        assert _DEFAULT_STATES.unknown_states() == {}
+        assert schema.parse(b'{"status": "brand_new"}', provider="x").state is (
+            PaymentState.UNKNOWN
+        )
+        assert _DEFAULT_STATES.unknown_states() == {"brand_new": 1}
+        _DEFAULT_STATES.reset_unknown()
+
+    def test_parse_event_uses_registered_provider_schema(self, monkeypatch):
+        from merchants.providers import _REGISTRY
+        from merchants.providers.generic import GenericProvider
+
+        provider = GenericProvider("https://x/c", "https://x/p/{payment_id}")
+        provider.key = "acme"
+        provider.webhook_schema = WebhookSchema(payment_id="charge.id", status="st")
+        monkeypatch.setitem(_REGISTRY, "acme", provider)
+        payload = json.dumps({"charge": {"id": "c1"}, "st": "paid"}).encode()
+        event = parse_event(payload, provider="acme")
+        assert event.payment_id == "c1"
+        assert event.state == PaymentState.SUCCEEDED
+
+    def test_parse_event_uses_class_schema_without_registered_instance(
+        self, monkeypatch
+    ):
+        from merchants.providers import _REGISTRY
+        from merchants.providers.stripe import StripeProvider
+
+        monkeypatch.delitem(_REGISTRY, "stripe", raising=False)
+        payload = json.dumps(
+            {
+                "id": "evt_1",
+                "type": "payment_intent.succeeded",
+                "data": {"object": {"payment_intent": "pi_1", "status": "succeeded"}},
+            }
+        ).encode()
+        assert schema_for("stripe") is StripeProvider.webhook_schema
+        assert parse_event(payload, provider="stripe").payment_id == "pi_1"
+
+    def test_provider_parse_webhook_matches_parse_event(self):
+        from merchants.providers.stripe import StripeProvider
+
+        payload = json.dumps(
+            {
+                "id": "evt_1",
+                "type": "payment_intent.succeeded",
+                "data": {"object": {"payment_intent": "pi_1", "status": "succeeded"}},
+            }
+        ).encode()
+        event = StripeProvider(api_key="sk").parse_webhook(payload, {})
+        assert (event.event_id, event.payment_id) == ("evt_1", "pi_1")
+        assert event.state == PaymentState.SUCCEEDED
+
+
+def _chunks(payload: bytes, size: int = 7):
+    for i in range(0, len(payload), size):
+        yield payload[i : i + size]
+
+
+async def _achunks(payload: bytes, size: int = 7):
+    for chunk in _chunks(payload, size):
+        yield chunk
+
+
+class TestStreamingVerification:
+    payload = json.dumps({"id": "evt_1", "padding": "x" * 500}).encode()
+
+    def test_chunked_plain_signature(self):
+        sig = _make_sig(self.payload, "whsec")
+        body = verify_signature_stream(_chunks(self.payload), "whsec", sig)
+        assert body == self.payload
+
+    def test_memoryview_body(self):
+        sig = _make_sig(self.payload, "whsec")
+        body = verify_signature_stream(memoryview(self.payload), "whsec", sig)
+        assert body == self.payload
+        assert isinstance(body, bytes)
+
+    def test_reused_read_buffer_is_snapshotted(self):
+        buf = bytearray(4)
+
+        def reader():
+            for i in range(0, len(self.payload), 4):
+                piece = self.payload[i : i + 4]
+                buf[: len(piece)] = piece
+                yield memoryview(buf)[: len(piece)]
+
+        sig = _make_sig(self.payload, "whsec")
+        assert verify_signature_stream(reader(), "whsec", sig) == self.payload
+
+    def test_bad_signature_raises(self):
+        with pytest.raises(WebhookVerificationError):
+            verify_signature_stream(_chunks(self.payload), "whsec", "sha256=00")
+
+    def test_max_size(self):
+        sig = _make_sig(self.payload, "whsec")
+        with pytest.raises(WebhookVerificationError, match="exceeds"):
+            verify_signature_stream(_chunks(self.payload), "whsec", sig, max_size=10)
+
+    def test_async_plain_signature(self):
+        sig = _make_sig(self.payload, "whsec")
+        body = asyncio.run(
+            verify_signature_stream_async(_achunks(self.payload), "whsec", sig)
+        )
+        assert body == self.payload
+
+    def test_khipu_stream_matches_whole_body(self):
+        header = _khipu_header(self.payload, "sk", 1_700_000_000_000)
+        timestamp, body = verify_khipu_signature_stream(
+            _chunks(self.payload), "sk", header
+        )
+        assert (timestamp, body) == ("1700000000000", self.payload)
+
+    def test_khipu_stream_async_with_replay_guard(self):
+        guard = ReplayGuard(clock=FakeClock())
+        header = _khipu_header(self.payload, "sk", 1_700_000_000_000)
+
+        async def verify():
+            return await verify_khipu_signature_stream_async(
+                _achunks(self.payload), "sk", header, replay_guard=guard
+            )
+
+        asyncio.run(verify())
+        with pytest.raises(WebhookReplayError):
+            asyncio.run(verify())
+
+    def test_khipu_malformed_header_does_not_consume_body(self):
+        consumed = []
+
+        def chunks():
+            consumed.append(True)
+            yield self.payload
+
+        with pytest.raises(WebhookVerificationError, match="Malformed"):
+            verify_khipu_signature_stream(chunks(), "sk", "s=abc")
+        assert consumed == []